@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 客户端连接池注册表
+按 (provider, base_url 哈希, api_key 哈希) 复用 requests.Session 与 OpenAI 客户端，
+避免每次调用都重新建立 TCP+TLS 连接；后台生成线程共享同一组长连接。
+空闲回收只把条目移出注册表、不主动 close()：last_used 只在取用时更新，
+超过 idle_timeout 的流式调用可能仍在使用该 Session / 客户端，由最后一个引用释放后的垃圾回收关闭连接。
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _hash_secret(value: Optional[str]) -> str:
+    """API Key / base_url 只以摘要形式参与键计算，不在注册表中明文保存
+    （文心一言的 base_url 字段存放的是 OAuth client_secret）"""
+    return hashlib.sha256((value or "").encode("utf-8")).hexdigest()[:16]
+
+
+def redacted_host(base_url: Optional[str]) -> str:
+    """日志中只显示主机名；不是 http(s) 地址（如文心一言的 secret）时显示 -"""
+    try:
+        parts = urlsplit(base_url or "")
+    except ValueError:
+        return "-"
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return "-"
+    return parts.hostname
+
+
+class _PooledClient:
+    """单个 (provider, base_url, key) 对应的连接资源"""
+
+    def __init__(self, pool_connections: int, pool_maxsize: int, label: str = "-"):
+        self.label = label  # 日志用的 provider/主机名，不含密钥
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.openai_client: Any = None
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+        client = self.openai_client
+        self.openai_client = None
+        if client is not None and hasattr(client, "close"):
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+class AIClientRegistry:
+    """进程级 AI 客户端注册表（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str, str], _PooledClient] = {}
+
+    @staticmethod
+    def make_key(provider: str, base_url: Optional[str], api_key: Optional[str]) -> Tuple[str, str, str]:
+        return (str(provider or ""), _hash_secret((base_url or "").rstrip("/")), _hash_secret(api_key))
+
+    def _acquire(self, key, pool_connections: int, pool_maxsize: int, idle_timeout: float,
+                 base_url: Optional[str] = None) -> _PooledClient:
+        """取出（或新建）连接资源，并顺带清理空闲超时的条目；需在锁内调用"""
+        now = time.monotonic()
+        if idle_timeout and idle_timeout > 0:
+            expired = [k for k, c in self._clients.items()
+                       if k != key and now - c.last_used > idle_timeout]
+            for k in expired:
+                entry = self._clients.pop(k)
+                print(f"♻️ 回收空闲 AI 连接池: provider={k[0]}, host={entry.label}")
+        entry = self._clients.get(key)
+        if entry is not None and idle_timeout and idle_timeout > 0 and now - entry.last_used > idle_timeout:
+            # 长时间空闲的连接大概率已被服务端断开，整体重建（旧条目可能仍被流式调用使用，不关闭）
+            del self._clients[key]
+            entry = None
+        if entry is None:
+            entry = _PooledClient(max(1, int(pool_connections)), max(1, int(pool_maxsize)),
+                                  label=redacted_host(base_url))
+            self._clients[key] = entry
+        entry.last_used = now
+        return entry
+
+    def get_session(
+        self,
+        provider: str,
+        base_url: Optional[str],
+        api_key: Optional[str],
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        idle_timeout: float = 300,
+    ) -> requests.Session:
+        """获取共享的 keep-alive requests.Session"""
+        key = self.make_key(provider, base_url, api_key)
+        with self._lock:
+            return self._acquire(key, pool_connections, pool_maxsize, idle_timeout, base_url).session
+
+    def get_openai_client(
+        self,
+        provider: str,
+        base_url: Optional[str],
+        api_key: Optional[str],
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        idle_timeout: float = 300,
+    ):
+        """获取共享的 OpenAI (>=1.0) 客户端；未安装新版 SDK 时抛出 ImportError"""
+        from openai import OpenAI
+
+        key = self.make_key(provider, base_url, api_key)
+        with self._lock:
+            entry = self._acquire(key, pool_connections, pool_maxsize, idle_timeout, base_url)
+            if entry.openai_client is None:
+                kwargs: Dict[str, Any] = {"api_key": api_key, "base_url": base_url}
+                try:
+                    import httpx
+
+                    kwargs["http_client"] = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=max(1, int(pool_maxsize)),
+                            max_keepalive_connections=max(1, int(pool_connections)),
+                            keepalive_expiry=float(idle_timeout) if idle_timeout else None,
+                        ),
+                    )
+                except ImportError:
+                    pass
+                entry.openai_client = OpenAI(**kwargs)
+            return entry.openai_client
+
+    def evict_idle(self, idle_timeout: float) -> int:
+        """主动移除空闲超过 idle_timeout 秒的连接（不关闭，见模块说明），返回移除数量"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, c in self._clients.items() if now - c.last_used > idle_timeout]
+            for k in expired:
+                del self._clients[k]
+        return len(expired)
+
+    def close_all(self):
+        """关闭全部连接（进程退出时；调用方需确保没有进行中的请求）"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for c in clients:
+            c.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "providers": sorted({k[0] for k in self._clients}),
+            }
+
+
+# 全局注册表
+ai_client_registry = AIClientRegistry()
@@ -3,15 +3,53 @@
 """
 AI配置管理器（MySQL版本）
 使用MySQL数据库作为主要存储，JSON文件作为备份
+load_config 返回进程内缓存的配置快照：每隔 AI_CONFIG_VERSION_CHECK_SECONDS 秒用版本号
+（ai_configs 最大 id + JSON 备份文件 mtime）校验一次，版本变化才重新读取；本进程保存/删除时立即失效
 """
 
+import copy
 import os
 import json
+import threading
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any, Literal
+from typing import Optional, Dict, Any, List, Literal
 from .real_ai_generator import AIProvider, AIConfig
 from .mysql_db_manager import mysql_db
 
+# 连接池 / 流式输出设置及对应的环境变量（环境变量 > 已保存的配置 > AIConfig 默认值）
+CONNECTION_SETTINGS_ENV = {
+    'pool_connections': 'AI_POOL_CONNECTIONS',
+    'pool_maxsize': 'AI_POOL_MAXSIZE',
+    'pool_idle_timeout': 'AI_POOL_IDLE_TIMEOUT',
+    'stream': 'AI_STREAM',
+}
+
+
+def connection_settings(config_data: Dict[str, Any]) -> Dict[str, Any]:
+    """从配置字典与环境变量中取出连接池 / 流式输出设置；未设置或无效的项不返回（使用 AIConfig 默认值）"""
+    settings: Dict[str, Any] = {}
+    for name, env_name in CONNECTION_SETTINGS_ENV.items():
+        raw = os.environ.get(env_name, '').strip()
+        value = raw if raw else config_data.get(name)
+        if value is None or value == '':
+            continue
+        try:
+            if name == 'stream':
+                settings[name] = value if isinstance(value, bool) else str(value).strip().lower() not in ('0', 'false', 'no', 'off')
+            elif name == 'pool_idle_timeout':
+                settings[name] = max(0, int(value))  # 0 表示不回收
+            else:
+                settings[name] = max(1, int(value))
+        except (TypeError, ValueError):
+            print(f"⚠️ {env_name if raw else name} 配置无效（{value}），使用默认值")
+    return settings
+
+
+def _connection_fields(ai_config: AIConfig) -> Dict[str, Any]:
+    return {name: getattr(ai_config, name) for name in CONNECTION_SETTINGS_ENV}
+
+
 class AIConfigManagerMySQL:
     """AI配置管理器（MySQL版本）"""
     
@@ -21,11 +59,36 @@ class AIConfigManagerMySQL:
             config_dir = os.path.join(PROJECT_ROOT, "config")
         self.config_dir = config_dir
         self.config_file = os.path.join(config_dir, "ai_config.json")
+        # 备用提供商链与对冲请求设置（主提供商仍为 load_config 返回的当前配置）
+        self.provider_chain_file = os.path.join(config_dir, "ai_provider_chain.json")
         self.backup_dir = os.path.join(config_dir, "backups")
         
         # 确保目录存在
         os.makedirs(config_dir, exist_ok=True)
         os.makedirs(self.backup_dir, exist_ok=True)
+
+        # 配置快照：{'version', 'config', 'checked_at'}
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        try:
+            self.version_check_interval = float(os.environ.get("AI_CONFIG_VERSION_CHECK_SECONDS", "5"))
+        except ValueError:
+            self.version_check_interval = 5.0
+        # 备用提供商链文件缓存：(mtime, 内容)
+        self._chain_file_cache = None
+    
+    def invalidate_cache(self):
+        """使配置快照失效（保存/删除配置后调用）"""
+        with self._snapshot_lock:
+            self._snapshot = None
+    
+    def _config_version(self):
+        """当前配置版本号：MySQL 中的配置版本 + JSON 备份文件的修改时间"""
+        try:
+            json_mtime = os.path.getmtime(self.config_file)
+        except OSError:
+            json_mtime = None
+        return mysql_db.get_ai_config_version(), json_mtime
     
     def save_config(self, ai_config: AIConfig) -> Optional[Literal["mysql", "json"]]:
         """保存AI配置（MySQL + JSON 备份）。返回 'mysql'、'json'（仅本地文件）或 None（失败）。"""
@@ -38,7 +101,8 @@ class AIConfigManagerMySQL:
                 model=ai_config.model,
                 max_tokens=ai_config.max_tokens,
                 temperature=ai_config.temperature,
-                timeout=ai_config.timeout
+                timeout=ai_config.timeout,
+                **_connection_fields(ai_config)
             )
             
             # 2. 保存到JSON文件（备份）
@@ -46,6 +110,7 @@ class AIConfigManagerMySQL:
             
             # 3. 创建本地备份
             self._create_backup(ai_config)
+            self.invalidate_cache()
             
             if mysql_success:
                 print("✅ AI配置保存成功（MySQL + JSON备份）")
@@ -71,6 +136,7 @@ class AIConfigManagerMySQL:
                 'max_tokens': ai_config.max_tokens,
                 'temperature': ai_config.temperature,
                 'timeout': ai_config.timeout,
+                **_connection_fields(ai_config),
                 'saved_at': datetime.now().isoformat()
             }
             
@@ -101,6 +167,7 @@ class AIConfigManagerMySQL:
                 'max_tokens': ai_config.max_tokens,
                 'temperature': ai_config.temperature,
                 'timeout': ai_config.timeout,
+                **_connection_fields(ai_config),
                 'backup_time': datetime.now().isoformat()
             }
             
@@ -114,21 +181,32 @@ class AIConfigManagerMySQL:
             return False
     
     def load_config(self) -> Optional[AIConfig]:
-        """加载AI配置（MySQL优先，JSON备用）"""
+        """加载AI配置（优先返回内存快照；版本变化时 MySQL 优先、JSON 备用重新加载）"""
+        now = time.monotonic()
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+        if snapshot is not None and now - snapshot['checked_at'] < self.version_check_interval:
+            return copy.copy(snapshot['config'])
+        
+        version = self._config_version()
+        if snapshot is not None and version == snapshot['version']:
+            with self._snapshot_lock:
+                snapshot['checked_at'] = now
+            return copy.copy(snapshot['config'])
+        
+        config = self._load_config_uncached()
+        with self._snapshot_lock:
+            self._snapshot = {'version': version, 'config': config, 'checked_at': now}
+        return copy.copy(config)
+    
+    def _load_config_uncached(self) -> Optional[AIConfig]:
+        """从存储加载AI配置（MySQL优先，JSON备用）"""
         try:
             # 1. 尝试从MySQL加载
             config_data = mysql_db.load_ai_config()
             if config_data:
                 print("✅ 从MySQL加载配置成功")
-                return AIConfig(
-                    provider=AIProvider(config_data['provider']),
-                    api_key=config_data['api_key'],
-                    base_url=config_data.get('base_url'),
-                    model=config_data.get('model'),
-                    max_tokens=config_data.get('max_tokens', 4000),
-                    temperature=config_data.get('temperature', 0.7),
-                    timeout=config_data.get('timeout', 30)
-                )
+                return self._config_from_dict(config_data)
             
             # 2. 尝试从JSON文件加载
             config = self._load_from_json()
@@ -152,20 +230,100 @@ class AIConfigManagerMySQL:
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 config_data = json.load(f)
             
-            return AIConfig(
-                provider=AIProvider(config_data['provider']),
-                api_key=config_data['api_key'],
-                base_url=config_data.get('base_url'),
-                model=config_data.get('model'),
-                max_tokens=config_data.get('max_tokens', 4000),
-                temperature=config_data.get('temperature', 0.7),
-                timeout=config_data.get('timeout', 30)
-            )
+            return self._config_from_dict(config_data)
             
         except Exception as e:
             print(f"❌ JSON配置加载失败: {e}")
             return None
     
+    @staticmethod
+    def _config_from_dict(config_data: Dict[str, Any]) -> AIConfig:
+        """由配置字典构建 AIConfig（主配置与备用提供商链共用，新增字段只需改这里）"""
+        return AIConfig(
+            provider=AIProvider(config_data['provider']),
+            api_key=config_data['api_key'],
+            base_url=config_data.get('base_url'),
+            model=config_data.get('model'),
+            max_tokens=config_data.get('max_tokens', 4000),
+            temperature=config_data.get('temperature', 0.7),
+            timeout=config_data.get('timeout', 30),
+            **connection_settings(config_data)
+        )
+    
+    def _read_provider_chain_file(self) -> Dict[str, Any]:
+        """读取备用提供商链文件（按 mtime 缓存，未修改时不重复解析）"""
+        try:
+            mtime = os.path.getmtime(self.provider_chain_file)
+        except OSError:
+            return {}
+        cached = self._chain_file_cache
+        if cached is not None and cached[0] == mtime:
+            return copy.deepcopy(cached[1])
+        try:
+            with open(self.provider_chain_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data = data if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"❌ 备用提供商链配置读取失败: {e}")
+            return {}
+        self._chain_file_cache = (mtime, data)
+        return copy.deepcopy(data)
+    
+    def load_provider_chain(self) -> List[AIConfig]:
+        """
+        加载有序提供商链：[当前主配置, 备用1, 备用2, ...]
+        备用项来自 config/ai_provider_chain.json 的 fallbacks 列表（字段同 ai_config.json）。
+        """
+        chain: List[AIConfig] = []
+        primary = self.load_config()
+        if primary and primary.api_key:
+            chain.append(primary)
+        for item in self._read_provider_chain_file().get('fallbacks') or []:
+            try:
+                if not item.get('api_key') or item.get('enabled') is False:
+                    continue
+                chain.append(self._config_from_dict(item))
+            except Exception as e:
+                print(f"⚠️ 跳过无效的备用提供商配置 {item.get('provider')}: {e}")
+        return chain
+    
+    def load_hedge_settings(self) -> Dict[str, Any]:
+        """对冲请求设置：enabled、min_delay（秒）、quantile（按主提供商延迟分位数触发）"""
+        hedge = self._read_provider_chain_file().get('hedge') or {}
+        return {
+            'enabled': bool(hedge.get('enabled', False)),
+            'min_delay': float(hedge.get('min_delay', 15)),
+            'quantile': float(hedge.get('quantile', 0.95)),
+        }
+    
+    def save_provider_chain(self, fallbacks: List[AIConfig], hedge: Optional[Dict[str, Any]] = None) -> bool:
+        """保存备用提供商链（JSON 文件，与 ai_config.json 备份同目录）"""
+        try:
+            data = self._read_provider_chain_file()
+            data['fallbacks'] = [
+                {
+                    'provider': c.provider.value,
+                    'api_key': c.api_key,
+                    'base_url': c.base_url,
+                    'model': c.model,
+                    'max_tokens': c.max_tokens,
+                    'temperature': c.temperature,
+                    'timeout': c.timeout,
+                    **_connection_fields(c),
+                }
+                for c in fallbacks
+            ]
+            if hedge is not None:
+                data['hedge'] = hedge
+            data['saved_at'] = datetime.now().isoformat()
+            with open(self.provider_chain_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"✅ 备用提供商链保存成功（{len(fallbacks)} 个）")
+            return True
+        except Exception as e:
+            print(f"❌ 备用提供商链保存失败: {e}")
+            return False
+    
     def get_config_status(self) -> Dict[str, Any]:
         """获取配置状态"""
         try:
@@ -205,6 +363,7 @@ class AIConfigManagerMySQL:
             # 删除JSON文件
             if os.path.exists(self.config_file):
                 os.remove(self.config_file)
+            self.invalidate_cache()
             
             print("✅ AI配置删除成功")
             return True
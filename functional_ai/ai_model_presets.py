@@ -6,6 +6,7 @@
 
 from __future__ import annotations
 
+import os
 from typing import Any, Dict, List, Optional
 
 # provider 值须与 functional_ai.real_ai_generator.AIProvider 的 .value 一致
@@ -189,3 +190,71 @@ def list_presets_for_template(lang: str) -> List[Dict[str, Any]]:
         label = p["label_en"] if use_en else p["label_zh"]
         out.append({"id": p["id"], "label": label})
     return out
+
+
+# ---------------------------------------------------------------------------
+# 限流配置：按 provider 的默认值 + 按 (provider, model) 覆盖
+# rpm/tpm 为 0 表示不限；数值为各厂商常见免费/入门档位的保守估计，付费档可按需调高。
+# 也可用环境变量 AI_RATE_LIMIT_RPM / AI_RATE_LIMIT_TPM / AI_MAX_CONCURRENCY 全局覆盖。
+# ---------------------------------------------------------------------------
+
+DEFAULT_RATE_LIMIT: Dict[str, Any] = {
+    "rpm": 60,
+    "tpm": 0,
+    "max_concurrency": 8,
+    "initial_concurrency": 4,
+}
+
+PROVIDER_RATE_LIMITS: Dict[str, Dict[str, Any]] = {
+    "openai": {"rpm": 500, "tpm": 200000, "max_concurrency": 16, "initial_concurrency": 6},
+    "azure_openai": {"rpm": 300, "tpm": 120000, "max_concurrency": 12},
+    "anthropic": {"rpm": 50, "tpm": 40000, "max_concurrency": 8},
+    "deepseek": {"rpm": 60, "tpm": 0, "max_concurrency": 8},
+    "moonshot": {"rpm": 20, "tpm": 32000, "max_concurrency": 3, "initial_concurrency": 2},
+    "google_gemini": {"rpm": 15, "tpm": 1000000, "max_concurrency": 4, "initial_concurrency": 2},
+    "baidu_ernie": {"rpm": 60, "tpm": 0},
+    "ernie": {"rpm": 60, "tpm": 0},
+    "alibaba_qwen": {"rpm": 60, "tpm": 100000},
+    "qwen": {"rpm": 60, "tpm": 100000},
+    "zhipu_glm": {"rpm": 60, "tpm": 0, "max_concurrency": 5},
+    "chatglm": {"rpm": 60, "tpm": 0, "max_concurrency": 5},
+}
+
+MODEL_RATE_LIMITS: Dict[tuple, Dict[str, Any]] = {
+    ("deepseek", "deepseek-reasoner"): {"max_concurrency": 4, "initial_concurrency": 2},
+    ("openai", "o3-mini"): {"rpm": 100},
+    ("moonshot", "moonshot-v1-128k"): {"tpm": 128000},
+}
+
+
+def get_rate_limits(provider: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """合并默认值、provider 级、model 级与环境变量覆盖，按进程数均分后返回 rpm/tpm/max_concurrency/initial_concurrency。"""
+    cfg = dict(DEFAULT_RATE_LIMIT)
+    cfg.update(PROVIDER_RATE_LIMITS.get((provider or "").strip(), {}))
+    cfg.update(MODEL_RATE_LIMITS.get(((provider or "").strip(), (model or "").strip()), {}))
+    for key, env in (("rpm", "AI_RATE_LIMIT_RPM"), ("tpm", "AI_RATE_LIMIT_TPM"),
+                     ("max_concurrency", "AI_MAX_CONCURRENCY")):
+        raw = os.environ.get(env, "").strip()
+        if raw:
+            try:
+                cfg[key] = int(raw)
+            except ValueError:
+                pass
+    shares = rate_limit_processes()
+    if shares > 1:
+        # 限流器是进程级的：多个进程共用同一份提供商额度时，每个进程只取其中一份
+        for key in ("rpm", "tpm"):
+            if cfg.get(key):
+                cfg[key] = max(cfg[key] / shares, 1)
+        cfg["max_concurrency"] = max(cfg["max_concurrency"] // shares, 1)
+        cfg["initial_concurrency"] = max(cfg.get("initial_concurrency", 4) // shares, 1)
+    cfg["initial_concurrency"] = min(cfg.get("initial_concurrency", 4), cfg["max_concurrency"])
+    return cfg
+
+
+def rate_limit_processes() -> int:
+    """共用同一份提供商额度的进程数（AI_RATE_LIMIT_PROCESSES，默认 1）"""
+    try:
+        return max(int(os.environ.get("AI_RATE_LIMIT_PROCESSES", "1") or 1), 1)
+    except ValueError:
+        return 1
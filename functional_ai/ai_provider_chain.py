@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多提供商故障转移与对冲请求
+- 有序提供商链：主提供商失败或熔断时依次尝试备用提供商
+- 每个提供商一个熔断器：连续失败达到阈值后熔断一段时间，再半开放行一次试探
+- 可选对冲：主提供商超过其 p95 延迟仍未返回（流式则为仍未收到首包）时，
+  向下一个提供商并行发出相同请求，取先返回的有效结果，放弃（并尽量中止）另一路
+- 流式输出在切换提供商（故障转移或对冲中另一路接手）时调用 on_text.reset()（若提供），
+  消费方丢弃已收到的部分文本，随后收到新一路的完整输出
+提供商链由 config_manager.load_provider_chain() 加载（config/ai_provider_chain.json）。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .ai_client_pool import AIClientRegistry
+
+
+class CircuitOpenError(Exception):
+    """提供商链中所有提供商均已熔断或失败"""
+
+
+class _HedgeCancelled(Exception):
+    """对冲中落败的一路被中止（流式回调中抛出以关闭连接）"""
+
+
+class CircuitBreaker:
+    """简单三态熔断器：closed → open（冷却 reset_timeout 秒）→ half_open（放行一次试探）"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """最近 N 次成功调用的延迟，用于计算对冲触发的分位数"""
+
+    def __init__(self, size: int = 100):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < 5:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(int(q * len(ordered)), len(ordered) - 1)
+        return ordered[idx]
+
+
+_breakers: Dict[Any, CircuitBreaker] = {}
+_latencies: Dict[Any, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def hedge_pool_size() -> int:
+    """
+    对冲线程池大小，按本进程实际可能并发的 AI 调用数计算：
+    同时运行的任务数 × 每个任务的并发调用数（功能点并发 AI_FP_CONCURRENCY，准备阶段最多 3 路），
+    每个调用最多占用主路、备路与一条尚未超时返回的落败路共 3 个线程
+    """
+    jobs = max(_env_int("AI_MAX_ACTIVE_JOBS", 4), _env_int("AI_EMBEDDED_WORKERS", 2),
+               _env_int("AI_WORKER_THREADS", 2), 1)
+    per_job = max(_env_int("AI_FP_CONCURRENCY", 4), 3)
+    return max(16, 3 * jobs * per_job)
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=hedge_pool_size(), thread_name_prefix="ai-hedge")
+        return _hedge_pool
+
+
+def _reset_stream(on_text: Optional[Callable[[str], None]]) -> None:
+    """通知流式消费方丢弃已收到的部分文本（切换到另一路输出前调用）"""
+    reset = getattr(on_text, "reset", None)
+    if reset is not None:
+        reset()
+
+
+def _provider_key(generator) -> Any:
+    cfg = generator.ai_config
+    return AIClientRegistry.make_key(cfg.provider.value, f"{cfg.base_url or ''}#{generator.model}", cfg.api_key)
+
+
+def get_breaker(generator) -> CircuitBreaker:
+    key = _provider_key(generator)
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker()
+        return _breakers[key]
+
+
+def get_latency_tracker(generator) -> LatencyTracker:
+    key = _provider_key(generator)
+    with _registry_lock:
+        if key not in _latencies:
+            _latencies[key] = LatencyTracker()
+        return _latencies[key]
+
+
+class FailoverAICaller:
+    """按顺序在多个 RealAITestCaseGenerator 间故障转移的 AI 调用器（接口同 call_ai_api）"""
+
+    def __init__(self, generators: List[Any], hedge_enabled: bool = False,
+                 hedge_min_delay: float = 15.0, hedge_quantile: float = 0.95):
+        if not generators:
+            raise ValueError("提供商链为空")
+        self.generators = generators
+        for g in generators:
+            g.raise_on_failure = True
+        self.hedge_enabled = hedge_enabled and len(generators) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_quantile = hedge_quantile
+        primary = generators[0]
+        # 供日志与 supports_streaming 判断使用，与主提供商一致
+        self.ai_config = primary.ai_config
+        self.model = primary.model
+
+    @property
+    def use_response_cache(self) -> bool:
+        return self.generators[0].use_response_cache
+
+    @use_response_cache.setter
+    def use_response_cache(self, value: bool):
+        for g in self.generators:
+            g.use_response_cache = value
+
+    def supports_streaming(self) -> bool:
+        return self.generators[0].supports_streaming()
+
+    def _invoke(self, generator, prompt, system_prompt, use_cache, on_text) -> str:
+        """调用单个提供商并更新熔断器/延迟统计；空响应视为失败"""
+        breaker = get_breaker(generator)
+        start = time.monotonic()
+        try:
+            result = generator.call_ai_api(prompt, system_prompt, use_cache=use_cache, on_text=on_text)
+            if not result or not result.strip():
+                raise Exception("空响应")
+        except _HedgeCancelled:
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        get_latency_tracker(generator).add(time.monotonic() - start)
+        return result
+
+    def _hedge_delay(self, generator) -> float:
+        p = get_latency_tracker(generator).quantile(self.hedge_quantile)
+        return max(self.hedge_min_delay, p or 0.0)
+
+    def _call_hedged(self, primary, secondary, prompt, system_prompt, use_cache, on_text,
+                     launched: List[str]) -> str:
+        """
+        对冲调用：主路开始执行后超过 p95 延迟（流式为未收到首包）仍未返回时并发备路，取先成功者。
+        流式输出同一时刻只转发一路（owner），另一路的文本先缓存；owner 失败或另一路先成功时，
+        由另一路接手：先 reset 消费方，再补发其缓存的文本。只有在某一路成功后才中止其余各路。
+        launched 中记录实际发出请求的各路（"secondary" 表示备路也已尝试）。
+        """
+        state: Dict[str, Any] = {"owner": None}
+        buffers: Dict[str, List[str]] = {"primary": [], "secondary": []}
+        cancelled = set()
+        first_byte = threading.Event()
+        started = threading.Event()
+        lock = threading.Lock()  # 保护 owner/缓存，并保证转发给 on_text 的顺序
+
+        def lane_callback(lane: str) -> Optional[Callable[[str], None]]:
+            if on_text is None:
+                return None  # 非流式调用不改为流式
+
+            def cb(delta: str):
+                with lock:
+                    if lane in cancelled:
+                        raise _HedgeCancelled()
+                    if state["owner"] is None:
+                        state["owner"] = lane
+                    if state["owner"] != lane:
+                        buffers[lane].append(delta)
+                        return
+                    first_byte.set()
+                    on_text(delta)
+            return cb
+
+        def hand_over(lane: str):
+            """由 lane 接手流式输出；需在锁内调用"""
+            if on_text is None or state["owner"] == lane:
+                return
+            if state["owner"] is not None:
+                _reset_stream(on_text)
+            state["owner"] = lane
+            for delta in buffers[lane]:
+                on_text(delta)
+            buffers[lane].clear()
+
+        def run_primary():
+            started.set()
+            return self._invoke(primary, prompt, system_prompt, use_cache, lane_callback("primary"))
+
+        pool = _get_hedge_pool()
+        primary_future = pool.submit(run_primary)
+        launched.append("primary")
+        # 对冲计时从主路真正开始执行算起，线程池排队时间不计入
+        while not started.wait(0.5):
+            if primary_future.done():
+                break
+        delay = self._hedge_delay(primary)
+        done, _ = wait([primary_future], timeout=delay)
+        if done or first_byte.is_set() or not get_breaker(secondary).allow():
+            return primary_future.result()
+
+        print(f"🏁 主提供商 {delay:.1f}秒未返回，对冲请求 {secondary.ai_config.provider.value}/{secondary.model}")
+        secondary_future = pool.submit(
+            self._invoke, secondary, prompt, system_prompt, use_cache, lane_callback("secondary"))
+        launched.append("secondary")
+        lanes = {primary_future: "primary", secondary_future: "secondary"}
+        pending = set(lanes)
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                lane = lanes[fut]
+                try:
+                    result = fut.result()
+                except BaseException as e:
+                    last_error = e
+                    with lock:
+                        if state["owner"] == lane and pending:
+                            print(f"   ↪️ 对冲中 {lane} 失败，另一路接手流式输出")
+                            hand_over(lanes[next(iter(pending))])
+                    continue
+                with lock:
+                    hand_over(lane)
+                    cancelled.update(lanes[f] for f in pending)
+                print(f"   ✅ 对冲胜出: {lane}")
+                return result
+        raise last_error or CircuitOpenError("对冲请求均失败")
+
+    def call_ai_api(self, prompt: str, system_prompt: str = None, use_cache: Optional[bool] = None,
+                    on_text: Optional[Callable[[str], None]] = None) -> str:
+        errors: List[str] = []
+        candidates = [g for g in self.generators]
+        i = 0
+        while i < len(candidates):
+            generator = candidates[i]
+            name = f"{generator.ai_config.provider.value}/{generator.model}"
+            if not get_breaker(generator).allow():
+                errors.append(f"{name}: 熔断中")
+                i += 1
+                continue
+            secondary = candidates[i + 1] if self.hedge_enabled and i + 1 < len(candidates) else None
+            launched: List[str] = []
+            try:
+                if secondary is not None:
+                    return self._call_hedged(generator, secondary, prompt, system_prompt, use_cache, on_text,
+                                             launched)
+                return self._invoke(generator, prompt, system_prompt, use_cache, on_text)
+            except Exception as e:
+                # 对冲中备路也已失败：两路一并跳过，不再重复调用刚失败的备路
+                step = 2 if "secondary" in launched else 1
+                if step == 2:
+                    name = f"{name} + {secondary.ai_config.provider.value}/{secondary.model}"
+                errors.append(f"{name}: {e}")
+                if i + step < len(candidates):
+                    print(f"🔀 提供商 {name} 失败，切换到备用提供商")
+                    _reset_stream(on_text)
+            i += step
+        raise CircuitOpenError("所有AI提供商均不可用: " + "; ".join(errors))
+
+
+def build_failover_caller(primary_generator, custom_headers=None) -> Optional[FailoverAICaller]:
+    """
+    若配置了备用提供商链，则以 primary_generator 为首构建故障转移调用器；否则返回 None
+    """
+    from .ai_config_manager_mysql import config_manager
+    from .real_ai_generator import RealAITestCaseGenerator
+
+    try:
+        chain = config_manager.load_provider_chain()
+        hedge = config_manager.load_hedge_settings()
+    except Exception as e:
+        print(f"⚠️ 加载备用提供商链失败: {e}")
+        return None
+    if len(chain) <= 1:
+        return None
+    generators = [primary_generator]
+    for cfg in chain[1:]:
+        try:
+            g = RealAITestCaseGenerator(cfg, custom_headers)
+            g.use_response_cache = primary_generator.use_response_cache
+            generators.append(g)
+        except Exception as e:
+            print(f"⚠️ 备用提供商 {cfg.provider.value} 初始化失败: {e}")
+    if len(generators) <= 1:
+        return None
+    print(f"🔗 已启用提供商链: {' → '.join(g.ai_config.provider.value for g in generators)}"
+          f"{'（对冲请求）' if hedge['enabled'] else ''}")
+    return FailoverAICaller(
+        generators,
+        hedge_enabled=hedge["enabled"],
+        hedge_min_delay=hedge["min_delay"],
+        hedge_quantile=hedge["quantile"],
+    )
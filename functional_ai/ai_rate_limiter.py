@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 提供商限流与自适应并发
+- 每个 (provider, model) 一组令牌桶：请求数/分钟 (RPM) 与 Token 数/分钟 (TPM)
+- AIMD 并发控制：成功时加性增大并发上限，遇 429 或请求超时时乘性减小
+  （延迟只作观测：同一 provider/model 下提取、梳理与逐功能点生成的耗时相差数倍，不能据此判断拥塞）
+- 遵循 Retry-After：收到 429 后整组暂停到指定时间
+限额配置见 ai_model_presets.get_rate_limits（多个进程共用额度时按 AI_RATE_LIMIT_PROCESSES 均分到各进程）。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from .ai_model_presets import get_rate_limits
+
+
+class AIRateLimitError(Exception):
+    """提供商持续限流（429），重试仍未成功"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """粗略估算 token 数：中日韩字符约 1 token/字，其余约 4 字符/token"""
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        cjk = sum(1 for ch in text if "一" <= ch <= "鿿")
+        total += cjk + (len(text) - cjk) // 4
+    return max(total, 1)
+
+
+class TokenBucket:
+    """线程安全令牌桶；capacity 为突发上限，rate 为每秒补充量。允许透支（实际用量超过预估时）。"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = max(float(per_minute), 0.0) / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        if self.rate <= 0:
+            return True
+        amount = min(float(amount), self.capacity)  # 单次请求超过桶容量时按满桶处理，避免永远等待
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(self._paused_until - now, 0.0)
+                if wait <= 0 and self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                if wait <= 0:
+                    wait = (amount - self._tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def adjust(self, delta: float):
+        """按实际用量修正（delta>0 追加扣减，<0 归还）"""
+        if self.rate <= 0 or not delta:
+            return
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + max(seconds, 0.0))
+            self._cond.notify_all()
+
+
+class AIMDConcurrency:
+    """加性增 / 乘性减的并发上限控制器"""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 16,
+                 decrease_factor: float = 0.5, timeout_decrease_factor: float = 0.8):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(max(int(initial), self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.timeout_decrease_factor = timeout_decrease_factor
+        self._in_flight = 0
+        self._avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight = max(self._in_flight - 1, 0)
+            self._cond.notify()
+
+    def _decrease(self, factor: float):
+        """乘性减；同一冷却窗口内只降一次，避免一批并发 429 把上限压到最低"""
+        now = time.monotonic()
+        if now - self._last_decrease < 2.0:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * factor)
+
+    def on_success(self, latency: float):
+        with self._cond:
+            avg = self._avg_latency
+            self._avg_latency = latency if avg is None else avg * 0.9 + latency * 0.1
+            self.limit = min(float(self.maximum), self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self._decrease(self.decrease_factor)
+
+    def on_timeout(self):
+        with self._cond:
+            self._decrease(self.timeout_decrease_factor)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "avg_latency": round(self._avg_latency or 0.0, 2),
+            }
+
+
+class ProviderLimiter:
+    """单个 (provider, model) 的限流器组合"""
+
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int, initial_concurrency: int):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AIMDConcurrency(initial_concurrency, 1, max_concurrency)
+        self.throttled = 0
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0):
+        """占用一次调用额度；with 块内正常返回视为成功，超时异常使并发上限乘性减小"""
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and estimated_tokens:
+            self.tokens.acquire(estimated_tokens)
+        self.concurrency.acquire()
+        start = time.monotonic()
+        try:
+            yield self
+        except BaseException as e:
+            self.concurrency.release()
+            if is_timeout_error(e):
+                self.concurrency.on_timeout()
+            raise
+        self.concurrency.release()
+        self.concurrency.on_success(time.monotonic() - start)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        if self.tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def on_throttle(self, retry_after: Optional[float]):
+        self.throttled += 1
+        self.concurrency.on_throttle()
+        wait = retry_after if retry_after and retry_after > 0 else 2.0
+        if self.requests:
+            self.requests.pause(wait)
+        if self.tokens:
+            self.tokens.pause(wait)
+        if not self.requests and not self.tokens:
+            time.sleep(wait)
+
+
+class RateLimiterRegistry:
+    """进程级限流器注册表，按 (provider, model) 共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+
+    def get(self, provider: str, model: Optional[str]) -> ProviderLimiter:
+        key = (provider or "", model or "")
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                cfg = get_rate_limits(provider, model)
+                limiter = ProviderLimiter(
+                    rpm=cfg.get("rpm", 0),
+                    tpm=cfg.get("tpm", 0),
+                    max_concurrency=cfg.get("max_concurrency", 8),
+                    initial_concurrency=cfg.get("initial_concurrency", 4),
+                )
+                self._limiters[key] = limiter
+            return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._limiters.items())
+        return {
+            f"{p}/{m}": dict(l.concurrency.snapshot(), throttled=l.throttled)
+            for (p, m), l in items
+        }
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期）"""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+
+        dt = parsedate_to_datetime(str(value))
+        return max(dt.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def throttle_retry_after(exc: BaseException) -> Optional[float]:
+    """
+    若异常表示 429 限流，返回建议等待秒数（无 Retry-After 时为 0）；否则返回 None。
+    兼容 requests.HTTPError 与 openai>=1.0 的 RateLimitError / APIStatusError。
+    """
+    if isinstance(exc, AIRateLimitError):
+        return exc.retry_after or 0.0
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        value = None
+    return parse_retry_after(value) or 0.0
+
+
+def is_timeout_error(exc: BaseException) -> bool:
+    """
+    异常（或其 __cause__ / __context__ 链）是否为请求超时。
+    兼容 requests.Timeout、openai>=1.0 的 APITimeoutError、httpx.TimeoutException 与内置 TimeoutError。
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+# 全局注册表
+rate_limiter_registry = RateLimiterRegistry()
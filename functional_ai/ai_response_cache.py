@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 响应内容寻址缓存
+键为 hash(provider, model, temperature, system_prompt, prompt)；
+内存 LRU + data/ai_response_cache 磁盘两级，支持 TTL 与容量淘汰。
+仅在请求显式开启时使用（重新生成同一需求时避免重复付费），默认仍走实时采样。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .paths import PROJECT_ROOT
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "ai_response_cache")
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class AIResponseCache:
+    """两级 LRU 响应缓存（线程安全）"""
+
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_memory_entries: int = 256,
+        max_disk_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created_at, response)
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(provider: str, model: Optional[str], temperature: Any,
+                 system_prompt: Optional[str], prompt: str) -> str:
+        payload = json.dumps(
+            [provider or "", model or "", temperature, system_prompt or "", prompt or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, response: str):
+        """写入内存 LRU；需在锁内调用"""
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if not self._expired(item[0]):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            created_at = float(data.get("created_at", 0))
+            response = data.get("response")
+        except (OSError, ValueError, AttributeError):
+            created_at, response = 0.0, None
+
+        with self._lock:
+            if response is not None and not self._expired(created_at):
+                self._remember(key, created_at, response)
+                self.hits += 1
+                self.disk_hits += 1
+                try:
+                    os.utime(path, None)  # 以 mtime 记录最近使用，供磁盘 LRU 淘汰
+                except OSError:
+                    pass
+                return response
+            self.misses += 1
+        if response is not None:
+            self._remove_file(path)
+        return None
+
+    def put(self, key: str, response: str):
+        if not isinstance(response, str) or not response:
+            return
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, response)
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp.{threading.get_ident()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"created_at": created_at, "response": response}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️ AI响应缓存落盘失败: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self.prune()
+
+    def _remove_file(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    def prune(self):
+        """清理过期文件，并按最近使用时间淘汰到容量上限以下"""
+        entries = []
+        total = 0
+        now = time.time()
+        removed = 0
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".json") and not (self.ttl_seconds and now - st.st_mtime > self.ttl_seconds):
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+                elif name.endswith(".json") or now - st.st_mtime > 3600:
+                    # 过期条目或残留的临时文件
+                    removed += 1 if self._remove_file(path) else 0
+        if total > self.max_disk_bytes:
+            entries.sort()
+            target = int(self.max_disk_bytes * 0.9)
+            for _mtime, size, path in entries:
+                if total <= target:
+                    break
+                if self._remove_file(path):
+                    total -= size
+                    removed += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+# 全局缓存实例（参数可通过环境变量调整）
+ai_response_cache = AIResponseCache(
+    ttl_seconds=_env_number("AI_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+    max_memory_entries=_env_number("AI_CACHE_MEMORY_ENTRIES", 256),
+    max_disk_bytes=_env_number("AI_CACHE_DISK_MAX_MB", 200) * 1024 * 1024,
+)
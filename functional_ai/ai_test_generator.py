@@ -15,6 +15,8 @@ from datetime import datetime
 # 导入基础生成器
 from .test_case_generator import TestCaseGenerator, TestCase, Priority, TestMethod
 from .comprehensive_test_generator import RequirementAnalysis
+from .keyword_engine import KeywordHits, family_names, scan_requirement
+from .case_dedup import deduplicate_cases
 
 class AITestMethod(Enum):
     """AI增强测试方法"""
@@ -40,6 +42,14 @@ class AIAnalysisResult:
     security_risks: List[str]  # 安全风险
     usability_factors: List[str]  # 可用性因素
 
+def _matched_labels(hits: KeywordHits, prefix: str) -> List[str]:
+    """prefix 下命中的关键词族，返回族名中的标签（如 risk.支付安全 -> 支付安全），按定义顺序"""
+    return [name[len(prefix):] for name in family_names(prefix) if hits.has(name)]
+
+
+_RULE_PHRASE = re.compile(r'规则|条件|如果|当.*时')  # 业务规则短语（「当…时」不跨行）
+
+
 class AITestCaseGenerator(TestCaseGenerator):
     """AI增强测试用例生成器"""
     
@@ -141,12 +151,13 @@ class AITestCaseGenerator(TestCaseGenerator):
     
     def _calculate_complexity(self, text: str) -> float:
         """计算需求复杂度"""
+        hits = scan_requirement(text)
         factors = {
             "length": len(text) / 10000,  # 文本长度
-            "rules": len(re.findall(r'规则|条件|如果|当.*时', text)) / 10,  # 业务规则数量
-            "entities": len(re.findall(r'用户|订单|商品|账户|数据', text)) / 10,  # 实体数量
-            "integrations": len(re.findall(r'接口|API|第三方|集成', text)) / 5,  # 集成点
-            "states": len(re.findall(r'状态|阶段|步骤', text)) / 8  # 状态数量
+            "rules": len(_RULE_PHRASE.findall(hits.text)) / 10,  # 业务规则数量
+            "entities": hits.count("complexity.entities") / 10,  # 实体数量
+            "integrations": hits.count("complexity.integrations") / 5,  # 集成点
+            "states": hits.count("complexity.states") / 8  # 状态数量
         }
         
         # 加权计算复杂度
@@ -156,30 +167,8 @@ class AITestCaseGenerator(TestCaseGenerator):
         return min(complexity, 1.0)
     
     def _identify_risk_areas(self, text: str) -> List[str]:
-        """识别风险区域"""
-        risks = []
-        
-        # 安全风险
-        if re.search(r'登录|密码|认证|权限', text, re.IGNORECASE):
-            risks.append("身份认证安全")
-        if re.search(r'支付|金额|交易', text, re.IGNORECASE):
-            risks.append("支付安全")
-        if re.search(r'上传|文件|附件', text, re.IGNORECASE):
-            risks.append("文件上传安全")
-        
-        # 性能风险
-        if re.search(r'大量|批量|并发|高频', text, re.IGNORECASE):
-            risks.append("高并发性能")
-        if re.search(r'查询|搜索|检索', text, re.IGNORECASE):
-            risks.append("查询性能")
-        
-        # 数据风险
-        if re.search(r'数据库|存储|备份', text, re.IGNORECASE):
-            risks.append("数据一致性")
-        if re.search(r'同步|异步|队列', text, re.IGNORECASE):
-            risks.append("数据同步")
-        
-        return risks
+        """识别风险区域（安全、性能、数据三类，关键词族见 keyword_engine 的 risk.*）"""
+        return _matched_labels(scan_requirement(text), "risk.")
     
     def _extract_critical_paths(self, text: str) -> List[str]:
         """提取关键路径"""
@@ -197,22 +186,19 @@ class AITestCaseGenerator(TestCaseGenerator):
             paths.extend(matches)
         
         # 识别关键业务路径
-        if re.search(r'注册|登录', text, re.IGNORECASE):
-            paths.append("用户注册登录路径")
-        if re.search(r'下单|支付|购买', text, re.IGNORECASE):
-            paths.append("订单支付路径")
-        if re.search(r'审核|审批|流转', text, re.IGNORECASE):
-            paths.append("审批流转路径")
+        paths.extend(_matched_labels(scan_requirement(text), "path."))
         
         return list(set(paths))
     
     def _analyze_data_patterns(self, text: str) -> List[Dict]:
         """分析数据模式"""
         patterns = []
+        hits = scan_requirement(text)
         
         # 识别输入模式
+        input_names = set(hits.found("data.input"))
         for pattern_name, regex in self.pattern_library["input_patterns"].items():
-            if pattern_name in text.lower():
+            if pattern_name in input_names:
                 patterns.append({
                     "type": "input_validation",
                     "name": pattern_name,
@@ -221,7 +207,7 @@ class AITestCaseGenerator(TestCaseGenerator):
                 })
         
         # 识别数据类型
-        if re.search(r'数字|金额|价格|数量', text, re.IGNORECASE):
+        if hits.has("data.numeric"):
             patterns.append({
                 "type": "numeric",
                 "name": "数值类型",
@@ -229,7 +215,7 @@ class AITestCaseGenerator(TestCaseGenerator):
                 "risk_level": "high"
             })
         
-        if re.search(r'日期|时间', text, re.IGNORECASE):
+        if hits.has("data.datetime"):
             patterns.append({
                 "type": "datetime",
                 "name": "日期时间",
@@ -280,66 +266,19 @@ class AITestCaseGenerator(TestCaseGenerator):
     
     def _identify_integration_points(self, text: str) -> List[str]:
         """识别集成点"""
-        integrations = []
-        
-        integration_keywords = [
-            "API", "接口", "第三方", "外部系统", "微服务",
-            "数据库", "缓存", "消息队列", "文件系统"
-        ]
-        
-        for keyword in integration_keywords:
-            if keyword in text:
-                integrations.append(f"{keyword}集成")
-        
-        return integrations
+        return [f"{keyword}集成" for keyword in scan_requirement(text).found("integration")]
     
     def _identify_performance_concerns(self, text: str) -> List[str]:
         """识别性能关注点"""
-        concerns = []
-        
-        if re.search(r'响应时间|延迟|速度', text, re.IGNORECASE):
-            concerns.append("响应时间性能")
-        if re.search(r'并发|同时|批量', text, re.IGNORECASE):
-            concerns.append("并发处理性能")
-        if re.search(r'大数据|海量|TB|GB', text, re.IGNORECASE):
-            concerns.append("大数据处理性能")
-        if re.search(r'内存|CPU|磁盘', text, re.IGNORECASE):
-            concerns.append("资源使用性能")
-        
-        return concerns
+        return _matched_labels(scan_requirement(text), "performance.")
     
     def _identify_security_risks(self, text: str) -> List[str]:
         """识别安全风险"""
-        risks = []
-        
-        security_keywords = {
-            "注入攻击": ["输入", "查询", "SQL"],
-            "跨站脚本": ["输出", "显示", "HTML"],
-            "权限控制": ["权限", "角色", "访问"],
-            "数据泄露": ["敏感", "隐私", "加密"],
-            "会话安全": ["登录", "会话", "token"]
-        }
-        
-        for risk_type, keywords in security_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                risks.append(risk_type)
-        
-        return risks
+        return _matched_labels(scan_requirement(text), "security.")
     
     def _identify_usability_factors(self, text: str) -> List[str]:
         """识别可用性因素"""
-        factors = []
-        
-        if re.search(r'界面|UI|用户体验', text, re.IGNORECASE):
-            factors.append("界面友好性")
-        if re.search(r'提示|帮助|引导', text, re.IGNORECASE):
-            factors.append("操作引导")
-        if re.search(r'错误|异常|失败', text, re.IGNORECASE):
-            factors.append("错误处理")
-        if re.search(r'移动|手机|响应式', text, re.IGNORECASE):
-            factors.append("移动端适配")
-        
-        return factors
+        return _matched_labels(scan_requirement(text), "usability.")
 
     def generate_ai_enhanced_test_cases(self, requirement_text: str,
                                       historical_defects: List[str] = None) -> List[TestCase]:
@@ -763,25 +702,10 @@ class AITestCaseGenerator(TestCaseGenerator):
 
         return patterns
 
-    def _deduplicate_and_optimize(self, test_cases: List[TestCase]) -> List[TestCase]:
-        """去重和优化测试用例"""
-        # 基于测试步骤的相似度去重
-        unique_cases = []
-        seen_signatures = set()
-
-        for case in test_cases:
-            # 创建测试用例签名
-            signature = f"{case.module}_{case.submodule}_{hash(case.test_steps) % 10000}"
-
-            if signature not in seen_signatures:
-                seen_signatures.add(signature)
-                unique_cases.append(case)
-            else:
-                # 如果重复，保留优先级更高的
-                existing_case = next(c for c in unique_cases if f"{c.module}_{c.submodule}_{hash(c.test_steps) % 10000}" == signature)
-                if case.priority.value < existing_case.priority.value:  # P0 < P1 < P2
-                    unique_cases.remove(existing_case)
-                    unique_cases.append(case)
+    def _deduplicate_and_optimize(self, test_cases: List[TestCase],
+                                  fields: Optional[List[str]] = None) -> List[TestCase]:
+        """去重和优化测试用例（fields 为身份字段，默认 模块 + 子模块 + 测试步骤，见 case_dedup）"""
+        unique_cases = deduplicate_cases(test_cases, fields)
 
         # 按优先级和模块排序
         unique_cases.sort(key=lambda x: (x.priority.value, x.module, x.submodule))
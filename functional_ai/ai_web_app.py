@@ -11,6 +11,7 @@ from flask import Flask, render_template, request, jsonify, send_file, flash, re
 import os
 import json
 import time
+import dataclasses
 import pickle
 import threading
 import uuid
@@ -20,11 +21,19 @@ from .paths import PROJECT_ROOT
 
 load_dotenv(os.path.join(PROJECT_ROOT, ".env"))
 
-from .ai_test_generator import AITestMethod
+from .ai_test_generator import AIAnalysisResult, AITestMethod
 from .comprehensive_test_generator import ComprehensiveTestGenerator
 from .real_ai_generator import RealAITestCaseGenerator, AIProvider, AIConfig
 from .test_case_generator import TestCaseGenerator
-from .ai_config_manager_mysql import config_manager  # 使用MySQL版本
+from .test_case_table import TestCaseTable
+from .generation_checkpoint import GenerationCheckpoint, input_fingerprint
+from .result_store import (
+    PartialCaseLog,
+    read_partial_cases,
+    read_result_page,
+    write_result_file,
+)
+from .ai_config_manager_mysql import CONNECTION_SETTINGS_ENV, config_manager  # 使用MySQL版本
 from .ai_model_presets import get_preset, AI_MODEL_PRESETS
 from .mysql_db_manager import mysql_db  # 导入MySQL数据库管理器
 from .generation_history import (
@@ -33,8 +42,12 @@ from .generation_history import (
     load_request_snapshot,
     persist_request_snapshot,
     scan_active_jobs,
+    TERMINAL_STATUSES,
     update_job,
 )
+from .job_queue import JOB_QUEUED, JOB_RUNNING, QueueFullError, job_queue
+from .progress_bus import progress_bus
+from .job_worker import ensure_job_workers
 from .professional_test_generator import ProfessionalTestGenerator
 from .translations import get_all_texts, get_text
 
@@ -50,6 +63,11 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "ai_test_case_generator_secr
 progress_tracker_lock = threading.Lock()
 progress_tracker = {}  # {session_id: {progress, total, status, message, start_time}}
 generation_results = {}  # {session_id: {test_cases, ai_analysis}} - 存储实际结果
+_progress_mtimes = {}  # {generation_id: 内存副本对应的进度文件 mtime}，用于发现其他进程写入的新进度
+
+# SSE：空闲心跳间隔（秒）与断线重连间隔（毫秒）
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
 
 # 生成进度落盘：避免 Flask debug 重载或进程重启导致「会话不存在」
 GENERATION_STATE_DIR = os.path.join(PROJECT_ROOT, "data", "generation_state")
@@ -62,20 +80,37 @@ def _ensure_generation_state_dir():
 def persist_generation_progress_snapshot(generation_id: str, data: dict):
     _ensure_generation_state_dir()
     path = os.path.join(GENERATION_STATE_DIR, f"{generation_id}.progress.json")
+    # 先写临时文件再替换：工作进程写入时，Web 进程不会读到半截 JSON
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(path, "w", encoding="utf-8") as f:
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+        mtime = os.path.getmtime(path)
+        with progress_tracker_lock:
+            _progress_mtimes[generation_id] = mtime
     except Exception as ex:
         print(f"⚠️ 持久化生成进度失败: {ex}")
 
 
-def update_generation_progress(generation_id: str, **kwargs):
+def update_generation_progress(generation_id: str, min_progress=None, **kwargs):
+    """
+    更新进度并推送；min_progress 不为 None 时先在锁内比较：当前进度已超过它则整条更新跳过
+    （并发阶段的事件可能乱序到达，进度与状态文字都不回退）。返回是否已更新。
+    """
     with progress_tracker_lock:
         if generation_id not in progress_tracker:
-            return
-        progress_tracker[generation_id].update(kwargs)
-        snapshot = dict(progress_tracker[generation_id])
+            return False
+        entry = progress_tracker[generation_id]
+        if min_progress is not None and min_progress < (entry.get('progress') or 0):
+            return False
+        entry.update(kwargs)
+        # seq 随快照落盘，跨进程单调递增，作为 SSE 事件 ID
+        entry['seq'] = int(entry.get('seq', 0) or 0) + 1
+        snapshot = dict(entry)
     persist_generation_progress_snapshot(generation_id, snapshot)
+    progress_bus.publish(generation_id, snapshot)
+    return True
 
 
 def load_generation_progress_from_disk(generation_id: str) -> bool:
@@ -83,6 +118,7 @@ def load_generation_progress_from_disk(generation_id: str) -> bool:
     if not os.path.isfile(path):
         return False
     try:
+        mtime = os.path.getmtime(path)
         with open(path, encoding="utf-8") as f:
             data = json.load(f)
         st = data.get("start_time")
@@ -93,74 +129,227 @@ def load_generation_progress_from_disk(generation_id: str) -> bool:
                 data["start_time"] = time.time()
         with progress_tracker_lock:
             progress_tracker[generation_id] = data
+            _progress_mtimes[generation_id] = mtime
+        progress_bus.publish(generation_id, dict(data))
         return True
     except Exception as ex:
         print(f"⚠️ 读取生成进度失败: {ex}")
         return False
 
 
+def refresh_generation_progress(generation_id: str) -> bool:
+    """
+    任务可能在独立的工作进程中执行：进度文件比内存中的副本新时重新加载。
+    返回内存中是否存在该任务的进度。
+    """
+    path = os.path.join(GENERATION_STATE_DIR, f"{generation_id}.progress.json")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with progress_tracker_lock:
+        known = generation_id in progress_tracker
+        stale = mtime is not None and mtime != _progress_mtimes.get(generation_id)
+    if not known or stale:
+        load_generation_progress_from_disk(generation_id)
+    return generation_id in progress_tracker
+
+
+def forget_generation(generation_id: str) -> None:
+    """释放本进程内某次生成的内存状态（磁盘快照保留）"""
+    with progress_tracker_lock:
+        progress_tracker.pop(generation_id, None)
+        generation_results.pop(generation_id, None)
+        _progress_mtimes.pop(generation_id, None)
+    with _partial_logs_lock:
+        _partial_logs.pop(generation_id, None)
+
+
+def generation_results_path(generation_id: str) -> str:
+    return os.path.join(GENERATION_STATE_DIR, f"{generation_id}.results.jsonl")
+
+
 def persist_generation_results_snapshot(generation_id: str):
+    """把最终结果写为 JSON Lines：头部含总数、统计摘要与分析结果，其后逐行为用例"""
     _ensure_generation_state_dir()
-    path = os.path.join(GENERATION_STATE_DIR, f"{generation_id}.results.pkl")
     with progress_tracker_lock:
         if generation_id not in generation_results:
             return
         blob = generation_results[generation_id]
+    ai_analysis = blob.get('ai_analysis')
     try:
-        with open(path, "wb") as f:
-            pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+        write_result_file(
+            generation_results_path(generation_id),
+            blob['test_cases'],
+            total=len(blob['test_cases']),
+            ai_analysis=dataclasses.asdict(ai_analysis) if ai_analysis is not None else None,
+            case_summary=blob.get('case_summary'),
+            excel_file=blob.get('excel_file'),
+            ai_report_file=blob.get('ai_report_file'),
+            requirement_text=blob.get('requirement_text', ''),
+        )
     except Exception as ex:
         print(f"⚠️ 持久化生成结果失败: {ex}")
 
 
-def load_generation_results_from_disk(generation_id: str) -> bool:
+def load_generation_result_page(generation_id: str, limit: int = 10):
+    """
+    从磁盘读取结果头部与前 limit 条用例（不反序列化全部用例）。
+    返回与 generation_results 条目相同结构的字典，test_cases 只含第一页；不存在或损坏时返回 None。
+    """
+    path = generation_results_path(generation_id)
+    if not os.path.isfile(path):
+        return _load_legacy_results_pickle(generation_id, limit)
+    try:
+        page = read_result_page(path, 0, limit)
+    except Exception as ex:
+        print(f"⚠️ 读取生成结果失败: {ex}")
+        return None
+    meta = page['meta']
+    analysis = meta.get('ai_analysis')
+    return {
+        'test_cases': page['test_cases'],
+        'total_cases': page['total'],
+        'ai_analysis': AIAnalysisResult(**analysis) if analysis else None,
+        'case_summary': meta.get('case_summary'),
+        'excel_file': meta.get('excel_file'),
+        'ai_report_file': meta.get('ai_report_file'),
+        'requirement_text': meta.get('requirement_text', ''),
+    }
+
+
+def _load_legacy_results_pickle(generation_id: str, limit: int):
+    """升级前写入的 results.pkl（整表 pickle）"""
     path = os.path.join(GENERATION_STATE_DIR, f"{generation_id}.results.pkl")
     if not os.path.isfile(path):
-        return False
+        return None
     try:
         with open(path, "rb") as f:
             data = pickle.load(f)
-        with progress_tracker_lock:
-            generation_results[generation_id] = data
-        return True
     except Exception as ex:
         print(f"⚠️ 读取生成结果失败: {ex}")
-        return False
+        return None
+    cases = data.get('test_cases', [])
+    return dict(data, test_cases=list(cases[:limit]), total_cases=len(cases),
+                case_summary=summarize_ai_cases(cases, data.get('ai_analysis')))
+
+
+def partial_cases_path(generation_id: str) -> str:
+    return os.path.join(GENERATION_STATE_DIR, f"{generation_id}.partial_cases.jsonl")
 
 
-def partial_cases_pickle_path(generation_id: str) -> str:
-    return os.path.join(GENERATION_STATE_DIR, f"{generation_id}.partial_cases.pkl")
+# {generation_id: PartialCaseLog}：每个执行中的任务一个只追加的暂存日志
+_partial_logs = {}
+_partial_logs_lock = threading.Lock()
 
 
 def persist_partial_test_cases(generation_id: str, cases) -> None:
+    """暂存已生成的用例：只追加相对上次快照新增的部分"""
     if not cases:
         return
     _ensure_generation_state_dir()
-    path = partial_cases_pickle_path(generation_id)
+    with _partial_logs_lock:
+        log = _partial_logs.get(generation_id)
+        if log is None:
+            log = _partial_logs[generation_id] = PartialCaseLog(partial_cases_path(generation_id))
     try:
-        with open(path, "wb") as f:
-            pickle.dump(cases, f, protocol=pickle.HIGHEST_PROTOCOL)
+        log.sync(cases)
     except Exception as ex:
         print(f"⚠️ 暂存部分用例失败: {ex}")
 
 
-def clear_partial_test_cases(generation_id: str) -> None:
-    path = partial_cases_pickle_path(generation_id)
+def load_partial_test_cases(generation_id: str):
+    """读取暂存用例（兼容升级前的 partial_cases.pkl）；不存在时返回空列表"""
+    path = partial_cases_path(generation_id)
     if os.path.isfile(path):
-        try:
-            os.remove(path)
-        except OSError:
-            pass
+        return read_partial_cases(path)
+    legacy = os.path.join(GENERATION_STATE_DIR, f"{generation_id}.partial_cases.pkl")
+    if os.path.isfile(legacy):
+        with open(legacy, "rb") as f:
+            return pickle.load(f)
+    return []
+
+
+def clear_partial_test_cases(generation_id: str) -> None:
+    with _partial_logs_lock:
+        _partial_logs.pop(generation_id, None)
+    for path in (partial_cases_path(generation_id),
+                 os.path.join(GENERATION_STATE_DIR, f"{generation_id}.partial_cases.pkl")):
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def checkpoint_path(generation_id: str) -> str:
+    return os.path.join(GENERATION_STATE_DIR, f"{generation_id}.checkpoint.jsonl")
+
+
+def has_generation_checkpoint(generation_id: str) -> bool:
+    """是否存在可用于「继续生成」的断点"""
+    return os.path.isfile(checkpoint_path(generation_id))
+
+
+def open_generation_checkpoint(generation_id: str, req_snap: dict, language: str) -> GenerationCheckpoint:
+    """按请求快照的输入指纹打开断点（需求等输入改变时旧断点自动作废）"""
+    fingerprint = input_fingerprint(
+        req_snap.get("requirement_text") or "",
+        req_snap.get("test_case_language") or language,
+        req_snap.get("historical_defects") or "",
+        req_snap.get("iteration_context") or "",
+        req_snap.get("code_change_summary") or "",
+    )
+    return GenerationCheckpoint(checkpoint_path(generation_id), fingerprint)
+
+
+def discard_generation_state(generation_id: str) -> None:
+    """删除未能入队的生成任务的内存状态与落盘文件"""
+    forget_generation(generation_id)
+    for suffix in (".progress.json", ".request.json", ".checkpoint.jsonl"):
+        path = os.path.join(GENERATION_STATE_DIR, f"{generation_id}{suffix}")
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def publish_queue_positions() -> None:
+    """把每个排队任务的位置与预计等待时间写入其进度（SSE 推送给前端）"""
+    try:
+        positions = job_queue.queue_positions()
+    except Exception as ex:
+        print(f"⚠️ 计算排队位置失败: {ex}")
+        return
+    for gid, pos in positions.items():
+        was_loaded = gid in progress_tracker
+        if not refresh_generation_progress(gid):
+            continue
+        with progress_tracker_lock:
+            data = progress_tracker.get(gid) or {}
+            changed = data.get('status') == 'queued' and (
+                (data.get('queue_position'), data.get('queue_eta')) != (pos['position'], pos['eta']))
+            lang = data.get('language') or DEFAULT_LANGUAGE
+        if changed:
+            update_generation_progress(
+                gid,
+                queue_position=pos['position'],
+                queue_eta=pos['eta'],
+                message=get_text('progress_queued_position', lang).format(
+                    ahead=pos['ahead'], minutes=max(1, (pos['eta'] + 59) // 60)),
+            )
+        if not was_loaded:
+            # 只为写入排队信息而加载的进度，不常驻本进程内存
+            forget_generation(gid)
 
 
 def try_export_partial_excel(generation_id: str, headers_dict) -> tuple:
     """若存在暂存用例，导出为 outputs 下 Excel。返回 (文件名, 条数)，失败为 (None, 0)。"""
-    path = partial_cases_pickle_path(generation_id)
-    if not os.path.isfile(path):
-        return None, 0
+    with _partial_logs_lock:
+        _partial_logs.pop(generation_id, None)
     try:
-        with open(path, "rb") as f:
-            cases = pickle.load(f)
+        cases = load_partial_test_cases(generation_id)
     except Exception as ex:
         print(f"⚠️ 读取暂存用例失败: {ex}")
         return None, 0
@@ -185,8 +374,7 @@ def collect_my_incomplete_jobs() -> list:
     gids = session.get("generation_jobs", [])
     out = []
     for gid in reversed(gids[-15:]):
-        if gid not in progress_tracker:
-            load_generation_progress_from_disk(gid)
+        refresh_generation_progress(gid)
         with progress_tracker_lock:
             data = progress_tracker.get(gid)
         if not data:
@@ -241,6 +429,8 @@ def before_request():
     g.lang = get_locale()
     if "client_id" not in session:
         session["client_id"] = str(uuid.uuid4())
+    # 进程内工作线程（AI_EMBEDDED_WORKERS=0 时由独立工作进程处理队列）
+    ensure_job_workers()
 
 @app.context_processor
 def inject_translations():
@@ -279,6 +469,30 @@ def index():
     recent_data = get_recent_test_cases()
     return render_template('ai_index.html', recent_data=recent_data)
 
+def render_queue_full(error: QueueFullError):
+    """队列已满：保留用户已填写的表单，返回 429 并附 Retry-After"""
+    key = 'flash_client_queue_full' if error.scope == 'client' else 'flash_queue_full'
+    flash(get_text(key, g.lang).format(seconds=error.retry_after), 'warning')
+    try:
+        ai_config = config_manager.load_config()
+    except Exception as e:
+        print(f"⚠️ 加载AI配置失败: {e}")
+        ai_config = None
+    html = render_template(
+        'ai_generate.html',
+        ai_config=ai_config,
+        my_running_jobs=collect_my_incomplete_jobs(),
+        prefill_requirement=request.form.get('requirement_text', ''),
+        prefill_custom_headers=request.form.get('custom_headers', ''),
+        prefill_test_case_language=request.form.get('test_case_language', 'auto'),
+        prefill_source_id="",
+        prefill_historical_defects=request.form.get('historical_defects', ''),
+        prefill_iteration_context=request.form.get('iteration_context', ''),
+        prefill_code_change_summary=request.form.get('code_change_summary', ''),
+        prefill_use_response_cache=request.form.get('use_response_cache') == 'on',
+    )
+    return html, 429, {'Retry-After': str(error.retry_after)}
+
 @app.route('/ai_generate', methods=['GET', 'POST'])
 def ai_generate():
     """�AI增强生成测试用例页面"""
@@ -302,6 +516,7 @@ def ai_generate():
             prefill_historical_defects="",
             prefill_iteration_context="",
             prefill_code_change_summary="",
+            prefill_use_response_cache=False,
         )
     
     try:
@@ -312,8 +527,9 @@ def ai_generate():
         _init_progress = {
             'progress': 0,
             'total': 100,
-            'status': 'starting',
-            'message': get_text('progress_initializing', g.lang),
+            'status': 'queued',
+            'message': get_text('progress_queued', g.lang),
+            'language': g.lang,
             'start_time': time.time(),
             'current_step': '',
             'estimated_time': 0,
@@ -332,6 +548,7 @@ def ai_generate():
         custom_headers = request.form.get('custom_headers', '').strip()
         ai_enhancement_level = request.form.get('ai_enhancement_level', 'medium')
         test_case_language = request.form.get('test_case_language', 'auto')  # 获取语言选择
+        use_response_cache = request.form.get('use_response_cache') == 'on'  # 复用相同提示词的AI响应缓存
         
         # 处理自动语言选择
         if test_case_language == 'auto':
@@ -353,362 +570,435 @@ def ai_generate():
             "custom_headers": custom_headers,
             "ai_enhancement_level": ai_enhancement_level,
             "test_case_language": test_case_language,
+            "use_response_cache": use_response_cache,
         }
         persist_request_snapshot(generation_id, req_snap)
+
+        # 写入持久化任务队列，由工作线程/工作进程领取执行（见 job_worker）；队列已满时返回 429
+        current_lang = session.get('language', 'zh')
+        try:
+            job_queue.enqueue(generation_id, client_id, current_lang)
+        except QueueFullError as qe:
+            discard_generation_state(generation_id)
+            return render_queue_full(qe)
         append_job(generation_id, client_id, requirement_text)
         gj = session.get("generation_jobs", [])
         session["generation_jobs"] = (gj + [generation_id])[-25:]
         session.modified = True
+        publish_queue_positions()
+        
+        # 跳转到可收藏/可分享的进度 URL（关闭标签后也可从历史进入）
+        return redirect(url_for('ai_generation_status_page', generation_id=generation_id))
         
-        # 在后台线程中生成
-        def generate_in_background(language='zh'):
-            headers_dict = None
+    except Exception as e:
+        flash(get_text('flash_ai_generate_error', g.lang).format(error=str(e)), 'error')
+        return redirect(url_for('ai_generate'))
+
+def run_generation_job(generation_id: str, req_snap: dict, language: str = 'zh'):
+    """
+    执行一次生成任务（由任务队列的工作线程/工作进程调用）
+    req_snap 为入队时落盘的请求快照；进度通过 update_generation_progress 写回进度快照，
+    Web 端据此推送状态，因此任务可以在其他进程中执行。
+    """
+    requirement_text = req_snap.get("requirement_text") or ""
+    historical_defects = req_snap.get("historical_defects") or ""
+    iteration_context = req_snap.get("iteration_context") or ""
+    code_change_summary = req_snap.get("code_change_summary") or ""
+    custom_headers = req_snap.get("custom_headers") or ""
+    test_case_language = req_snap.get("test_case_language") or language
+    use_response_cache = bool(req_snap.get("use_response_cache"))
+    if not refresh_generation_progress(generation_id):
+        with progress_tracker_lock:
+            progress_tracker[generation_id] = {'progress': 0, 'total': 100, 'current_step': '', 'estimated_time': 0}
+    # 排队等待时间不计入预计剩余时间
+    update_generation_progress(
+        generation_id,
+        status='starting',
+        message=get_text('progress_initializing', language),
+        start_time=time.time(),
+    )
+
+    headers_dict = None
+    try:
+        # 获取用户语言（从参数传入）
+        from .translations import get_all_texts
+        texts = get_all_texts(language)
+        
+        # 处理自定义字段标题
+        if custom_headers:
             try:
-                # 获取用户语言（从参数传入）
-                from .translations import get_all_texts
-                texts = get_all_texts(language)
-                
-                # 处理自定义字段标题
-                if custom_headers:
-                    try:
-                        # 先尝试解析为JSON
-                        headers_dict = json.loads(custom_headers)
-                    except:
-                        # 如果JSON解析失败，尝试按逗号分隔的字段列表解析
-                        # 同时支持中文逗号（，）和英文逗号（,）
-                        import re
-                        # 先将中文逗号替换为英文逗号
-                        normalized_headers = custom_headers.replace('，', ',')
-                        fields = [f.strip() for f in normalized_headers.split(',') if f.strip()]
-                        if fields:
-                            headers_dict = fields  # 直接传递字段列表
-                            print(f"✅ 自定义字段 ({len(fields)} 个): {fields[:3]}..." if len(fields) > 3 else f"✅ 自定义字段: {fields}")
-                        else:
-                            print("⚠️  无法解析自定义字段，将使用默认模板")
-                
-                # 更新进度: 分析需求
-                update_generation_progress(
-                    generation_id,
-                    progress=10,
-                    status='analyzing',
-                    message=texts.get('analyzing_requirements', '正在分析需求文档...'),
-                    current_step=texts.get('requirement_analysis', '需求分析'),
+                # 先尝试解析为JSON
+                headers_dict = json.loads(custom_headers)
+            except:
+                # 如果JSON解析失败，尝试按逗号分隔的字段列表解析
+                # 同时支持中文逗号（，）和英文逗号（,）
+                import re
+                # 先将中文逗号替换为英文逗号
+                normalized_headers = custom_headers.replace('，', ',')
+                fields = [f.strip() for f in normalized_headers.split(',') if f.strip()]
+                if fields:
+                    headers_dict = fields  # 直接传递字段列表
+                    print(f"✅ 自定义字段 ({len(fields)} 个): {fields[:3]}..." if len(fields) > 3 else f"✅ 自定义字段: {fields}")
+                else:
+                    print("⚠️  无法解析自定义字段，将使用默认模板")
+        
+        # 更新进度: 分析需求
+        update_generation_progress(
+            generation_id,
+            progress=10,
+            status='analyzing',
+            message=texts.get('analyzing_requirements', '正在分析需求文档...'),
+            current_step=texts.get('requirement_analysis', '需求分析'),
+        )
+        
+        # 添加健康检查
+        try:
+            print("🔍 执行AI服务健康检查...")
+            # 这里可以添加对AI服务的健康检查逻辑
+        except Exception as health_err:
+            print(f"⚠️ 健康检查失败: {health_err}")
+        
+        from .strict_ai_generator import StrictAITestGenerator
+        
+        # 获取AI API调用器
+        ai_api_caller = None
+        ai_generator = None
+        try:
+            ai_generator = create_ai_generator(headers_dict)
+            if use_response_cache and hasattr(ai_generator, 'use_response_cache'):
+                ai_generator.use_response_cache = True
+                print("💾 已启用AI响应缓存（相同提示词复用历史响应）")
+            if hasattr(ai_generator, 'call_ai_api'):
+                ai_api_caller = ai_generator.call_ai_api
+            if hasattr(ai_generator, 'ai_config'):
+                # 配置了备用提供商链时，改用带熔断/对冲的故障转移调用器
+                from .ai_provider_chain import build_failover_caller
+                failover_caller = build_failover_caller(ai_generator, headers_dict)
+                if failover_caller:
+                    ai_api_caller = failover_caller.call_ai_api
+        except Exception as e:
+            print(f"⚠️  创建AI生成器失败: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        # 更新进度: 即将进入严格生成（提取/梳理/逐点生成均在 generate_test_cases 内）
+        update_generation_progress(
+            generation_id,
+            progress=22,
+            status='strict_pipeline',
+            message=texts.get('progress_strict_pipeline', '进入严格生成流程（提取功能点→梳理需求→逐条写用例）...'),
+            current_step=texts.get('function_point_extraction', '功能点提取'),
+        )
+        
+        # 检查是否需要降级到本地生成
+        if not ai_api_caller:
+            print("⚠️ AI API调用器不可用，将使用本地生成")
+        
+        # 使用严格AI生成器，传入语言参数与进度回调（与界面阶段一致）
+        stream_responses = bool(
+            ai_api_caller and hasattr(ai_generator, 'supports_streaming') and ai_generator.supports_streaming()
+        )
+        strict_generator = StrictAITestGenerator(
+            ai_api_caller=ai_api_caller,
+            language=test_case_language,
+            stream_responses=stream_responses,
+        )
+        
+        generation_start_time = time.time()
+        
+        def advance_progress(pct: int, **kwargs):
+            # 准备阶段（提取/梳理/思维导图）并发执行，事件可能交错到达：晚到的旧阶段事件整条跳过
+            update_generation_progress(generation_id, min_progress=pct, progress=pct, **kwargs)
+
+        def strict_progress(event, payload=None):
+            payload = payload or {}
+            if event == "after_extract":
+                if payload.get("resumed"):
+                    message = texts.get("progress_resumed_checkpoint", "已从断点恢复：{n} 个功能点中 {done} 个已完成，继续生成剩余部分").format(
+                        n=payload.get("count", 0), done=payload["resumed"])
+                else:
+                    message = texts.get("progress_points_extracted", "已从需求中提取 {n} 个功能点").format(
+                        n=payload.get("count", 0))
+                advance_progress(
+                    27,
+                    status="extracted",
+                    message=message,
+                    current_step=texts.get("function_point_extraction", "功能点提取"),
                 )
-                
-                # 添加健康检查
-                try:
-                    print("🔍 执行AI服务健康检查...")
-                    # 这里可以添加对AI服务的健康检查逻辑
-                except Exception as health_err:
-                    print(f"⚠️ 健康检查失败: {health_err}")
-                
-                from .strict_ai_generator import StrictAITestGenerator
-                
-                # 获取AI API调用器
-                ai_api_caller = None
-                ai_generator = None
-                try:
-                    ai_generator = create_ai_generator(headers_dict)
-                    if hasattr(ai_generator, 'call_ai_api'):
-                        ai_api_caller = ai_generator.call_ai_api
-                except Exception as e:
-                    print(f"⚠️  创建AI生成器失败: {e}")
-                    import traceback
-                    traceback.print_exc()
-                
-                # 更新进度: 即将进入严格生成（提取/梳理/逐点生成均在 generate_test_cases 内）
-                update_generation_progress(
-                    generation_id,
-                    progress=22,
-                    status='strict_pipeline',
-                    message=texts.get('progress_strict_pipeline', '进入严格生成流程（提取功能点→梳理需求→逐条写用例）...'),
-                    current_step=texts.get('function_point_extraction', '功能点提取'),
+            elif event == "refine_start":
+                advance_progress(
+                    30,
+                    status="refining_requirement",
+                    message=texts.get("progress_refining_requirement", "正在梳理需求文档（整理上下文）..."),
+                    current_step=texts.get("step_requirement_refine", "需求梳理"),
                 )
-                
-                # 检查是否需要降级到本地生成
-                if not ai_api_caller:
-                    print("⚠️ AI API调用器不可用，将使用本地生成")
-                
-                # 使用严格AI生成器，传入语言参数与进度回调（与界面阶段一致）
-                strict_generator = StrictAITestGenerator(ai_api_caller=ai_api_caller, language=test_case_language)
-                
-                generation_start_time = time.time()
-                
-                def strict_progress(event, payload=None):
-                    payload = payload or {}
-                    if event == "after_extract":
-                        update_generation_progress(
-                            generation_id,
-                            progress=27,
-                            status="extracted",
-                            message=texts.get("progress_points_extracted", "已从需求中提取 {n} 个功能点").format(
-                                n=payload.get("count", 0)),
-                            current_step=texts.get("function_point_extraction", "功能点提取"),
-                        )
-                    elif event == "refine_start":
-                        update_generation_progress(
-                            generation_id,
-                            progress=30,
-                            status="refining_requirement",
-                            message=texts.get("progress_refining_requirement", "正在梳理需求文档（整理上下文）..."),
-                            current_step=texts.get("step_requirement_refine", "需求梳理"),
-                        )
-                    elif event == "refine_done":
-                        update_generation_progress(
-                            generation_id,
-                            progress=36,
-                            status="refining_done",
-                            message=texts.get("progress_refine_done", "需求梳理完成（{n} 字），开始按功能点生成用例").format(
-                                n=payload.get("length", 0)),
-                            current_step=texts.get("test_case_generation", "测试用例生成"),
-                        )
-                    elif event == "mindmap_start":
-                        update_generation_progress(
-                            generation_id,
-                            progress=37,
-                            status="mindmap",
-                            message=texts.get("progress_mindmap_start", "正在生成测试点思维导图（ISTQB 多维度）..."),
-                            current_step=texts.get("step_test_mindmap", "测试点思维导图"),
-                        )
-                    elif event == "mindmap_done":
-                        update_generation_progress(
-                            generation_id,
-                            progress=39,
-                            status="mindmap_done",
-                            message=texts.get("progress_mindmap_done", "思维导图完成（{n} 字），开始逐功能点生成用例").format(
-                                n=payload.get("length", 0)),
-                            current_step=texts.get("test_case_generation", "测试用例生成"),
-                        )
-                    elif event == "function_point_start":
-                        tot = max(payload.get("total", 1), 1)
-                        idx = payload.get("index", 1)
-                        name = (payload.get("description") or "")[:80]
-                        pct = 40 + int((idx - 1) / tot * 22)
-                        update_generation_progress(
-                            generation_id,
-                            progress=min(pct, 61),
-                            status="generating_function_point",
-                            message=texts.get("progress_fp_item", "{i}/{t}：{name}").format(
-                                i=idx, t=tot, name=name),
-                            current_step=texts.get("test_case_generation", "测试用例生成"),
-                        )
-                    elif event == "function_point_done":
-                        tot = max(payload.get("total", 1), 1)
-                        idx = payload.get("index", 1)
-                        update_generation_progress(
-                            generation_id,
-                            progress=min(40 + int(idx / tot * 22), 62),
-                            message=texts.get("progress_fp_done_short", "已完成 {i}/{t}，本功能点 {c} 条用例").format(
-                                i=idx, t=tot, c=payload.get("cases", 0)),
-                        )
-                    elif event == "validating_start":
-                        update_generation_progress(
-                            generation_id,
-                            progress=63,
-                            status="validating",
-                            message=texts.get('validating_format', '验证格式规范... (已生成 {count} 个用例)').format(
-                                count=payload.get("total_cases", 0)),
-                            current_step=texts.get('format_validation', '格式验证'),
-                            total=payload.get("total_cases", 0),
-                        )
-                
-                def on_partial_cases(cases_list):
-                    persist_partial_test_cases(generation_id, cases_list)
-                    update_generation_progress(generation_id, total=len(cases_list))
-
-                test_cases = strict_generator.generate_test_cases(
-                    requirement_text,
-                    progress_callback=strict_progress,
-                    partial_results_callback=on_partial_cases,
-                    historical_defects=historical_defects or None,
-                    iteration_context=iteration_context or None,
-                    code_change_summary=code_change_summary or None,
+            elif event == "refine_done":
+                advance_progress(
+                    36,
+                    status="refining_done",
+                    message=texts.get("progress_refine_done", "需求梳理完成（{n} 字），开始按功能点生成用例").format(
+                        n=payload.get("length", 0)),
+                    current_step=texts.get("test_case_generation", "测试用例生成"),
                 )
-                
-                # 更新进度: 验证格式（导出前阶段）
-                update_generation_progress(
-                    generation_id,
-                    progress=65,
-                    status='validating',
-                    message=texts.get('validating_format', '验证格式规范... (已生成 {count} 个用例)').format(count=len(test_cases)),
-                    current_step=texts.get('format_validation', '格式验证'),
-                    total=len(test_cases),
+            elif event == "mindmap_start":
+                advance_progress(
+                    37,
+                    status="mindmap",
+                    message=texts.get("progress_mindmap_start", "正在生成测试点思维导图（ISTQB 多维度）..."),
+                    current_step=texts.get("step_test_mindmap", "测试点思维导图"),
                 )
-                
-                # 添加生成统计信息
-                generation_duration = time.time() - generation_start_time
-                print(f"⏱️  测试用例生成耗时: {generation_duration:.2f}秒")
-                if generation_duration > 300:  # 超过5分钟
-                    print("⚠️  生成时间较长，可能需要优化提示或检查AI服务性能")
-                
-                #创建普通生成器用于导出
-                base_generator = TestCaseGenerator(headers_dict)
-                base_generator.test_cases = test_cases
-                
-                # AI分析需求
-                update_generation_progress(
-                    generation_id,
-                    progress=75,
-                    message=texts.get('ai_analyzing', 'AI分析需求...'),
-                    current_step=texts.get('ai_analysis', 'AI分析'),
+            elif event == "mindmap_done":
+                advance_progress(
+                    39,
+                    status="mindmap_done",
+                    message=texts.get("progress_mindmap_done", "思维导图完成（{n} 字），开始逐功能点生成用例").format(
+                        n=payload.get("length", 0)),
+                    current_step=texts.get("test_case_generation", "测试用例生成"),
                 )
-                
-                ai_analysis = None
-                try:
-                    if ai_generator and hasattr(ai_generator, 'real_ai_analyze_requirements'):
-                        ai_analysis = ai_generator.real_ai_analyze_requirements(requirement_text)
-                    elif ai_generator and hasattr(ai_generator, 'ai_analyze_requirements'):
-                        ai_analysis = ai_generator.ai_analyze_requirements(requirement_text)
-                    else:
-                        # 没有AI生成器，使用默认分析
-                        raise Exception("未AI生成器可用")
-                except Exception as e:
-                    print(f"⚠️  AI分析失败: {e}，使用默认分析")
-                    from .ai_test_generator import AIAnalysisResult
-                    ai_analysis = AIAnalysisResult(
-                        complexity_score=5.0,
-                        risk_areas=[],
-                        critical_paths=[],
-                        data_patterns=[],
-                        business_rules=[],
-                        integration_points=[],
-                        performance_concerns=[],
-                        security_risks=[],
-                        usability_factors=[]
-                    )
-                
-                base_generator.ai_analysis = ai_analysis
-                
-                # 生成文件
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                excel_filename = f"ai_test_cases_{timestamp}.xlsx"
-                excel_path = os.path.join(app.config['OUTPUT_FOLDER'], excel_filename)
-                
+            elif event == "function_point_start":
+                tot = max(payload.get("total", 1), 1)
+                idx = payload.get("index", 1)
+                name = (payload.get("description") or "")[:80]
+                # 并发生成时按已完成数推进进度，避免多个功能点同时开始导致进度跳变
+                done = payload.get("completed", idx - 1)
+                pct = 40 + int(done / tot * 22)
                 update_generation_progress(
                     generation_id,
-                    progress=85,
-                    message=texts.get('generating_excel', '生成Excel报告...'),
-                    current_step=texts.get('excel_generation', 'Excel生成'),
+                    progress=min(pct, 61),
+                    status="generating_function_point",
+                    message=texts.get("progress_fp_item", "{i}/{t}：{name}").format(
+                        i=idx, t=tot, name=name),
+                    current_step=texts.get("test_case_generation", "测试用例生成"),
                 )
-                
-                base_generator.export_to_excel(excel_path)
-                
-                # AI增强报告
-                ai_report_filename = f"ai_enhanced_report_{timestamp}.md"
-                ai_report_path = os.path.join(app.config['OUTPUT_FOLDER'], ai_report_filename)
-                
+            elif event == "function_point_done":
+                tot = max(payload.get("total", 1), 1)
+                done = payload.get("completed", payload.get("index", 1))
                 update_generation_progress(
                     generation_id,
-                    progress=95,
-                    message=texts.get('generating_report', '生成AI增强报告...'),
-                    current_step=texts.get('report_generation', '报告生成'),
+                    progress=min(40 + int(done / tot * 22), 62),
+                    message=texts.get("progress_fp_done_short", "已完成 {i}/{t}，本功能点 {c} 条用例").format(
+                        i=done, t=tot, c=payload.get("cases", 0)),
                 )
-                
-                try:
-                    base_generator.export_ai_enhanced_report(ai_report_path)
-                except:
-                    ai_report_filename = None
-                
-                # 保存结果
+            elif event == "case_streamed":
                 update_generation_progress(
                     generation_id,
-                    progress=100,
-                    status='completed',
-                    message=texts.get('generation_complete', '完成！共生成 {count} 个测试用例').format(count=len(test_cases)),
-                    current_step=texts.get('complete', '完成'),
-                    excel_file=excel_filename,
-                    ai_report_file=ai_report_filename,
-                    generation_time=round(time.time() - generation_start_time, 2),
-                    case_count=len(test_cases),
+                    message=texts.get("progress_case_streamed", "{i}/{t}：已实时收到 {n} 条用例 — {title}").format(
+                        i=payload.get("index", 1), t=payload.get("total", 1),
+                        n=payload.get("streamed", 0), title=(payload.get("title") or "")[:60]),
+                    total=payload.get("total_cases", 0),
                 )
-                
-                # 单独存储不能序列化的对象
-                with progress_tracker_lock:
-                    generation_results[generation_id] = {
-                        'test_cases': test_cases,
-                        'ai_analysis': ai_analysis,
-                        'excel_file': excel_filename,
-                        'ai_report_file': ai_report_filename,
-                        'requirement_text': requirement_text,
-                    }
-                persist_generation_results_snapshot(generation_id)
-                clear_partial_test_cases(generation_id)
-                update_job(
+            elif event == "validating_start":
+                update_generation_progress(
                     generation_id,
-                    status="completed",
-                    case_count=len(test_cases),
-                    excel_file=excel_filename,
+                    progress=63,
+                    status="validating",
+                    message=texts.get('validating_format', '验证格式规范... (已生成 {count} 个用例)').format(
+                        count=payload.get("total_cases", 0)),
+                    current_step=texts.get('format_validation', '格式验证'),
+                    total=payload.get("total_cases", 0),
                 )
-                
-            except Exception as e:
-                print(f"❌ 生成过程中出现错误: {e}")
-                import traceback
-                traceback.print_exc()
-                try:
-                    _tx = texts
-                except NameError:
-                    from .translations import get_all_texts as _gat
-                    _tx = _gat(language)
-                
-                # 记录错误日志（勿在函数内再 import datetime，否则会令整个函数作用域把 datetime 视为未赋值的局部变量）
-                try:
-                    error_log = {
-                        'timestamp': datetime.now().isoformat(),
-                        'error': str(e),
-                        'traceback': traceback.format_exc(),
-                        'requirement_preview': requirement_text[:100] if requirement_text else 'N/A'
-                    }
-                    with open(os.path.join(PROJECT_ROOT, "generation_error.log"), "a", encoding="utf-8") as f:
-                        f.write(json.dumps(error_log, ensure_ascii=False) + '\n')
-                    print("📝 错误日志已记录到 generation_error.log")
-                except Exception as log_err:
-                    print(f"⚠️ 记录错误日志失败: {log_err}")
-                
-                # 提供更详细的错误信息
-                error_message = str(e)
-                detailed_message = _tx.get('error_occurred', '错误: {error}').format(error=error_message)
-                
-                # 根据错误类型提供不同的错误信息
-                if 'JSON' in error_message or 'json' in error_message.lower():
-                    detailed_message += ' ' + _tx.get('json_error_hint', '这通常是因为AI响应格式有问题，请稍后重试或联系管理员。')
-                elif 'timeout' in error_message.lower() or 'time out' in error_message.lower():
-                    detailed_message += ' ' + _tx.get('timeout_error_hint', '这可能是因为网络连接较慢，请稍后重试。')
-                elif 'API' in error_message or 'api' in error_message.lower():
-                    detailed_message += ' ' + _tx.get('api_error_hint', 'AI服务暂时不可用，请检查配置或稍后重试。')
-                else:
-                    detailed_message += ' ' + _tx.get('general_error_hint', '请稍后重试，如果问题持续存在请联系管理员。')
-                
-                pfile, pcount = try_export_partial_excel(generation_id, headers_dict)
-                if pfile:
-                    detailed_message += " " + _tx.get(
-                        "partial_save_hint",
-                        "已导出已生成的 {n} 条用例：{file}（可在下方下载）",
-                    ).format(n=pcount, file=pfile)
-                
+            elif event == "near_duplicates" and payload.get("clusters"):
+                key = "progress_near_dup_merged" if payload.get("mode") == "merge" else "progress_near_dup_marked"
                 update_generation_progress(
                     generation_id,
-                    progress=0,
-                    status='error',
-                    message=detailed_message,
-                    current_step=_tx.get('error_status', '错误'),
-                    error_details=error_message,
-                    partial_excel_file=pfile or "",
-                    partial_case_count=pcount,
+                    message=texts.get(key, '发现 {clusters} 组近似重复用例（共 {cases} 个）').format(
+                        clusters=payload["clusters"], cases=payload.get("cases", 0), removed=payload.get("removed", 0)),
                 )
-                update_job(generation_id, status="error", error_summary=error_message[:500])
         
-        # 启动后台线程，传入当前语言
-        current_lang = session.get('language', 'zh')
-        thread = threading.Thread(target=generate_in_background, args=(current_lang,))
-        thread.daemon = True
-        thread.start()
+        def on_partial_cases(cases_list):
+            persist_partial_test_cases(generation_id, cases_list)
+            update_generation_progress(generation_id, total=len(cases_list))
+
+        # 断点：租约过期重新执行或「继续生成」时跳过已完成的功能点
+        checkpoint = open_generation_checkpoint(generation_id, req_snap, language)
+        test_cases = strict_generator.generate_test_cases(
+            requirement_text,
+            progress_callback=strict_progress,
+            partial_results_callback=on_partial_cases,
+            historical_defects=historical_defects or None,
+            iteration_context=iteration_context or None,
+            code_change_summary=code_change_summary or None,
+            checkpoint=checkpoint,
+        )
         
-        # 跳转到可收藏/可分享的进度 URL（关闭标签后也可从历史进入）
-        return redirect(url_for('ai_generation_status_page', generation_id=generation_id))
+        # 更新进度: 验证格式（导出前阶段）
+        update_generation_progress(
+            generation_id,
+            progress=65,
+            status='validating',
+            message=texts.get('validating_format', '验证格式规范... (已生成 {count} 个用例)').format(count=len(test_cases)),
+            current_step=texts.get('format_validation', '格式验证'),
+            total=len(test_cases),
+        )
+        
+        # 添加生成统计信息
+        generation_duration = time.time() - generation_start_time
+        print(f"⏱️  测试用例生成耗时: {generation_duration:.2f}秒")
+        if use_response_cache:
+            from .ai_response_cache import ai_response_cache
+            print(f"💾 AI响应缓存统计: {ai_response_cache.stats()}")
+        if generation_duration > 300:  # 超过5分钟
+            print("⚠️  生成时间较长，可能需要优化提示或检查AI服务性能")
+        
+        #创建普通生成器用于导出
+        base_generator = TestCaseGenerator(headers_dict)
+        base_generator.test_cases = test_cases
+        
+        # AI分析需求
+        update_generation_progress(
+            generation_id,
+            progress=75,
+            message=texts.get('ai_analyzing', 'AI分析需求...'),
+            current_step=texts.get('ai_analysis', 'AI分析'),
+        )
+        
+        ai_analysis = None
+        try:
+            if ai_generator and hasattr(ai_generator, 'real_ai_analyze_requirements'):
+                ai_analysis = ai_generator.real_ai_analyze_requirements(requirement_text)
+            elif ai_generator and hasattr(ai_generator, 'ai_analyze_requirements'):
+                ai_analysis = ai_generator.ai_analyze_requirements(requirement_text)
+            else:
+                # 没有AI生成器，使用默认分析
+                raise Exception("未AI生成器可用")
+        except Exception as e:
+            print(f"⚠️  AI分析失败: {e}，使用默认分析")
+            ai_analysis = AIAnalysisResult(
+                complexity_score=5.0,
+                risk_areas=[],
+                critical_paths=[],
+                data_patterns=[],
+                business_rules=[],
+                integration_points=[],
+                performance_concerns=[],
+                security_risks=[],
+                usability_factors=[]
+            )
+        
+        base_generator.ai_analysis = ai_analysis
+        
+        # 生成文件
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        excel_filename = f"ai_test_cases_{timestamp}.xlsx"
+        excel_path = os.path.join(app.config['OUTPUT_FOLDER'], excel_filename)
+        
+        update_generation_progress(
+            generation_id,
+            progress=85,
+            message=texts.get('generating_excel', '生成Excel报告...'),
+            current_step=texts.get('excel_generation', 'Excel生成'),
+        )
+        
+        base_generator.export_to_excel(excel_path)
+        
+        # AI增强报告
+        ai_report_filename = f"ai_enhanced_report_{timestamp}.md"
+        ai_report_path = os.path.join(app.config['OUTPUT_FOLDER'], ai_report_filename)
+        
+        update_generation_progress(
+            generation_id,
+            progress=95,
+            message=texts.get('generating_report', '生成AI增强报告...'),
+            current_step=texts.get('report_generation', '报告生成'),
+        )
+        
+        try:
+            base_generator.export_ai_enhanced_report(ai_report_path)
+        except:
+            ai_report_filename = None
+        
+        # 保存结果
+        update_generation_progress(
+            generation_id,
+            progress=100,
+            status='completed',
+            message=texts.get('generation_complete', '完成！共生成 {count} 个测试用例').format(count=len(test_cases)),
+            current_step=texts.get('complete', '完成'),
+            excel_file=excel_filename,
+            ai_report_file=ai_report_filename,
+            generation_time=round(time.time() - generation_start_time, 2),
+            case_count=len(test_cases),
+        )
+        
+        # 单独存储不能序列化的对象
+        with progress_tracker_lock:
+            generation_results[generation_id] = {
+                # 列式存储：结果在内存与 results.pkl 中常驻到结果页被访问为止
+                'test_cases': TestCaseTable.from_cases(test_cases),
+                'ai_analysis': ai_analysis,
+                'case_summary': summarize_ai_cases(test_cases, ai_analysis),
+                'excel_file': excel_filename,
+                'ai_report_file': ai_report_filename,
+                'requirement_text': requirement_text,
+            }
+        persist_generation_results_snapshot(generation_id)
+        clear_partial_test_cases(generation_id)
+        checkpoint.clear()
+        update_job(
+            generation_id,
+            status="completed",
+            case_count=len(test_cases),
+            excel_file=excel_filename,
+        )
         
     except Exception as e:
-        flash(get_text('flash_ai_generate_error', g.lang).format(error=str(e)), 'error')
-        return redirect(url_for('ai_generate'))
+        print(f"❌ 生成过程中出现错误: {e}")
+        import traceback
+        traceback.print_exc()
+        try:
+            _tx = texts
+        except NameError:
+            from .translations import get_all_texts as _gat
+            _tx = _gat(language)
+        
+        # 记录错误日志（勿在函数内再 import datetime，否则会令整个函数作用域把 datetime 视为未赋值的局部变量）
+        try:
+            error_log = {
+                'timestamp': datetime.now().isoformat(),
+                'error': str(e),
+                'traceback': traceback.format_exc(),
+                'requirement_preview': requirement_text[:100] if requirement_text else 'N/A'
+            }
+            with open(os.path.join(PROJECT_ROOT, "generation_error.log"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(error_log, ensure_ascii=False) + '\n')
+            print("📝 错误日志已记录到 generation_error.log")
+        except Exception as log_err:
+            print(f"⚠️ 记录错误日志失败: {log_err}")
+        
+        # 提供更详细的错误信息
+        error_message = str(e)
+        detailed_message = _tx.get('error_occurred', '错误: {error}').format(error=error_message)
+        
+        # 根据错误类型提供不同的错误信息
+        if 'JSON' in error_message or 'json' in error_message.lower():
+            detailed_message += ' ' + _tx.get('json_error_hint', '这通常是因为AI响应格式有问题，请稍后重试或联系管理员。')
+        elif 'timeout' in error_message.lower() or 'time out' in error_message.lower():
+            detailed_message += ' ' + _tx.get('timeout_error_hint', '这可能是因为网络连接较慢，请稍后重试。')
+        elif 'API' in error_message or 'api' in error_message.lower():
+            detailed_message += ' ' + _tx.get('api_error_hint', 'AI服务暂时不可用，请检查配置或稍后重试。')
+        else:
+            detailed_message += ' ' + _tx.get('general_error_hint', '请稍后重试，如果问题持续存在请联系管理员。')
+        
+        pfile, pcount = try_export_partial_excel(generation_id, headers_dict)
+        if pfile:
+            detailed_message += " " + _tx.get(
+                "partial_save_hint",
+                "已导出已生成的 {n} 条用例：{file}（可在下方下载）",
+            ).format(n=pcount, file=pfile)
+        
+        update_generation_progress(
+            generation_id,
+            progress=0,
+            status='error',
+            message=detailed_message,
+            current_step=_tx.get('error_status', '错误'),
+            error_details=error_message,
+            partial_excel_file=pfile or "",
+            partial_case_count=pcount,
+            resumable=has_generation_checkpoint(generation_id),
+        )
+        update_job(generation_id, status="error", error_summary=error_message[:500])
+
 
 @app.route('/ai_generation_status/<generation_id>')
 def ai_generation_status_page(generation_id):
@@ -721,6 +1011,8 @@ def ai_generation_history():
     mine_only = request.args.get("mine") == "1"
     cid = session.get("client_id") if mine_only else None
     history_jobs = list_jobs(client_id=cid, limit=300)
+    for h in history_jobs:
+        h["resumable"] = h.get("status") == "error" and has_generation_checkpoint(h["generation_id"])
     active_jobs = scan_active_jobs(GENERATION_STATE_DIR)
     all_meta = list_jobs(client_id=None, limit=500)
     id_to_client = {e["generation_id"]: (e.get("client_id") or "")[:8] for e in all_meta}
@@ -763,49 +1055,102 @@ def ai_regenerate(generation_id):
         prefill_historical_defects=snap.get("historical_defects") or "",
         prefill_iteration_context=snap.get("iteration_context") or "",
         prefill_code_change_summary=snap.get("code_change_summary") or "",
+        # 重新生成默认复用已缓存的AI响应，用户可取消勾选以强制重新采样
+        prefill_use_response_cache=True,
     )
 
+@app.route('/ai_resume/<generation_id>', methods=['POST'])
+def ai_resume(generation_id):
+    """从断点继续失败/中断的生成任务：以同一 generation_id 重新入队，已完成的功能点不再生成"""
+    snap = load_request_snapshot(generation_id)
+    if not snap or not has_generation_checkpoint(generation_id):
+        flash(get_text("flash_resume_unavailable", g.lang), "warning")
+        return redirect(url_for("ai_generation_history"))
+    job = job_queue.get(generation_id)
+    if job and job.get("status") in (JOB_QUEUED, JOB_RUNNING):
+        return redirect(url_for('ai_generation_status_page', generation_id=generation_id))
+
+    refresh_generation_progress(generation_id)
+    with progress_tracker_lock:
+        previous = dict(progress_tracker.get(generation_id) or {})
+    _init_progress = {
+        'progress': 0,
+        'total': 100,
+        'status': 'queued',
+        'message': get_text('progress_queued', g.lang),
+        'language': g.lang,
+        'start_time': time.time(),
+        'current_step': '',
+        'estimated_time': 0,
+    }
+    with progress_tracker_lock:
+        progress_tracker[generation_id] = dict(_init_progress)
+    persist_generation_progress_snapshot(generation_id, dict(_init_progress))
+    try:
+        job_queue.enqueue(generation_id, session.get("client_id", ""), session.get('language', 'zh'))
+    except QueueFullError as qe:
+        # 未能入队：恢复原来的（失败）进度，断点保留以便稍后再试
+        if previous:
+            with progress_tracker_lock:
+                progress_tracker[generation_id] = previous
+            persist_generation_progress_snapshot(generation_id, dict(previous))
+        return render_queue_full(qe)
+    update_job(generation_id, status="running", error_summary="")
+    gj = session.get("generation_jobs", [])
+    if generation_id not in gj:
+        session["generation_jobs"] = (gj + [generation_id])[-25:]
+        session.modified = True
+    publish_queue_positions()
+    return redirect(url_for('ai_generation_status_page', generation_id=generation_id))
+
+
+def _progress_stream_payload(data: dict) -> dict:
+    """从进度快照中取出推送给前端的可序列化字段，并计算预计时间"""
+    stream_data = {
+        'progress': data.get('progress', 0),
+        'total': data.get('total', 100),
+        'status': data.get('status', 'starting'),
+        'message': data.get('message', ''),
+        'current_step': data.get('current_step', ''),
+        'excel_file': data.get('excel_file', ''),
+        'ai_report_file': data.get('ai_report_file', ''),
+        'partial_excel_file': data.get('partial_excel_file', ''),
+        'partial_case_count': data.get('partial_case_count', 0),
+        'error_details': data.get('error_details', ''),
+        'resumable': bool(data.get('resumable')),
+    }
+
+    # 计算预计时间（排队中为预计开始前的等待时间）
+    if stream_data['status'] == 'queued':
+        stream_data['queue_position'] = data.get('queue_position', 0)
+        stream_data['estimated_time'] = int(data.get('queue_eta', 0))
+    elif stream_data['progress'] > 0:
+        elapsed = time.time() - data.get('start_time', time.time())
+        estimated_total = (elapsed / stream_data['progress']) * 100
+        estimated_remaining = max(0, estimated_total - elapsed)
+        stream_data['estimated_time'] = int(estimated_remaining)
+    else:
+        stream_data['estimated_time'] = 0
+    return stream_data
+
+
 @app.route('/ai_progress/<generation_id>')
 def ai_progress_stream(generation_id):
-    """进度流（Server-Sent Events）"""
+    """
+    进度流（Server-Sent Events）
+    订阅进度总线，仅在进度变化时推送；空闲时发送心跳注释保持连接。
+    事件 ID 为进度 seq，重连时携带 Last-Event-ID（或 ?last_event_id=）则不重复推送未变化的进度。
+    """
     ui_lang = getattr(g, 'lang', 'zh')
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', ''))
+    except ValueError:
+        last_seq = -1
+    progress_bus.start_watcher(refresh_generation_progress)
 
     def generate():
-        while True:
-            if generation_id not in progress_tracker:
-                load_generation_progress_from_disk(generation_id)
-            if generation_id in progress_tracker:
-                data = progress_tracker[generation_id]
-                
-                # 创建一个只包含可序列化字段的副本
-                stream_data = {
-                    'progress': data.get('progress', 0),
-                    'total': data.get('total', 100),
-                    'status': data.get('status', 'starting'),
-                    'message': data.get('message', ''),
-                    'current_step': data.get('current_step', ''),
-                    'excel_file': data.get('excel_file', ''),
-                    'ai_report_file': data.get('ai_report_file', ''),
-                    'partial_excel_file': data.get('partial_excel_file', ''),
-                    'partial_case_count': data.get('partial_case_count', 0),
-                    'error_details': data.get('error_details', ''),
-                }
-                
-                # 计算预计时间
-                if stream_data['progress'] > 0:
-                    elapsed = time.time() - data.get('start_time', time.time())
-                    estimated_total = (elapsed / stream_data['progress']) * 100
-                    estimated_remaining = max(0, estimated_total - elapsed)
-                    stream_data['estimated_time'] = int(estimated_remaining)
-                else:
-                    stream_data['estimated_time'] = 0
-                
-                yield f"data: {json.dumps(stream_data, ensure_ascii=False)}\n\n"
-                
-                # 如果完成或错误，停止流
-                if stream_data['status'] in ['completed', 'error']:
-                    break
-            else:
+        with progress_bus.subscribe(generation_id) as channel:
+            if not refresh_generation_progress(generation_id):
                 # 如果找不到generation_id，返回错误
                 error_data = {
                     'progress': 0,
@@ -814,18 +1159,34 @@ def ai_progress_stream(generation_id):
                     'current_step': get_text('progress_step_error', ui_lang)
                 }
                 yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
-                break
-            
-            time.sleep(0.5)  # 每0.5秒更新一次
-    
-    return Response(generate(), mimetype='text/event-stream')
+                return
+            with progress_tracker_lock:
+                current = dict(progress_tracker.get(generation_id) or {})
+            progress_bus.publish(generation_id, current)
+            seen = last_seq
+            if current.get('status') in TERMINAL_STATUSES:
+                seen = -1  # 已结束的任务总是推送最终状态
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                update = progress_bus.wait(channel, seen, SSE_HEARTBEAT_SECONDS)
+                if update is None:
+                    yield ": keepalive\n\n"
+                    continue
+                seen, data = update
+                stream_data = _progress_stream_payload(data)
+                yield f"id: {seen}\ndata: {json.dumps(stream_data, ensure_ascii=False)}\n\n"
+
+                # 如果完成或错误，停止流
+                if stream_data['status'] in TERMINAL_STATUSES:
+                    break
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
 
 @app.route('/ai_result/<generation_id>')
 def ai_result(generation_id):
     """显示生成结果"""
-    if generation_id not in progress_tracker:
-        load_generation_progress_from_disk(generation_id)
-    if generation_id not in progress_tracker:
+    if not refresh_generation_progress(generation_id):
         flash(get_text('flash_session_not_found', g.lang), 'error')
         return redirect(url_for('ai_generate'))
     
@@ -835,15 +1196,20 @@ def ai_result(generation_id):
         flash(get_text('flash_generation_incomplete', g.lang), 'warning')
         return redirect(url_for('ai_generate'))
     
-    # 从单独存储获取结果（进程重启后从磁盘恢复）
-    if generation_id not in generation_results:
-        load_generation_results_from_disk(generation_id)
-    if generation_id not in generation_results:
+    # 本进程内存中有完整结果时直接使用；否则只从磁盘读取头部与第一页（任务多在工作线程/进程中执行）
+    with progress_tracker_lock:
+        result_data = generation_results.get(generation_id)
+    if result_data is not None:
+        all_cases = result_data.get('test_cases', [])
+        result_data = dict(result_data, test_cases=all_cases[:10], total_cases=len(all_cases))
+    else:
+        result_data = load_generation_result_page(generation_id, limit=10)
+    if result_data is None:
         flash(get_text('flash_result_missing', g.lang), 'error')
         return redirect(url_for('ai_generate'))
     
-    result_data = generation_results[generation_id]
-    test_cases = result_data.get('test_cases', [])
+    test_cases = result_data['test_cases']
+    total_cases = result_data['total_cases']
     ai_analysis = result_data.get('ai_analysis')
     excel_file = result_data.get('excel_file')
     ai_report_file = result_data.get('ai_report_file')
@@ -851,10 +1217,10 @@ def ai_result(generation_id):
     
     # 获取生成统计信息
     generation_time = request.args.get('gen_time', 'N/A')
-    case_count = request.args.get('case_count', len(test_cases))
+    case_count = request.args.get('case_count', total_cases)
     
-    # 生成统计信息
-    stats = generate_ai_statistics(test_cases, ai_analysis, g.lang)
+    # 生成统计信息（使用随结果落盘的统计摘要，不遍历全部用例）
+    stats = generate_ai_statistics(None, ai_analysis, g.lang, summary=result_data.get('case_summary'))
     
     # 保存到历史记录
     files_dict = {'excel': excel_file}
@@ -863,23 +1229,22 @@ def ai_result(generation_id):
     
     save_test_case_session(
         requirement_text=requirement_text,  # 使用实际的需求文本
-        total_cases=len(test_cases),
+        total_cases=total_cases,
         test_type='AI Generate',
         files=files_dict,
         ui_lang=g.lang
     )
     
     # 清理进度数据
-    del progress_tracker[generation_id]
-    del generation_results[generation_id]
+    forget_generation(generation_id)
     
     return render_template('ai_result.html', 
-                         test_cases=test_cases[:10],
+                         test_cases=test_cases,
                          ai_analysis=ai_analysis,
                          stats=stats,
                          excel_file=excel_file,
                          ai_report_file=ai_report_file,
-                         total_cases=len(test_cases),
+                         total_cases=total_cases,
                          generation_time=generation_time,
                          case_count=case_count)
 
@@ -1146,49 +1511,67 @@ def download_file(filename):
         flash(get_text('flash_download_error', g.lang).format(error=str(e)), 'error')
         return redirect(url_for('ai_generate'))
 
-def generate_ai_statistics(test_cases, ai_analysis, ui_lang='zh'):
-    """生成AI统计信息"""
-    stats = {
-        'total_cases': len(test_cases),
-        'complexity_score': ai_analysis.complexity_score,
-        'complexity_level': get_complexity_level(ai_analysis.complexity_score, ui_lang),
+def summarize_ai_cases(test_cases, ai_analysis):
+    """与界面语言无关的用例统计（生成结束时计算一次，随结果落盘）"""
+    risk_areas = (ai_analysis.risk_areas if ai_analysis else None) or []
+    summary = {
+        'total_cases': 0,
         'priority_stats': {},
         'ai_method_stats': {},
-        'risk_coverage': {},
-        'enhancement_metrics': {}
+        'covered_risks': 0,
+        'ai_enhanced_cases': 0,
     }
-    
-    # 优先级统计
+    covered_risks = set()
     for case in test_cases:
+        summary['total_cases'] += 1
+        # 优先级统计
         priority = case.priority.value
-        stats['priority_stats'][priority] = stats['priority_stats'].get(priority, 0) + 1
-    
-    # AI方法统计
-    for case in test_cases:
+        summary['priority_stats'][priority] = summary['priority_stats'].get(priority, 0) + 1
+        # AI方法统计
+        enhanced = False
         for ai_method in AITestMethod:
             if ai_method.value in case.remark:
-                stats['ai_method_stats'][ai_method.value] = stats['ai_method_stats'].get(ai_method.value, 0) + 1
-    
-    # 风险覆盖统计
-    if ai_analysis.risk_areas:
-        covered_risks = set()
-        for case in test_cases:
+                summary['ai_method_stats'][ai_method.value] = summary['ai_method_stats'].get(ai_method.value, 0) + 1
+                enhanced = True
+        if enhanced:
+            summary['ai_enhanced_cases'] += 1
+        # 风险覆盖统计
+        if risk_areas and len(covered_risks) < len(risk_areas):
             case_text = f"{case.module} {case.submodule} {case.test_steps} {case.remark}".lower()
-            for risk in ai_analysis.risk_areas:
+            for risk in risk_areas:
                 if risk.lower() in case_text:
                     covered_risks.add(risk)
-        
+    summary['covered_risks'] = len(covered_risks)
+    return summary
+
+
+def generate_ai_statistics(test_cases, ai_analysis, ui_lang='zh', summary=None):
+    """生成AI统计信息；summary 为 summarize_ai_cases 的结果（已落盘时无需再遍历用例）"""
+    if summary is None:
+        summary = summarize_ai_cases(test_cases, ai_analysis)
+    total = summary['total_cases']
+    stats = {
+        'total_cases': total,
+        'complexity_score': ai_analysis.complexity_score,
+        'complexity_level': get_complexity_level(ai_analysis.complexity_score, ui_lang),
+        'priority_stats': dict(summary['priority_stats']),
+        'ai_method_stats': dict(summary['ai_method_stats']),
+        'risk_coverage': {},
+        'enhancement_metrics': {}
+    }
+    
+    if ai_analysis.risk_areas:
         stats['risk_coverage'] = {
             'total_risks': len(ai_analysis.risk_areas),
-            'covered_risks': len(covered_risks),
-            'coverage_rate': len(covered_risks) / len(ai_analysis.risk_areas) * 100 if ai_analysis.risk_areas else 0
+            'covered_risks': summary['covered_risks'],
+            'coverage_rate': summary['covered_risks'] / len(ai_analysis.risk_areas) * 100
         }
     
     # AI增强指标
-    ai_enhanced_cases = sum(1 for case in test_cases if any(ai_method.value in case.remark for ai_method in AITestMethod))
+    ai_enhanced_cases = summary['ai_enhanced_cases']
     stats['enhancement_metrics'] = {
         'ai_enhanced_cases': ai_enhanced_cases,
-        'enhancement_rate': ai_enhanced_cases / len(test_cases) * 100 if test_cases else 0
+        'enhancement_rate': ai_enhanced_cases / total * 100 if total else 0
     }
     
     return stats
@@ -1364,6 +1747,9 @@ def save_ai_config():
                 flash(get_text('flash_model_required_custom', g.lang), 'error')
                 return redirect(url_for('ai_config'))
 
+        # 连接池 / 流式输出设置不在表单中，沿用当前配置
+        current = config_manager.load_config()
+        kept = {name: getattr(current, name) for name in CONNECTION_SETTINGS_ENV} if current else {}
         ai_config = AIConfig(
             provider=ai_provider,
             api_key=api_key,
@@ -1371,7 +1757,8 @@ def save_ai_config():
             model=model,
             max_tokens=max_tokens,
             temperature=temperature,
-            timeout=timeout
+            timeout=timeout,
+            **kept
         )
 
         storage = config_manager.save_config(ai_config)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用例精确去重
+按「身份字段」内容计算稳定的 64 位摘要（blake2b，与进程无关，不受 PYTHONHASHSEED 影响），
+以摘要为键建立字典索引：每条用例 O(1) 判重，重复时保留优先级更高的一条，整体 O(n)。
+身份字段默认为 模块 + 子模块 + 测试步骤，可用 AI_DEDUP_FIELDS（逗号分隔的 TestCase 字段名）配置。
+64 位摘要在 10 万条用例规模下误合并的概率约为 3e-10。
+"""
+
+import hashlib
+import os
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .test_case_generator import TestCase
+
+DEFAULT_DEDUP_FIELDS: Tuple[str, ...] = ("module", "submodule", "test_steps")
+
+_SEPARATOR = b"\x1f"
+
+
+def _check_fields(fields: Iterable[str]) -> Tuple[str, ...]:
+    fields = tuple(fields)
+    unknown = [f for f in fields if f not in TestCase.__slots__]
+    if unknown or not fields:
+        raise ValueError(f"无效的去重字段: {', '.join(unknown) or '（空）'}")
+    return fields
+
+
+def dedup_fields(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """校验身份字段；未指定时读取 AI_DEDUP_FIELDS（配置无效时打印警告并使用默认值）"""
+    if fields is not None:
+        return _check_fields(fields)
+    raw = [f.strip() for f in os.environ.get("AI_DEDUP_FIELDS", "").split(",") if f.strip()]
+    if not raw:
+        return DEFAULT_DEDUP_FIELDS
+    try:
+        return _check_fields(raw)
+    except ValueError as e:
+        print(f"⚠️ AI_DEDUP_FIELDS 配置无效，使用默认去重字段: {e}")
+        return DEFAULT_DEDUP_FIELDS
+
+
+def _field_bytes(value) -> bytes:
+    if isinstance(value, Enum):
+        value = value.name
+    elif isinstance(value, (list, tuple)):
+        value = ",".join(v.name if isinstance(v, Enum) else str(v) for v in value)
+    return str(value).encode("utf-8")
+
+
+def case_digest(tc: TestCase, fields: Sequence[str] = DEFAULT_DEDUP_FIELDS) -> int:
+    """用例身份字段的 64 位内容摘要"""
+    h = hashlib.blake2b(digest_size=8)
+    for name in fields:
+        h.update(_field_bytes(getattr(tc, name)))
+        h.update(_SEPARATOR)
+    return int.from_bytes(h.digest(), "big")
+
+
+def deduplicate_cases(test_cases: Iterable[TestCase], fields: Optional[Iterable[str]] = None) -> List[TestCase]:
+    """
+    精确去重：身份字段相同的用例只保留一条（优先级更高者，同级保留先出现的）
+
+    返回顺序与原实现一致：按首次出现排序，被更高优先级替换的用例移到当前末尾
+    """
+    fields = dedup_fields(fields)
+    unique: Dict[int, TestCase] = {}
+    for case in test_cases:
+        key = case_digest(case, fields)
+        existing = unique.get(key)
+        if existing is None:
+            unique[key] = case
+        elif case.priority.value < existing.priority.value:  # P0 < P1 < P2
+            # 删除后重新插入，字典顺序随之移到末尾
+            del unique[key]
+            unique[key] = case
+    return list(unique.values())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 Excel 写入
+基于 openpyxl 只写模式（write_only）：逐行写入，不在内存中保留整张工作表，也不经过 DataFrame。
+只写模式必须在写第一行之前确定列宽（<cols> 位于工作表 XML 的行数据之前），
+因此 rows 需可重复迭代：第一遍只统计每列最大长度，第二遍写入。
+"""
+
+from typing import Callable, Iterable, List, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+
+# 列宽上限（与原 DataFrame 导出一致）
+MAX_COLUMN_WIDTH = 50
+
+_THIN = Side(style='thin')
+# 表头样式与 pandas.DataFrame.to_excel 默认表头一致
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+def measure_column_widths(headers: Sequence[str], rows: Iterable[Sequence],
+                          max_width: int = MAX_COLUMN_WIDTH) -> List[int]:
+    """按 max(内容长度, 表头长度) + 2 计算列宽，上限 max_width"""
+    lengths = [len(str(h)) for h in headers]
+    count = len(lengths)
+    for row in rows:
+        for idx in range(count):
+            n = len(str(row[idx]))
+            if n > lengths[idx]:
+                lengths[idx] = n
+    return [min(n + 2, max_width) for n in lengths]
+
+
+def write_excel_stream(file_path: str, headers: Sequence[str], rows: Callable[[], Iterable[Sequence]],
+                       sheet_name: str = 'Sheet1', max_width: int = MAX_COLUMN_WIDTH) -> str:
+    """
+    流式写入 Excel 文件
+
+    Args:
+        file_path: 导出文件路径
+        headers: 表头
+        rows: 每次调用返回一个新的行迭代器（行为与表头等长的序列）
+        sheet_name: 工作表名称
+        max_width: 列宽上限
+
+    Returns:
+        str: 导出文件路径
+    """
+    widths = measure_column_widths(headers, rows(), max_width)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = _HEADER_FONT
+        cell.border = _HEADER_BORDER
+        cell.alignment = _HEADER_ALIGNMENT
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows():
+        ws.append(row)
+
+    wb.save(file_path)
+    return file_path
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+严格生成流程的断点续跑
+各阶段产物完成后立即追加到 {id}.checkpoint.jsonl（只追加，回放即得到当前进度）：
+- 头部：输入指纹（需求、语言、历史缺陷、迭代说明、代码变更摘要），输入变化时整个断点作废
+- function_points：提取出的功能点
+- refined / mindmap：需求梳理摘要、测试点思维导图表格
+- point：某个功能点已完成，附带其用例（记录格式同 result_store）
+同一任务中断后再次执行（租约过期重新入队或用户点击「继续生成」）时，已完成的阶段与功能点直接复用，
+只生成剩余部分。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .result_store import case_to_record, record_to_case
+from .test_case_generator import TestCase
+
+CHECKPOINT_FORMAT = "generation-checkpoint"
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def input_fingerprint(requirement_text: str, language: str = "zh", *context: Optional[str]) -> str:
+    """生成输入的指纹；context 依次为历史缺陷、迭代说明、代码变更摘要等附加输入"""
+    h = hashlib.sha256()
+    for part in (requirement_text, language) + context:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:32]
+
+
+@dataclass
+class CheckpointState:
+    """回放断点得到的进度；未完成的阶段为 None"""
+    function_points: Optional[List[Dict[str, Any]]] = None  # FunctionPoint 的字段字典
+    refined: Optional[str] = None
+    mindmap: Optional[str] = None
+    points: Dict[int, List[TestCase]] = field(default_factory=dict)  # {功能点 id: 用例}
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class GenerationCheckpoint:
+    """
+    单个生成任务的断点日志。
+    load() 回放已有记录；之后的 save_* 追加写入（指纹不符或文件不存在时先重写头部）。
+    写入失败只打印警告，不影响生成本身。
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._valid = False  # 文件中已有与当前输入一致的头部
+
+    def load(self) -> CheckpointState:
+        state = CheckpointState()
+        self._valid = False
+        if not os.path.isfile(self.path):
+            return state
+        try:
+            with open(self.path, "rb") as f:
+                header = json.loads(f.readline() or b"{}")
+                if (header.get("format") != CHECKPOINT_FORMAT
+                        or header.get("version", 0) > CHECKPOINT_FORMAT_VERSION
+                        or header.get("fingerprint") != self.fingerprint):
+                    print("ℹ️ 断点与本次输入不一致，忽略并重新生成")
+                    return state
+                good_size = f.tell()
+                torn = False
+                for line in iter(f.readline, b""):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        entry = json.loads(line)
+                    except ValueError:
+                        torn = True  # 进程中断时写了一半的末行
+                        break
+                    good_size += len(line)
+                    op = entry.get("op")
+                    if op == "function_points":
+                        state.function_points = entry["items"]
+                        state.points.clear()
+                    elif op == "refined":
+                        state.refined = entry["text"]
+                    elif op == "mindmap":
+                        state.mindmap = entry["text"]
+                    elif op == "point":
+                        state.points[entry["id"]] = [record_to_case(r) for r in entry["cases"]]
+            if torn:
+                # 截掉残缺的末行，之后的追加才能从新行开始
+                os.truncate(self.path, good_size)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ 读取生成断点失败，将重新生成: {e}")
+            return CheckpointState()
+        self._valid = True
+        return state
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if self._valid:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(_dumps(entry))
+                    return
+                header = dict(format=CHECKPOINT_FORMAT, version=CHECKPOINT_FORMAT_VERSION,
+                              fingerprint=self.fingerprint)
+                with open(self.path, "w", encoding="utf-8") as f:
+                    f.write(_dumps(header) + _dumps(entry))
+                self._valid = True
+            except OSError as e:
+                print(f"⚠️ 写入生成断点失败: {e}")
+
+    def save_function_points(self, function_points: Sequence[Any]) -> None:
+        """功能点列表（FunctionPoint dataclass）；重新提取时之前完成的功能点随之作废"""
+        self._append({"op": "function_points", "items": [asdict(fp) for fp in function_points]})
+
+    def save_refined(self, text: str) -> None:
+        self._append({"op": "refined", "text": text or ""})
+
+    def save_mindmap(self, text: str) -> None:
+        self._append({"op": "mindmap", "text": text or ""})
+
+    def save_point(self, point_id: int, cases: Sequence[TestCase]) -> None:
+        """标记功能点已完成并保存其用例"""
+        self._append({"op": "point", "id": point_id, "cases": [case_to_record(tc) for tc in cases]})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._valid = False
+            if os.path.isfile(self.path):
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
-"""本地生成任务历史与请求快照（支持多人并发：按 generation_id 隔离）。"""
+"""
+本地生成任务历史与请求快照（支持多人并发：按 generation_id 隔离）。
+历史存于 SQLite（WAL）：追加 O(1)，按 generation_id / client_id 走索引；旧版 JSON 首次使用时自动迁移。
+"""
 
 from __future__ import annotations
 
 import json
 import os
+import sqlite3
 import threading
 from datetime import datetime, timezone
 
 from .paths import PROJECT_ROOT
 
+HISTORY_DB_PATH = os.path.join(PROJECT_ROOT, "data", "generation_history.db")
+# 旧版 JSON 历史（仅用于迁移）
 HISTORY_PATH = os.path.join(PROJECT_ROOT, "data", "generation_history.json")
 STATE_DIR = os.path.join(PROJECT_ROOT, "data", "generation_state")
 _LOCK = threading.Lock()
@@ -45,24 +51,120 @@ def load_request_snapshot(generation_id: str) -> dict | None:
         return None
 
 
-def _read_history() -> list:
-    if not os.path.isfile(HISTORY_PATH):
-        return []
+_JOB_COLUMNS = (
+    "generation_id",
+    "client_id",
+    "title",
+    "status",
+    "created_at",
+    "updated_at",
+    "case_count",
+    "error_summary",
+    "excel_file",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation_history (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    generation_id TEXT NOT NULL UNIQUE,
+    client_id     TEXT NOT NULL DEFAULT '',
+    title         TEXT NOT NULL DEFAULT '',
+    status        TEXT NOT NULL DEFAULT 'running',
+    created_at    TEXT,
+    updated_at    TEXT,
+    case_count    INTEGER,
+    error_summary TEXT,
+    excel_file    TEXT,
+    extra         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_generation_history_client ON generation_history (client_id, id);
+"""
+
+_local = threading.local()
+_initialized = False
+# 每追加多少条检查一次是否超出 MAX_ENTRIES
+_COMPACT_EVERY = 50
+
+
+def _connect() -> sqlite3.Connection:
+    """每个线程一个 SQLite 连接（WAL：读写互不阻塞）；首次使用时建表并迁移旧 JSON"""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(HISTORY_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(HISTORY_DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    if not _initialized:
+        with _LOCK:
+            if not _initialized:
+                conn.executescript(_SCHEMA)
+                migrate_json_history(conn)
+                _initialized = True
+    return conn
+
+
+def _row_to_entry(row: sqlite3.Row) -> dict:
+    entry = {k: row[k] for k in _JOB_COLUMNS}
+    if row["extra"]:
+        try:
+            entry.update(json.loads(row["extra"]))
+        except json.JSONDecodeError:
+            pass
+    return entry
+
+
+def migrate_json_history(conn: sqlite3.Connection | None = None, path: str | None = None) -> int:
+    """
+    把旧版 generation_history.json 导入 SQLite（仅当库为空时），完成后重命名为 .migrated。
+    返回导入条数。
+    """
+    path = path or HISTORY_PATH
+    if not os.path.isfile(path):
+        return 0
+    conn = conn or _connect()
+    if conn.execute("SELECT 1 FROM generation_history LIMIT 1").fetchone():
+        return 0
     try:
-        with open(HISTORY_PATH, encoding="utf-8") as f:
+        with open(path, encoding="utf-8") as f:
             data = json.load(f)
-        return data if isinstance(data, list) else []
-    except (OSError, json.JSONDecodeError):
-        return []
+    except (OSError, json.JSONDecodeError) as ex:
+        print(f"⚠️ 读取旧版生成历史失败，跳过迁移: {ex}")
+        return 0
+    if not isinstance(data, list):
+        return 0
+    # JSON 中最新的在前；按时间正序插入，使自增 id 与新旧顺序一致
+    rows = [e for e in reversed(data) if isinstance(e, dict) and e.get("generation_id")]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for e in rows:
+            extra = {k: v for k, v in e.items() if k not in _JOB_COLUMNS}
+            conn.execute(
+                "INSERT OR IGNORE INTO generation_history "
+                f"({', '.join(_JOB_COLUMNS)}, extra) VALUES ({', '.join('?' * (len(_JOB_COLUMNS) + 1))})",
+                tuple(e.get(k) for k in _JOB_COLUMNS) + (json.dumps(extra, ensure_ascii=False) if extra else None,),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    try:
+        os.replace(path, path + ".migrated")
+    except OSError:
+        pass
+    print(f"📦 已将 {len(rows)} 条生成历史从 JSON 迁移到 {HISTORY_DB_PATH}")
+    return len(rows)
 
 
-def _write_history(entries: list) -> None:
-    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
-    tmp = HISTORY_PATH + ".tmp"
-    trimmed = entries[:MAX_ENTRIES]
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(trimmed, f, ensure_ascii=False, indent=0)
-    os.replace(tmp, HISTORY_PATH)
+def _compact(conn: sqlite3.Connection) -> None:
+    """只保留最近 MAX_ENTRIES 条"""
+    conn.execute(
+        "DELETE FROM generation_history WHERE id <= "
+        "(SELECT id FROM generation_history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+        (MAX_ENTRIES,),
+    )
 
 
 def append_job(
@@ -72,56 +174,66 @@ def append_job(
     status: str = "running",
 ) -> None:
     now = datetime.now(timezone.utc).isoformat()
-    entry = {
-        "generation_id": generation_id,
-        "client_id": client_id or "",
-        "title": _title_from_requirement(requirement_text),
-        "status": status,
-        "created_at": now,
-        "updated_at": now,
-        "case_count": None,
-        "error_summary": None,
-        "excel_file": None,
-    }
-    with _LOCK:
-        arr = _read_history()
-        arr.insert(0, entry)
-        _write_history(arr)
+    conn = _connect()
+    cur = conn.execute(
+        "INSERT OR REPLACE INTO generation_history "
+        "(generation_id, client_id, title, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (generation_id, client_id or "", _title_from_requirement(requirement_text), status, now, now),
+    )
+    if cur.lastrowid and cur.lastrowid % _COMPACT_EVERY == 0:
+        _compact(conn)
 
 
 def update_job(generation_id: str, **kwargs) -> None:
+    fields = {k: v for k, v in kwargs.items() if v is not None}
     now = datetime.now(timezone.utc).isoformat()
-    with _LOCK:
-        arr = _read_history()
-        found = False
-        for i, e in enumerate(arr):
-            if e.get("generation_id") == generation_id:
-                e = dict(e)
-                for k, v in kwargs.items():
-                    if v is not None:
-                        e[k] = v
-                e["updated_at"] = now
-                arr[i] = e
-                found = True
-                break
-        if found:
-            _write_history(arr)
+    conn = _connect()
+    columns = {k: v for k, v in fields.items() if k in _JOB_COLUMNS and k != "generation_id"}
+    extra = {k: v for k, v in fields.items() if k not in _JOB_COLUMNS}
+    columns["updated_at"] = now
+    assignments = ", ".join(f"{k} = ?" for k in columns)
+    params = list(columns.values()) + [generation_id]
+    if not extra:
+        conn.execute(f"UPDATE generation_history SET {assignments} WHERE generation_id = ?", params)
+        return
+    # 非固定列的字段合并进 extra（JSON）
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT extra FROM generation_history WHERE generation_id = ?", (generation_id,)
+        ).fetchone()
+        if row is not None:
+            merged = json.loads(row["extra"]) if row["extra"] else {}
+            merged.update(extra)
+            conn.execute(
+                f"UPDATE generation_history SET {assignments}, extra = ? WHERE generation_id = ?",
+                params[:-1] + [json.dumps(merged, ensure_ascii=False), generation_id],
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
 
 def list_jobs(client_id: str | None = None, limit: int = 200) -> list:
-    with _LOCK:
-        arr = _read_history()
+    conn = _connect()
     if client_id:
-        arr = [x for x in arr if x.get("client_id") == client_id]
-    return arr[:limit]
+        rows = conn.execute(
+            "SELECT * FROM generation_history WHERE client_id = ? ORDER BY id DESC LIMIT ?",
+            (client_id, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM generation_history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [_row_to_entry(r) for r in rows]
 
 
 def get_job(generation_id: str) -> dict | None:
-    with _LOCK:
-        for e in _read_history():
-            if e.get("generation_id") == generation_id:
-                return dict(e)
-    return None
+    row = _connect().execute(
+        "SELECT * FROM generation_history WHERE generation_id = ?", (generation_id,)
+    ).fetchone()
+    return _row_to_entry(row) if row else None
 
 
 def scan_active_jobs(state_dir: str) -> list[dict]:
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化生成任务队列（SQLite，WAL 模式，无需外部服务）
+- Web 端只负责入队（enqueue）与推送进度；工作进程/线程通过 claim 原子领取任务
+- 领取后持有租约（lease），执行期间定期 heartbeat 续约
+- 工作进程崩溃或重启导致租约过期时，任务自动重新入队（超过最大尝试次数则标记失败）
+- 准入控制：全局最大运行数、每个 client_id 的运行配额、队列深度上限（超限入队抛 QueueFullError）
+- 公平调度：优先领取运行中任务最少、且最久未被服务的客户端的任务
+多个工作进程（甚至多台机器挂载同一 data 目录）可共享同一队列文件。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .paths import PROJECT_ROOT
+
+JOB_QUEUE_PATH = os.path.join(PROJECT_ROOT, "data", "job_queue.db")
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    generation_id TEXT PRIMARY KEY,
+    client_id     TEXT NOT NULL DEFAULT '',
+    language      TEXT NOT NULL DEFAULT 'zh',
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    worker_id     TEXT,
+    lease_until   REAL,
+    enqueued_at   REAL NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs (status, enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_client ON generation_jobs (client_id, status);
+"""
+
+
+# 没有历史耗时数据时，估算单个任务的执行时长（秒）
+DEFAULT_JOB_DURATION = 180.0
+
+
+class QueueFullError(Exception):
+    """队列已满或该客户端排队任务过多，需稍后重试"""
+
+    def __init__(self, message: str, retry_after: int = 60, scope: str = "global"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.scope = scope  # global | client
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class GenerationJobQueue:
+    """基于 SQLite 的持久化任务队列（线程安全、多进程安全）"""
+
+    def __init__(self, db_path: str = JOB_QUEUE_PATH, lease_seconds: float = 120.0, max_attempts: int = 2,
+                 max_active: int = 4, max_active_per_client: int = 2,
+                 max_queue_depth: int = 50, max_queued_per_client: int = 10):
+        self.db_path = db_path
+        self.lease_seconds = max(float(lease_seconds), 10.0)
+        self.max_attempts = max(int(max_attempts), 1)
+        # 准入限制；<=0 表示不限制
+        self.max_active = int(max_active)
+        self.max_active_per_client = int(max_active_per_client)
+        self.max_queue_depth = int(max_queue_depth)
+        self.max_queued_per_client = int(max_queued_per_client)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        # 任务因超过重试次数被放弃时的回调（由 job_worker 注册）
+        self.on_abandoned = None
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接；首次使用时建表"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def enqueue(self, generation_id: str, client_id: str = "", language: str = "zh"):
+        """
+        入队（检查队列深度与该客户端排队数，超限抛出 QueueFullError）；
+        同一 generation_id 重复入队时重置为排队状态
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            depth, mine = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(client_id = ?), 0) FROM generation_jobs WHERE status = ?",
+                (client_id or "", JOB_QUEUED),
+            ).fetchone()
+            if self.max_queue_depth > 0 and depth >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"排队任务已达上限 {self.max_queue_depth}",
+                    retry_after=self._retry_after(conn, depth), scope="global")
+            if self.max_queued_per_client > 0 and mine >= self.max_queued_per_client:
+                raise QueueFullError(
+                    f"该客户端排队任务已达上限 {self.max_queued_per_client}",
+                    retry_after=self._retry_after(conn, mine), scope="client")
+            conn.execute(
+                "INSERT OR REPLACE INTO generation_jobs "
+                "(generation_id, client_id, language, status, attempts, enqueued_at) VALUES (?, ?, ?, ?, 0, ?)",
+                (generation_id, client_id or "", language or "zh", JOB_QUEUED, time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _slots(self) -> int:
+        return self.max_active if self.max_active > 0 else 1
+
+    def _retry_after(self, conn: sqlite3.Connection, ahead: int) -> int:
+        """建议客户端多久后重试：前面任务消化掉一轮所需时间，至少 10 秒"""
+        waves = max(ahead, 1) / self._slots()
+        return max(int(waves * self._average_duration(conn)), 10)
+
+    def _average_duration(self, conn: sqlite3.Connection) -> float:
+        """最近 20 个成功任务的平均执行时长"""
+        row = conn.execute(
+            "SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM generation_jobs "
+            "WHERE status = ? AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT 20)",
+            (JOB_DONE,),
+        ).fetchone()
+        return float(row[0]) if row and row[0] else DEFAULT_JOB_DURATION
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> List[str]:
+        """回收租约过期的任务；需在事务内调用。返回因超过尝试次数而失败的任务 ID"""
+        expired = conn.execute(
+            "SELECT generation_id, attempts FROM generation_jobs WHERE status = ? AND lease_until < ?",
+            (JOB_RUNNING, now),
+        ).fetchall()
+        failed = []
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE generation_jobs SET status = ?, finished_at = ?, worker_id = NULL, "
+                    "error = '工作进程中断，已超过最大重试次数' WHERE generation_id = ?",
+                    (JOB_FAILED, now, row["generation_id"]),
+                )
+                failed.append(row["generation_id"])
+            else:
+                conn.execute(
+                    "UPDATE generation_jobs SET status = ?, worker_id = NULL, lease_until = NULL "
+                    "WHERE generation_id = ?",
+                    (JOB_QUEUED, row["generation_id"]),
+                )
+                print(f"♻️ 任务 {row['generation_id'][:8]} 租约过期，重新入队")
+        return failed
+
+    def _pick_fair(self, queued: List[sqlite3.Row], running: Dict[str, int],
+                   last_served: Dict[str, float]) -> Optional[sqlite3.Row]:
+        """
+        公平选择：跳过已达运行配额的客户端；其余按（运行中任务数，最近一次被服务时间，入队时间）排序，
+        使一个客户端的大量排队任务不会饿死其他客户端
+        """
+        best, best_key = None, None
+        for row in queued:
+            cid = row["client_id"]
+            n = running.get(cid, 0)
+            if self.max_active_per_client > 0 and n >= self.max_active_per_client:
+                continue
+            key = (n, last_served.get(cid, 0.0), row["enqueued_at"])
+            if best_key is None or key < best_key:
+                best, best_key = row, key
+        return best
+
+    def _load_schedule(self, conn: sqlite3.Connection):
+        """读取调度所需状态：排队任务（按入队时间）、各客户端运行数、各客户端最近开始时间"""
+        queued = conn.execute(
+            "SELECT * FROM generation_jobs WHERE status = ? ORDER BY enqueued_at", (JOB_QUEUED,)
+        ).fetchall()
+        running = {
+            r["client_id"]: r["n"] for r in conn.execute(
+                "SELECT client_id, COUNT(*) AS n FROM generation_jobs WHERE status = ? GROUP BY client_id",
+                (JOB_RUNNING,),
+            )
+        }
+        last_served = {
+            r["client_id"]: r["t"] for r in conn.execute(
+                "SELECT client_id, MAX(started_at) AS t FROM generation_jobs "
+                "WHERE started_at IS NOT NULL GROUP BY client_id"
+            )
+        }
+        return queued, running, last_served
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """原子领取下一个任务（受全局并发与客户端配额限制，公平调度）；无可领取任务时返回 None"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            failed = self._requeue_expired(conn, now)
+            queued, running, last_served = self._load_schedule(conn)
+            row = None
+            if not (self.max_active > 0 and sum(running.values()) >= self.max_active):
+                row = self._pick_fair(queued, running, last_served)
+            if row is not None:
+                conn.execute(
+                    "UPDATE generation_jobs SET status = ?, worker_id = ?, lease_until = ?, "
+                    "started_at = ?, attempts = attempts + 1 WHERE generation_id = ?",
+                    (JOB_RUNNING, worker_id, now + self.lease_seconds, now, row["generation_id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for gid in failed:
+            self._on_abandoned(gid)
+        if row is None:
+            return None
+        job = dict(row)
+        job["status"] = JOB_RUNNING
+        job["attempts"] += 1
+        return job
+
+    def queue_positions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按调度规则模拟出队顺序，返回每个排队任务的位置与预计开始等待秒数：
+        {generation_id: {"position": 1 起, "ahead": 前面任务数, "eta": 秒}}
+        """
+        conn = self._conn()
+        queued, running, last_served = self._load_schedule(conn)
+        avg = self._average_duration(conn)
+        slots = self._slots()
+        # 运行中任务按已执行时间估算剩余时长，用于推算各槽位何时空出
+        now = time.time()
+        busy = sorted(
+            now + max(avg - (now - (r["started_at"] or now)), 0.0)
+            for r in conn.execute("SELECT started_at FROM generation_jobs WHERE status = ?", (JOB_RUNNING,))
+        )[:slots]
+        free_at = busy + [now] * (slots - len(busy))
+        pending = list(queued)
+        out: Dict[str, Dict[str, Any]] = {}
+        position = 0
+        while pending:
+            row = self._pick_fair(pending, running, last_served)
+            if row is None:
+                # 剩余任务都被客户端配额挡住：假设最早的运行任务结束后释放配额
+                row = pending[0]
+            pending.remove(row)
+            position += 1
+            start = min(free_at)
+            out[row["generation_id"]] = {
+                "position": position,
+                "ahead": position - 1,
+                "eta": int(max(start - now, 0.0)),
+            }
+            free_at[free_at.index(start)] = start + avg
+            # 模拟中只推进「最近被服务时间」，实现客户端间轮转
+            last_served[row["client_id"]] = start
+        return out
+
+    def _on_abandoned(self, generation_id: str):
+        """任务被放弃时通知上层（写入进度快照与历史），避免界面一直显示运行中"""
+        if self.on_abandoned is None:
+            return
+        try:
+            self.on_abandoned(generation_id)
+        except Exception as e:
+            print(f"⚠️ 处理放弃任务 {generation_id[:8]} 失败: {e}")
+
+    def heartbeat(self, generation_id: str, worker_id: str) -> bool:
+        """续约；返回 False 表示租约已被回收（任务已由其他工作进程接管）"""
+        cur = self._conn().execute(
+            "UPDATE generation_jobs SET lease_until = ? WHERE generation_id = ? AND worker_id = ? AND status = ?",
+            (time.time() + self.lease_seconds, generation_id, worker_id, JOB_RUNNING),
+        )
+        return cur.rowcount > 0
+
+    def _finish(self, generation_id: str, worker_id: str, status: str, error: Optional[str]):
+        self._conn().execute(
+            "UPDATE generation_jobs SET status = ?, finished_at = ?, lease_until = NULL, error = ? "
+            "WHERE generation_id = ? AND worker_id = ?",
+            (status, time.time(), error, generation_id, worker_id),
+        )
+
+    def complete(self, generation_id: str, worker_id: str):
+        self._finish(generation_id, worker_id, JOB_DONE, None)
+
+    def fail(self, generation_id: str, worker_id: str, error: str):
+        self._finish(generation_id, worker_id, JOB_FAILED, (error or "")[:500])
+
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM generation_jobs WHERE generation_id = ?", (generation_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM generation_jobs GROUP BY status"
+        ).fetchall()
+        out = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        out.update({r["status"]: r["n"] for r in rows})
+        out["max_active"] = self.max_active
+        out["max_queue_depth"] = self.max_queue_depth
+        return out
+
+    def purge_finished(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """清理早于指定时间的已结束任务记录"""
+        cur = self._conn().execute(
+            "DELETE FROM generation_jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (JOB_DONE, JOB_FAILED, time.time() - older_than_seconds),
+        )
+        return cur.rowcount
+
+
+# 全局队列实例（租约、重试次数与准入限制可通过环境变量调整）
+job_queue = GenerationJobQueue(
+    lease_seconds=_env_number("AI_JOB_LEASE_SECONDS", 120, float),
+    max_attempts=_env_number("AI_JOB_MAX_ATTEMPTS", 2),
+    max_active=_env_number("AI_MAX_ACTIVE_JOBS", 4),
+    max_active_per_client=_env_number("AI_MAX_JOBS_PER_CLIENT", 2),
+    max_queue_depth=_env_number("AI_MAX_QUEUE_DEPTH", 50),
+    max_queued_per_client=_env_number("AI_MAX_QUEUED_PER_CLIENT", 10),
+)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成任务工作池
+从持久化队列（job_queue）领取任务并执行 run_generation_job，进度写回 data/generation_state。
+两种运行方式：
+- 进程内：Web 进程首次处理请求时启动 AI_EMBEDDED_WORKERS 个工作线程（默认 2，设为 0 关闭）
+- 独立进程：python run_worker.py --processes 2 --threads 2（可在多台机器上共享同一 data 目录）
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sqlite3
+import threading
+from typing import List, Optional
+
+from .generation_history import load_request_snapshot, update_job
+from .job_queue import job_queue
+
+_embedded_lock = threading.Lock()
+_embedded_started = False
+_embedded_stop = threading.Event()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def make_worker_id(suffix: str) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{suffix}"
+
+
+def _mark_abandoned(generation_id: str):
+    """租约多次过期被放弃的任务：写入错误进度与历史"""
+    from .ai_web_app import has_generation_checkpoint, refresh_generation_progress, update_generation_progress
+
+    message = "工作进程中断，已超过最大重试次数"
+    if refresh_generation_progress(generation_id):
+        update_generation_progress(generation_id, progress=0, status="error", message=message, error_details=message,
+                                   resumable=has_generation_checkpoint(generation_id))
+    update_job(generation_id, status="error", error_summary=message)
+
+
+job_queue.on_abandoned = _mark_abandoned
+
+
+def _heartbeat_loop(generation_id: str, worker_id: str, stop: threading.Event):
+    interval = max(job_queue.lease_seconds / 3.0, 2.0)
+    while not stop.wait(interval):
+        try:
+            if not job_queue.heartbeat(generation_id, worker_id):
+                print(f"⚠️ 任务 {generation_id[:8]} 的租约已被回收，结果可能被其他工作进程覆盖")
+                return
+        except sqlite3.Error as e:
+            print(f"⚠️ 任务续约失败: {e}")
+
+
+def run_claimed_job(job: dict, worker_id: str):
+    """执行一个已领取的任务，并在结束后更新队列状态"""
+    from .ai_web_app import forget_generation, publish_queue_positions, run_generation_job
+
+    generation_id = job["generation_id"]
+    snap = load_request_snapshot(generation_id)
+    if not snap:
+        print(f"❌ 任务 {generation_id[:8]} 缺少请求快照，跳过")
+        job_queue.fail(generation_id, worker_id, "请求快照不存在")
+        update_job(generation_id, status="error", error_summary="请求快照不存在")
+        return
+
+    print(f"🛠️ [{worker_id}] 开始任务 {generation_id[:8]}（第 {job.get('attempts', 1)} 次尝试）")
+    publish_queue_positions()
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(generation_id, worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        run_generation_job(generation_id, snap, job.get("language") or "zh")
+        job_queue.complete(generation_id, worker_id)
+        print(f"✅ [{worker_id}] 任务 {generation_id[:8]} 结束")
+    except Exception as e:
+        # run_generation_job 自身会记录业务错误；这里只兜底未预期的异常
+        print(f"❌ [{worker_id}] 任务 {generation_id[:8]} 异常: {e}")
+        job_queue.fail(generation_id, worker_id, str(e))
+        update_job(generation_id, status="error", error_summary=str(e)[:500])
+    finally:
+        stop.set()
+        heartbeat.join(timeout=5)
+        # 结果与进度均已落盘，释放本进程内存（Web 端按需从磁盘加载）
+        forget_generation(generation_id)
+        publish_queue_positions()
+
+
+def worker_loop(worker_id: str, stop: threading.Event, poll_interval: float = 1.0):
+    """持续领取并执行任务，直到 stop 被设置（当前任务会执行完毕）"""
+    while not stop.is_set():
+        try:
+            job = job_queue.claim(worker_id)
+        except sqlite3.Error as e:
+            print(f"⚠️ [{worker_id}] 领取任务失败: {e}")
+            job = None
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        try:
+            run_claimed_job(job, worker_id)
+        except Exception as e:
+            print(f"❌ [{worker_id}] 处理任务失败: {e}")
+
+
+def start_workers(count: int, stop: threading.Event, name: str = "worker",
+                  daemon: bool = False, poll_interval: float = 1.0) -> List[threading.Thread]:
+    threads = []
+    for i in range(max(int(count), 0)):
+        worker_id = make_worker_id(f"{name}-{i + 1}")
+        t = threading.Thread(
+            target=worker_loop,
+            args=(worker_id, stop, poll_interval),
+            name=f"ai-job-{name}-{i + 1}",
+            daemon=daemon,
+        )
+        t.start()
+        threads.append(t)
+    return threads
+
+
+def ensure_job_workers():
+    """在 Web 进程内启动工作线程（仅一次）；AI_EMBEDDED_WORKERS=0 时不启动"""
+    global _embedded_started
+    if _embedded_started:
+        return
+    with _embedded_lock:
+        if _embedded_started:
+            return
+        _embedded_started = True
+        count = _env_int("AI_EMBEDDED_WORKERS", 2)
+        if count <= 0:
+            print("ℹ️ 未启动进程内工作线程，生成任务由独立工作进程处理（python run_worker.py）")
+            return
+        # 守护线程：进程退出时正在执行的任务租约过期后会被重新入队
+        start_workers(count, _embedded_stop, name="embedded", daemon=True)
+        print(f"🧵 已启动 {count} 个进程内生成工作线程")
+
+
+def _serve(threads: int, poll_interval: float):
+    """独立工作进程主循环：收到 SIGTERM/SIGINT 后停止领取新任务，等当前任务完成再退出"""
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        if not stop.is_set():
+            print(f"🛑 [{os.getpid()}] 收到退出信号，等待当前任务完成...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+    workers = start_workers(threads, stop, name="worker", poll_interval=poll_interval)
+    print(f"🚀 工作进程 {os.getpid()} 已启动 {len(workers)} 个线程，队列: {job_queue.db_path}")
+    while any(t.is_alive() for t in workers):
+        for t in workers:
+            t.join(timeout=1.0)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="AI 测试用例生成任务工作进程")
+    parser.add_argument("--processes", type=int, default=_env_int("AI_WORKER_PROCESSES", 1),
+                        help="工作进程数（默认 1）")
+    parser.add_argument("--threads", type=int, default=_env_int("AI_WORKER_THREADS", 2),
+                        help="每个进程的并发任务数（默认 2）")
+    parser.add_argument("--poll", type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+    args = parser.parse_args(argv)
+
+    processes = max(args.processes, 1)
+    threads = max(args.threads, 1)
+    if processes > 1 and not os.environ.get("AI_RATE_LIMIT_PROCESSES", "").strip():
+        # 子进程各自限流：未显式配置时按本命令启动的进程数均分额度（子进程继承环境变量）
+        os.environ["AI_RATE_LIMIT_PROCESSES"] = str(processes)
+        print(f"ℹ️ 限流额度按 {processes} 个工作进程均分（可用 AI_RATE_LIMIT_PROCESSES 指定共用额度的总进程数）")
+    if processes == 1:
+        _serve(threads, args.poll)
+        return
+
+    import multiprocessing
+
+    children = [
+        multiprocessing.Process(target=_serve, args=(threads, args.poll), name=f"ai-job-worker-{i + 1}")
+        for i in range(processes)
+    ]
+    for p in children:
+        p.start()
+    print(f"🚀 已启动 {processes} 个工作进程 × {threads} 线程")
+
+    def _forward_sigterm(signum, frame):
+        # 转发给子进程，由子进程各自完成当前任务后退出
+        for p in children:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, _forward_sigterm)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 已发送到整个进程组，子进程自行处理
+    for p in children:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+需求文本关键词查询（按文档缓存、各分析器共享）
+本地需求分析器（复杂度、风险、性能、安全、可用性、功能点规模等）原先各自对关键词列表逐个 `in` / re.search，
+同一文档的同一关键词会被不同分析器重复查找。这里把所有关键词族集中定义，scan() 返回的 KeywordHits
+对每个关键词最多查找一次（C 实现的 str.__contains__ / str.count），结果记忆在对象上，供各分析器共用。
+- 不区分大小写的族在小写副本上查找（副本只在首次需要时生成一次）；不含字母的关键词（如中文）直接查原文
+- count() 为各关键词的非重叠出现次数之和（与原先 re.findall 的计数一致）
+- scan_requirement() 缓存最近扫描的文本，同一文档被多个分析器依次分析时共用同一个 KeywordHits
+纯 Python 的逐字符多模式匹配（Aho-Corasick）在关键词密集的中文需求上比逐词的 C 级查找更慢，故不采用。
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping
+
+
+class KeywordHits:
+    """单个文本的关键词查询结果（惰性求值并记忆）；按族查询命中的关键词与次数"""
+
+    __slots__ = ("text", "_engine", "_lower", "_present", "_counts")
+
+    def __init__(self, text: str, engine: "KeywordEngine"):
+        self.text = text
+        self._engine = engine
+        self._lower = None
+        self._present: Dict[tuple, bool] = {}
+        self._counts: Dict[tuple, int] = {}  # 并发查询时重复计算的结果相同，无需加锁
+
+    def _haystack(self, keyword: str, case_sensitive: bool) -> tuple:
+        """(被查找的文本, 关键词)；不含字母的关键词大小写无关，直接查原文"""
+        if case_sensitive or keyword.upper() == keyword.lower():
+            return self.text, keyword
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower, keyword.lower()
+
+    def contains(self, keyword: str, case_sensitive: bool = False) -> bool:
+        key = (keyword, case_sensitive)
+        found = self._present.get(key)
+        if found is None:
+            text, needle = self._haystack(keyword, case_sensitive)
+            found = self._present[key] = needle in text
+        return found
+
+    def occurrences(self, keyword: str, case_sensitive: bool = False) -> int:
+        """关键词的非重叠出现次数"""
+        key = (keyword, case_sensitive)
+        n = self._counts.get(key)
+        if n is None:
+            if self._present.get(key) is False:
+                n = 0
+            else:
+                text, needle = self._haystack(keyword, case_sensitive)
+                n = text.count(needle)
+            self._counts[key] = n
+        return n
+
+    def found(self, family: str) -> List[str]:
+        """族内出现过的关键词（按族定义顺序，保持原写法）"""
+        sensitive = family in self._engine.case_sensitive
+        return [kw for kw in self._engine.families[family] if self.contains(kw, sensitive)]
+
+    def has(self, family: str) -> bool:
+        sensitive = family in self._engine.case_sensitive
+        return any(self.contains(kw, sensitive) for kw in self._engine.families[family])
+
+    def count(self, family: str) -> int:
+        """族内关键词出现的总次数"""
+        sensitive = family in self._engine.case_sensitive
+        return sum(self.occurrences(kw, sensitive) for kw in self._engine.families[family])
+
+
+class KeywordEngine:
+    """
+    关键词族定义
+    families: {族名: 关键词列表}；同一关键词可属于多个族（查找结果共用）
+    case_sensitive: 需要区分大小写的族名（默认都不区分大小写）
+    """
+
+    def __init__(self, families: Mapping[str, Iterable[str]], case_sensitive: Iterable[str] = ()):
+        self.families: Dict[str, tuple] = {name: tuple(kw for kw in kws if kw) for name, kws in families.items()}
+        self.case_sensitive = frozenset(case_sensitive)
+
+    def scan(self, text: str) -> KeywordHits:
+        """返回文本的关键词查询对象（查找在首次查询时进行）"""
+        return KeywordHits(text or "", self)
+
+
+# ---------------- 需求分析关键词族 ----------------
+
+REQUIREMENT_KEYWORD_FAMILIES: Dict[str, List[str]] = {
+    # AITestCaseGenerator._calculate_complexity（业务规则短语数仍用正则 规则|条件|如果|当.*时 计数）
+    "complexity.entities": ["用户", "订单", "商品", "账户", "数据"],
+    "complexity.integrations": ["接口", "API", "第三方", "集成"],
+    "complexity.states": ["状态", "阶段", "步骤"],
+    # AITestCaseGenerator._identify_risk_areas
+    "risk.身份认证安全": ["登录", "密码", "认证", "权限"],
+    "risk.支付安全": ["支付", "金额", "交易"],
+    "risk.文件上传安全": ["上传", "文件", "附件"],
+    "risk.高并发性能": ["大量", "批量", "并发", "高频"],
+    "risk.查询性能": ["查询", "搜索", "检索"],
+    "risk.数据一致性": ["数据库", "存储", "备份"],
+    "risk.数据同步": ["同步", "异步", "队列"],
+    # AITestCaseGenerator._extract_critical_paths
+    "path.用户注册登录路径": ["注册", "登录"],
+    "path.订单支付路径": ["下单", "支付", "购买"],
+    "path.审批流转路径": ["审核", "审批", "流转"],
+    # AITestCaseGenerator._analyze_data_patterns
+    "data.input": ["email", "phone", "id_card", "password"],
+    "data.numeric": ["数字", "金额", "价格", "数量"],
+    "data.datetime": ["日期", "时间"],
+    # AITestCaseGenerator._identify_integration_points（区分大小写）
+    "integration": ["API", "接口", "第三方", "外部系统", "微服务", "数据库", "缓存", "消息队列", "文件系统"],
+    # AITestCaseGenerator._identify_performance_concerns
+    "performance.响应时间性能": ["响应时间", "延迟", "速度"],
+    "performance.并发处理性能": ["并发", "同时", "批量"],
+    "performance.大数据处理性能": ["大数据", "海量", "TB", "GB"],
+    "performance.资源使用性能": ["内存", "CPU", "磁盘"],
+    # AITestCaseGenerator._identify_security_risks（区分大小写）
+    "security.注入攻击": ["输入", "查询", "SQL"],
+    "security.跨站脚本": ["输出", "显示", "HTML"],
+    "security.权限控制": ["权限", "角色", "访问"],
+    "security.数据泄露": ["敏感", "隐私", "加密"],
+    "security.会话安全": ["登录", "会话", "token"],
+    # AITestCaseGenerator._identify_usability_factors
+    "usability.界面友好性": ["界面", "UI", "用户体验"],
+    "usability.操作引导": ["提示", "帮助", "引导"],
+    "usability.错误处理": ["错误", "异常", "失败"],
+    "usability.移动端适配": ["移动", "手机", "响应式"],
+    # TestCaseGenerator.analyze_requirements（区分大小写）
+    "basic.risk": ["安全", "权限", "支付", "金额", "密码", "security", "payment"],
+    "basic.integration": ["接口", "集成", "第三方", "API", "integration"],
+    "basic.business": ["规则", "条件", "如果", "当", "rule", "condition"],
+    # StrictAITestGenerator：需求规模与功能点复杂度
+    "scale.actions": ["查看", "显示", "切换", "创建", "添加", "删除", "修改",
+                      "检测", "弹", "恢复", "支持", "加载", "刷新", "保存",
+                      "选择", "输入", "配置", "计算", "验证", "匹配", "比较",
+                      "排序", "筛选", "搜索", "提交", "发送", "接收", "进入"],
+}
+
+# 功能点描述（短文本）用的关键词族；单字连接词在长文档中极为常见，不放进文档引擎
+FUNCTION_POINT_KEYWORD_FAMILIES: Dict[str, List[str]] = {
+    "fp.complex": ["选择", "输入", "配置", "计算", "验证", "匹配", "比较", "排序", "筛选", "搜索"],
+    "fp.medium": ["显示", "查看", "切换", "加载", "保存", "删除", "修改"],
+    "fp.simple": ["打开", "关闭", "跳转", "返回", "刷新"],
+    "fp.conditions": ["且", "或", "同时", "并且", "以及", "和"],
+}
+
+# 原实现用 `in` 或不带 IGNORECASE 的正则判断（区分大小写）的族
+CASE_SENSITIVE_FAMILIES = (
+    "complexity.entities", "complexity.integrations", "complexity.states",
+    "integration", "security.注入攻击", "security.跨站脚本", "security.权限控制",
+    "security.数据泄露", "security.会话安全",
+    "basic.risk", "basic.integration", "basic.business",
+    "scale.actions", "fp.complex", "fp.medium", "fp.simple", "fp.conditions",
+)
+
+requirement_keywords = KeywordEngine(REQUIREMENT_KEYWORD_FAMILIES, CASE_SENSITIVE_FAMILIES)
+function_point_keywords = KeywordEngine(FUNCTION_POINT_KEYWORD_FAMILIES, CASE_SENSITIVE_FAMILIES)
+
+
+@lru_cache(maxsize=8)
+def scan_requirement(text: str) -> KeywordHits:
+    """需求关键词族的查询对象（同一文本重复调用返回同一对象，已查过的关键词不再查找）"""
+    return requirement_keywords.scan(text)
+
+
+def family_names(prefix: str) -> List[str]:
+    """以 prefix 开头的族名（按定义顺序），如 family_names("risk.")"""
+    return [name for name in REQUIREMENT_KEYWORD_FAMILIES if name.startswith(prefix)]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 输出 JSON 的单遍修复器
+一次线性扫描完成：跳过前导说明/代码围栏、转义字符串内的非法双引号与控制字符、
+修正非法转义、单引号字符串转双引号、删除尾随逗号、配平/补全括号、闭合被截断的字符串。
+不做任何文件 I/O，供生成热路径使用。
+"""
+
+import json
+from typing import List
+
+_VALID_ESCAPES = frozenset('"\\/bfnrtu')
+_INVISIBLE = frozenset("​‌‍﻿�")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSER = {"[": "]", "{": "}"}
+
+
+def _comma_followed_by_json_field_separator(s: str, comma_idx: int) -> bool:
+    """
+    判断逗号是否为 JSON 对象里「字段之间」的分隔（后是 \"key\":）。
+    用于区分英文标点，例如 Upon clicking \"PLAY\", the game 里的逗号不是 JSON 分隔符。
+    """
+    j = comma_idx + 1
+    n = len(s)
+    while j < n and s[j].isspace():
+        j += 1
+    if j >= n:
+        return True
+    if s[j] in "{[,":
+        # 数组元素之间的分隔（}, {）或多余的连续逗号
+        return True
+    if s[j] not in "\"'":
+        return False
+    quote = s[j]
+    j += 1
+    escape_next = False
+    while j < n:
+        c = s[j]
+        if escape_next:
+            escape_next = False
+        elif c == "\\":
+            escape_next = True
+        elif c == quote:
+            j += 1
+            break
+        elif c == "\n":
+            # 键名不会跨行；遇到换行说明这不是键
+            return False
+        j += 1
+    else:
+        return False
+    while j < n and s[j].isspace():
+        j += 1
+    return j < n and s[j] in ":,]}"
+
+
+def _is_json_string_closer(s: str, close_idx: int) -> bool:
+    """若 s[close_idx] 为引号，判断其是否为当前 JSON 字符串 token 的结束（键名或值的结束引号）。"""
+    j = close_idx + 1
+    n = len(s)
+    while j < n and s[j] in " \t\r\n":
+        j += 1
+    if j >= n:
+        return True
+    ch = s[j]
+    if ch in ":}]":
+        return True
+    if ch == ",":
+        return _comma_followed_by_json_field_separator(s, j)
+    return False
+
+
+def repair_json_text(text: str, drop_incomplete_tail: bool = False) -> str:
+    """
+    单遍修复 LLM 返回的 JSON 文本，返回尽量可被 json.loads 解析的字符串。
+
+    Args:
+        text: 原始响应（可含 markdown 围栏、前后说明文字）
+        drop_incomplete_tail: 响应被截断时，丢弃根容器中最后一个不完整的元素
+            （否则闭合截断的字符串与括号，保留残缺元素）
+
+    Returns:
+        修复后的 JSON 文本；找不到 [ 或 { 时返回空字符串
+    """
+    n = len(text)
+    i = 0
+    while i < n and text[i] not in "[{":
+        i += 1
+    if i >= n:
+        return ""
+
+    out: List[str] = []
+    stack: List[str] = []
+    # 根容器中最后一个完整元素结束时的输出长度（用于截断回退）
+    last_root_element_end = -1
+    in_string = False
+    quote = '"'
+    finished = False
+
+    while i < n:
+        c = text[i]
+
+        if in_string:
+            if c == "\\":
+                nxt = text[i + 1] if i + 1 < n else ""
+                if nxt in _VALID_ESCAPES and nxt:
+                    if nxt == "u" and not _is_hex4(text, i + 2):
+                        out.append("\\\\")
+                        i += 1
+                        continue
+                    out.append(c)
+                    out.append(nxt)
+                    i += 2
+                    continue
+                if nxt == "'":
+                    out.append("'")
+                    i += 2
+                    continue
+                # 非法转义：保留字面反斜杠
+                out.append("\\\\")
+                i += 1
+                continue
+            if c == quote:
+                if _is_json_string_closer(text, i):
+                    out.append('"')
+                    in_string = False
+                else:
+                    out.append('\\"')
+                i += 1
+                continue
+            if c == '"':  # 单引号字符串中的双引号
+                out.append('\\"')
+                i += 1
+                continue
+            if c in _INVISIBLE:
+                i += 1
+                continue
+            if c < " " or c == "\x7f":
+                esc = _CONTROL_ESCAPES.get(c)
+                if esc:
+                    out.append(esc)
+                i += 1
+                continue
+            out.append(c)
+            i += 1
+            continue
+
+        # ---- 字符串之外 ----
+        if c == '"' or c == "'":
+            in_string = True
+            quote = c
+            out.append('"')
+            i += 1
+            continue
+        if c in "[{":
+            stack.append(_CLOSER[c])
+            out.append(c)
+            i += 1
+            continue
+        if c in "]}":
+            if c not in stack:
+                i += 1  # 多余的右括号
+                continue
+            while stack:
+                _strip_trailing_comma(out)
+                expected = stack.pop()
+                out.append(expected)
+                if expected == c:
+                    break
+            if len(stack) == 1:
+                last_root_element_end = len(out)
+            elif not stack:
+                finished = True
+                break
+            i += 1
+            continue
+        if c == ",":
+            _strip_trailing_comma(out)  # 连续逗号
+            if out and out[-1] in "[{":
+                i += 1
+                continue
+            out.append(c)
+            i += 1
+            continue
+        if c.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < n and text[k] in " \t":
+                k += 1
+            if stack[-1] == "}" and k < n and text[k] == ":":
+                out.append(f'"{word}"')  # 未加引号的键名
+            else:
+                out.append(_PY_LITERALS.get(word, word))
+                if len(stack) == 1:
+                    last_root_element_end = len(out)
+            i = j
+            continue
+        if c in _INVISIBLE or (c < " " and c not in "\n\t\r") or c == "\x7f":
+            i += 1
+            continue
+        out.append(c)
+        if len(stack) == 1 and c.isdigit():
+            last_root_element_end = len(out)
+        i += 1
+
+    if finished:
+        return "".join(out)
+
+    # ---- 被截断：补全 ----
+    if drop_incomplete_tail and last_root_element_end >= 0:
+        del out[last_root_element_end:]
+        _strip_trailing_comma(out)
+        out.append(stack[0])
+        return "".join(out)
+
+    if in_string:
+        out.append('"')
+    _strip_trailing_whitespace(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    elif out and out[-1] == '"' and stack and stack[-1] == "}" and _dangling_key(out):
+        out.append(":null")
+    while stack:
+        _strip_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def _is_hex4(text: str, start: int) -> bool:
+    chunk = text[start:start + 4]
+    return len(chunk) == 4 and all(ch in "0123456789abcdefABCDEF" for ch in chunk)
+
+
+def _strip_trailing_whitespace(out: List[str]):
+    while out and out[-1] in (" ", "\n", "\t", "\r"):
+        out.pop()
+
+
+def _strip_trailing_comma(out: List[str]):
+    _strip_trailing_whitespace(out)
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _dangling_key(out: List[str]) -> bool:
+    """
+    输出末尾的字符串是否为对象中缺少值的键（如 {"a": 1, "b"}）。
+    向前找到该字符串的起始引号，看其前一个有效字符是否为 { 或 ,
+    """
+    k = len(out) - 2
+    while k >= 0:
+        tok = out[k]
+        if tok == '"':
+            break
+        k -= 1
+    k -= 1
+    while k >= 0 and out[k] in (" ", "\n", "\t", "\r"):
+        k -= 1
+    return k >= 0 and out[k] in ("{", ",")
+
+
+def try_parse_repaired(text: str):
+    """修复后解析；先保留截断元素，失败再丢弃最后一个不完整元素。均失败返回 None"""
+    for drop in (False, True):
+        fixed = repair_json_text(text, drop_incomplete_tail=drop)
+        if not fixed:
+            return None
+        try:
+            return json.loads(fixed)
+        except ValueError:
+            continue
+    return None
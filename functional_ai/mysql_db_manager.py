@@ -5,8 +5,10 @@ MySQL数据库管理器
 将AI配置、智能模板、测试用例历史迁移到MySQL数据库
 """
 
+import copy
 import os
 import threading
+import time
 import pymysql
 import json
 import hashlib
@@ -15,6 +17,8 @@ from datetime import datetime
 from typing import Optional, Dict, Any, List
 from contextlib import contextmanager
 
+from .mysql_pool import MySQLConnectionPool
+
 
 def _mysql_env(name: str, default: str = "") -> str:
     v = os.environ.get(name)
@@ -29,6 +33,15 @@ def _mysql_env(name: str, default: str = "") -> str:
     return v if v != "" else default
 
 
+# ai_configs 中后加的连接池 / 流式输出列：(列名, ADD COLUMN 定义)
+AI_CONFIG_CONNECTION_COLUMNS = (
+    ("pool_connections", "pool_connections INT NULL COMMENT '每个主机的 keep-alive 连接数'"),
+    ("pool_maxsize", "pool_maxsize INT NULL COMMENT '每个主机的最大并发连接数'"),
+    ("pool_idle_timeout", "pool_idle_timeout INT NULL COMMENT '连接池空闲回收秒数'"),
+    ("stream", "stream TINYINT(1) NULL COMMENT '是否流式输出'"),
+)
+
+
 class MySQLDBManager:
     """MySQL数据库管理器（连接信息来自环境变量 MYSQL_*）"""
 
@@ -48,8 +61,21 @@ class MySQLDBManager:
 
         self._init_lock = threading.Lock()
         self._initialized = False
+        # 连接池（不会在此处连网，首次 get_connection 时才建立连接）
+        self._pool = MySQLConnectionPool(
+            self._connect,
+            pool_size=int(_mysql_env("MYSQL_POOL_SIZE", "5")),
+            max_overflow=int(_mysql_env("MYSQL_POOL_MAX_OVERFLOW", "10")),
+            timeout=float(_mysql_env("MYSQL_POOL_TIMEOUT", "30")),
+            max_lifetime=float(_mysql_env("MYSQL_POOL_RECYCLE", "3600")),
+        )
         # 初始化失败后缓存异常，避免每次请求都重试连接并刷屏日志
         self._init_error: Optional[Exception] = None
+        # 首页统计缓存：(写入时间, 结果)
+        self._stats_lock = threading.Lock()
+        self._stats_cache = None
+        self.stats_cache_ttl = float(_mysql_env("MYSQL_STATS_CACHE_TTL", "30"))
+        self.stats_use_rollup = _mysql_env("MYSQL_STATS_ROLLUP", "0") in ("1", "true", "yes")
 
     def _ensure_initialized(self) -> None:
         """首次访问数据库时再建库建表，避免导入模块时就连网（本机无法解析集群 DNS 时也能先启动 Web）。"""
@@ -96,11 +122,8 @@ class MySQLDBManager:
                     )
                 raise
 
-    @contextmanager
-    def get_connection(self):
-        """获取数据库连接（上下文管理器）"""
-        self._ensure_initialized()
-        conn = pymysql.connect(
+    def _connect(self):
+        return pymysql.connect(
             host=self.host,
             port=self.port,
             user=self.user,
@@ -109,14 +132,30 @@ class MySQLDBManager:
             charset='utf8mb4',
             cursorclass=pymysql.cursors.DictCursor
         )
+
+    @contextmanager
+    def get_connection(self):
+        """获取数据库连接（上下文管理器，连接取自连接池，退出时提交/回滚并归还）"""
+        self._ensure_initialized()
+        conn = self._pool.acquire()
+        broken = False
         try:
             yield conn
             conn.commit()
         except Exception as e:
-            conn.rollback()
+            # 连接级错误（断线等）后连接不可复用，直接丢弃
+            broken = isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
             raise e
         finally:
-            conn.close()
+            self._pool.release(conn, discard=broken)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """连接池指标"""
+        return self._pool.stats()
     
     def _init_database(self):
         """初始化数据库和表结构"""
@@ -159,6 +198,10 @@ class MySQLDBManager:
                             max_tokens INT DEFAULT 4000 COMMENT '最大令牌数',
                             temperature DECIMAL(3,2) DEFAULT 0.70 COMMENT '温度参数',
                             timeout INT DEFAULT 30 COMMENT '超时时间（秒）',
+                            pool_connections INT NULL COMMENT '每个主机的 keep-alive 连接数',
+                            pool_maxsize INT NULL COMMENT '每个主机的最大并发连接数',
+                            pool_idle_timeout INT NULL COMMENT '连接池空闲回收秒数',
+                            stream TINYINT(1) NULL COMMENT '是否流式输出',
                             is_active TINYINT(1) DEFAULT 1 COMMENT '是否激活',
                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
                             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -167,6 +210,20 @@ class MySQLDBManager:
                         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='AI配置表'
                     ''')
                     
+                    # 升级前创建的 ai_configs 补充连接池 / 流式输出列（NULL 表示使用默认值）
+                    cursor.execute('''
+                        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'ai_configs'
+                    ''', (self.database,))
+                    existing_columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+                    for column, ddl in AI_CONFIG_CONNECTION_COLUMNS:
+                        if column not in existing_columns:
+                            try:
+                                cursor.execute(f"ALTER TABLE ai_configs ADD COLUMN {ddl}")
+                            except pymysql.err.OperationalError as e:
+                                if e.args[0] != 1060:  # 其他进程已添加（Duplicate column name）
+                                    raise
+                    
                     # 2. AI配置操作历史表
                     cursor.execute('''
                         CREATE TABLE IF NOT EXISTS ai_config_history (
@@ -249,6 +306,34 @@ class MySQLDBManager:
                             INDEX idx_config_type (config_type)
                         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='系统配置表'
                     ''')
+
+                    # 7. 每日生成统计汇总表（随 save_test_case_session 增量维护，统计查询不再扫描会话表）
+                    cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS test_case_daily_stats (
+                            stat_date DATE PRIMARY KEY COMMENT '统计日期',
+                            session_count INT NOT NULL DEFAULT 0 COMMENT '会话数',
+                            case_count BIGINT NOT NULL DEFAULT 0 COMMENT '用例数'
+                        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='每日生成统计汇总表'
+                    ''')
+                    # 汇总表为空而会话表已有数据时（升级前的历史），一次性回填。
+                    # Web 进程与各 worker 进程启动时都会执行到这里：用命名锁串行化「检查-回填」，
+                    # INSERT IGNORE 兜底（拿不到锁时说明其他进程正在回填，直接跳过）
+                    backfill_lock = f"{self.database}.daily_stats_backfill"[-64:]  # 命名锁为服务器级，按库区分
+                    cursor.execute("SELECT GET_LOCK(%s, 30)", (backfill_lock,))
+                    if cursor.fetchone()[0] == 1:
+                        try:
+                            conn_tables.commit()  # 在锁内重新开始一致性读，看到其他进程已提交的回填
+                            cursor.execute('SELECT 1 FROM test_case_daily_stats LIMIT 1')
+                            if cursor.fetchone() is None:
+                                cursor.execute('''
+                                    INSERT IGNORE INTO test_case_daily_stats (stat_date, session_count, case_count)
+                                    SELECT DATE(generation_time), COUNT(*), COALESCE(SUM(total_cases), 0)
+                                    FROM test_case_sessions
+                                    GROUP BY DATE(generation_time)
+                                ''')
+                            conn_tables.commit()
+                        finally:
+                            cursor.execute("SELECT RELEASE_LOCK(%s)", (backfill_lock,))
                 conn_tables.commit()
             finally:
                 conn_tables.close()
@@ -275,8 +360,10 @@ class MySQLDBManager:
     
     def save_ai_config(self, provider: str, api_key: str, base_url: str = None, 
                        model: str = None, max_tokens: int = 4000, 
-                       temperature: float = 0.7, timeout: int = 30) -> bool:
-        """保存AI配置"""
+                       temperature: float = 0.7, timeout: int = 30,
+                       pool_connections: int = None, pool_maxsize: int = None,
+                       pool_idle_timeout: int = None, stream: bool = None) -> bool:
+        """保存AI配置（连接池 / 流式输出为 None 时加载方使用默认值）"""
         if self._init_error is not None:
             return False
         try:
@@ -292,10 +379,13 @@ class MySQLDBManager:
                     cursor.execute('''
                         INSERT INTO ai_configs 
                         (provider, api_key_hash, api_key_encrypted, base_url, model, 
-                         max_tokens, temperature, timeout, is_active)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1)
+                         max_tokens, temperature, timeout,
+                         pool_connections, pool_maxsize, pool_idle_timeout, stream, is_active)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
                     ''', (provider, api_key_hash, api_key_encrypted, base_url, model, 
-                          max_tokens, temperature, timeout))
+                          max_tokens, temperature, timeout,
+                          pool_connections, pool_maxsize, pool_idle_timeout,
+                          None if stream is None else int(bool(stream))))
                     
                     config_id = cursor.lastrowid
                     
@@ -322,7 +412,8 @@ class MySQLDBManager:
                 with conn.cursor() as cursor:
                     cursor.execute('''
                         SELECT provider, api_key_encrypted, base_url, model, 
-                               max_tokens, temperature, timeout
+                               max_tokens, temperature, timeout,
+                               pool_connections, pool_maxsize, pool_idle_timeout, stream
                         FROM ai_configs 
                         WHERE is_active = 1 
                         ORDER BY updated_at DESC 
@@ -340,7 +431,11 @@ class MySQLDBManager:
                         'model': row['model'],
                         'max_tokens': row['max_tokens'],
                         'temperature': float(row['temperature']),
-                        'timeout': row['timeout']
+                        'timeout': row['timeout'],
+                        'pool_connections': row['pool_connections'],
+                        'pool_maxsize': row['pool_maxsize'],
+                        'pool_idle_timeout': row['pool_idle_timeout'],
+                        'stream': None if row['stream'] is None else bool(row['stream']),
                     }
                     
         except pymysql.Error as e:
@@ -348,6 +443,23 @@ class MySQLDBManager:
                 print(f"❌ 从MySQL加载AI配置失败: {e}")
             return None
     
+    def get_ai_config_version(self) -> Optional[int]:
+        """
+        AI配置版本号：ai_configs 的最大 id（保存/删除配置都会插入新行）。
+        只走主键索引，供各进程低成本判断缓存的配置是否过期；MySQL 不可用时返回 None
+        """
+        if self._init_error is not None:
+            return None
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT COALESCE(MAX(id), 0) AS version FROM ai_configs')
+                    return int(cursor.fetchone()['version'])
+        except pymysql.Error as e:
+            if e is not self._init_error:
+                print(f"❌ 获取AI配置版本失败: {e}")
+            return None
+    
     # ==================== 智能模板管理 ====================
     
     def save_smart_template(self, template_key: str, title: str, content: str, 
@@ -446,6 +558,17 @@ class MySQLDBManager:
                                 VALUES (%s, %s, %s, %s)
                             ''', (session_id, file_type, f'outputs/{file_name}', file_name))
                     
+                    # 同一事务内更新每日汇总（与回填一样按会话的 generation_time 取日期）
+                    cursor.execute('''
+                        INSERT INTO test_case_daily_stats (stat_date, session_count, case_count)
+                        SELECT DATE(generation_time), 1, COALESCE(total_cases, 0)
+                        FROM test_case_sessions WHERE session_id = %s
+                        ON DUPLICATE KEY UPDATE
+                            session_count = session_count + 1,
+                            case_count = case_count + VALUES(case_count)
+                    ''', (session_id,))
+                    
+            self.invalidate_statistics_cache()
             print(f"✅ 测试用例会话 '{session_id}' 保存成功")
             return True
             
@@ -519,53 +642,66 @@ class MySQLDBManager:
             print(f"❌ 更新会话标题失败: {e}")
             return False
     
+    def invalidate_statistics_cache(self) -> None:
+        with self._stats_lock:
+            self._stats_cache = None
+
     def get_session_statistics(self) -> Dict[str, Any]:
-        """获取会话统计数据"""
+        """
+        获取会话统计数据
+        结果在进程内缓存 MYSQL_STATS_CACHE_TTL 秒（保存会话时失效）；
+        MYSQL_STATS_ROLLUP=1 时从每日汇总表读取，开销与历史会话数量无关
+        """
+        with self._stats_lock:
+            cached = self._stats_cache
+        if cached is not None and time.monotonic() - cached[0] < self.stats_cache_ttl:
+            return copy.deepcopy(cached[1])
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 总用例数和会话数
-                    cursor.execute('''
-                        SELECT 
-                            COUNT(*) as total_sessions,
-                            COALESCE(SUM(total_cases), 0) as total_generated
-                        FROM test_case_sessions
-                    ''')
-                    totals = cursor.fetchone()
-                    
-                    # 今天的统计
-                    cursor.execute('''
-                        SELECT COALESCE(SUM(total_cases), 0) as today_count
-                        FROM test_case_sessions
-                        WHERE DATE(generation_time) = CURDATE()
-                    ''')
-                    today = cursor.fetchone()
-                    
-                    # 本周的统计
-                    cursor.execute('''
-                        SELECT COALESCE(SUM(total_cases), 0) as week_count
-                        FROM test_case_sessions
-                        WHERE generation_time >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                    ''')
-                    week = cursor.fetchone()
-                    
-                    # 本月的统计
-                    cursor.execute('''
-                        SELECT COALESCE(SUM(total_cases), 0) as month_count
-                        FROM test_case_sessions
-                        WHERE generation_time >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-                    ''')
-                    month = cursor.fetchone()
-                    
-                    return {
-                        'total_generated': int(totals['total_generated']),
-                        'total_sessions': int(totals['total_sessions']),
-                        'statistics': {
-                            'today': int(today['today_count']),
-                            'this_week': int(week['week_count']),
-                            'this_month': int(month['month_count'])
-                        }
-                    }
+                    if self.stats_use_rollup:
+                        cursor.execute('''
+                            SELECT
+                                COALESCE(SUM(session_count), 0) AS total_sessions,
+                                COALESCE(SUM(case_count), 0) AS total_generated,
+                                COALESCE(SUM(CASE WHEN stat_date >= CURDATE() THEN case_count END), 0) AS today_count,
+                                COALESCE(SUM(CASE WHEN stat_date >= CURDATE() - INTERVAL 7 DAY THEN case_count END), 0) AS week_count,
+                                COALESCE(SUM(CASE WHEN stat_date >= CURDATE() - INTERVAL 30 DAY THEN case_count END), 0) AS month_count
+                            FROM test_case_daily_stats
+                        ''')
+                    else:
+                        # 一次往返：总量一次聚合；近 30 天的条件聚合用 generation_time 范围条件，可走 idx_generation_time
+                        cursor.execute('''
+                            SELECT
+                                t.total_sessions, t.total_generated,
+                                r.today_count, r.week_count, r.month_count
+                            FROM (
+                                SELECT COUNT(*) AS total_sessions, COALESCE(SUM(total_cases), 0) AS total_generated
+                                FROM test_case_sessions
+                            ) t
+                            CROSS JOIN (
+                                SELECT
+                                    COALESCE(SUM(CASE WHEN generation_time >= CURDATE() THEN total_cases END), 0) AS today_count,
+                                    COALESCE(SUM(CASE WHEN generation_time >= CURDATE() - INTERVAL 7 DAY THEN total_cases END), 0) AS week_count,
+                                    COALESCE(SUM(total_cases), 0) AS month_count
+                                FROM test_case_sessions
+                                WHERE generation_time >= CURDATE() - INTERVAL 30 DAY
+                            ) r
+                        ''')
+                    row = cursor.fetchone()
+
+            stats = {
+                'total_generated': int(row['total_generated']),
+                'total_sessions': int(row['total_sessions']),
+                'statistics': {
+                    'today': int(row['today_count']),
+                    'this_week': int(row['week_count']),
+                    'this_month': int(row['month_count'])
+                }
+            }
+            with self._stats_lock:
+                self._stats_cache = (time.monotonic(), stats)
+            return copy.deepcopy(stats)
                     
         except pymysql.Error as e:
             print(f"❌ 获取统计数据失败: {e}")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL 连接池
+- 有界：常驻 pool_size 个连接，峰值时最多再临时创建 max_overflow 个，超出则等待 timeout 秒
+- 健康检查：取出连接时 ping，失败则丢弃重建；超过 max_lifetime 的连接回收重建（避开 wait_timeout）
+- 指标：创建/关闭/取出/等待/超时/ping 失败次数与当前占用情况
+由 MySQLDBManager.get_connection 使用，对调用方透明。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+import pymysql
+
+
+class PoolTimeoutError(pymysql.err.OperationalError):
+    """等待空闲连接超时（继承 pymysql.Error，调用方现有的异常处理依然适用）"""
+
+
+class MySQLConnectionPool:
+    """线程安全的有界 pymysql 连接池"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        timeout: float = 30.0,
+        max_lifetime: float = 3600.0,
+        pre_ping: bool = True,
+    ):
+        self._connect = connect
+        self.pool_size = max(int(pool_size), 1)
+        self.max_overflow = max(int(max_overflow), 0)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pre_ping = pre_ping
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()  # (conn, created_at)，后进先出
+        self._created_at: Dict[int, float] = {}  # id(conn) -> 创建时间（占用中的连接）
+        self._total = 0
+        self._pid = os.getpid()
+        self.metrics = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "recycled": 0,
+        }
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        """fork 出的子进程不能复用父进程的套接字：直接丢弃继承来的连接（不关闭，避免影响父进程）"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._created_at.clear()
+            self._total = 0
+
+    def _discard_locked(self, conn):
+        self._created_at.pop(id(conn), None)
+        self._total -= 1
+        self.metrics["closed"] += 1
+        self._cond.notify()
+
+    def acquire(self):
+        """取出一个健康的连接；池满时等待，超时抛出 PoolTimeoutError"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._check_fork()
+            while True:
+                if self._idle:
+                    conn, created = self._idle.pop()
+                    self._created_at[id(conn)] = created
+                    break
+                if self._total < self.pool_size + self.max_overflow:
+                    self._total += 1
+                    conn, created = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics["timeouts"] += 1
+                    raise PoolTimeoutError(2013, f"等待 MySQL 连接超时（{self.timeout} 秒，池上限 "
+                                                 f"{self.pool_size}+{self.max_overflow}）")
+                self.metrics["waits"] += 1
+                self._cond.wait(remaining)
+            self.metrics["checkouts"] += 1
+
+        if conn is not None:
+            conn = self._validate(conn, created)
+        if conn is None:
+            try:
+                conn = self._connect()
+            except BaseException:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created_at[id(conn)] = time.monotonic()
+                self.metrics["created"] += 1
+        return conn
+
+    def _validate(self, conn, created: float):
+        """检查空闲连接：超龄或 ping 失败则关闭并返回 None（由调用方新建，占用名额不变）"""
+        reason = None
+        if self.max_lifetime and time.monotonic() - created > self.max_lifetime:
+            reason = "recycled"
+        elif self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                reason = "ping_failures"
+        if reason is None:
+            return conn
+        self._close(conn)
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self.metrics[reason] += 1
+            self.metrics["closed"] += 1
+        return None
+
+    def release(self, conn, discard: bool = False):
+        """归还连接；discard=True（连接已损坏）或超出常驻数量时直接关闭"""
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            created = self._created_at.get(id(conn))
+            if created is None:
+                # 不是本池取出的连接（或已被回收）
+                self._close(conn)
+                return
+            if discard or getattr(conn, "open", True) is False or len(self._idle) >= self.pool_size:
+                self._discard_locked(conn)
+                close = True
+            else:
+                self._created_at.pop(id(conn), None)
+                self._idle.append((conn, created))
+                self._cond.notify()
+                close = False
+        if close:
+            self._close(conn)
+
+    def close_all(self):
+        """关闭全部空闲连接（占用中的连接归还时再关闭）"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self.metrics["closed"] += len(idle)
+            self._cond.notify_all()
+        for conn, _created in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return dict(
+                self.metrics,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                total=self._total,
+                idle=idle,
+                in_use=self._total - idle,
+                overflow=max(self._total - self.pool_size, 0),
+            )
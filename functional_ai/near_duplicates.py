@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复用例检测（MinHash + LSH 分段）
+功能点相互重叠时，AI 会在不同功能点下写出措辞不同、内容相同的用例，精确去重无法识别。
+- 文本：标题 + 测试步骤 + 预期结果；去掉步骤编号后切词（中文按字、英文按单词、数字整体），取相邻 2 词为 shingle
+- 每条用例计算 NUM_PERM 个 MinHash，按 LSH_BANDS 段分桶，只在同桶用例之间用签名估计 Jaccard 相似度，
+  整体近似线性（numpy 向量化，1 万条用例亚秒级）
+- 数字不同的用例（边界值、等价类取值）不视为重复；只比较字面相似度，「用户名为空」与「密码为空」这类
+  对调字段的用例也可能被认为相似，建议先用 report 模式人工确认
+- 相似用例用并查集合并为簇：report 模式在备注中标出「疑似与 X 重复」，merge 模式每簇只保留优先级最高的一条
+"""
+
+import os
+import re
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .test_case_generator import TestCase
+
+NEAR_DUP_MODES = ("off", "report", "merge")
+DEFAULT_NEAR_DUP_THRESHOLD = 0.7
+NUM_PERM = 64
+LSH_BANDS = 16  # 16 段 × 4 行：签名相似度约 0.5 以上即有较大概率成为候选
+SHINGLE_SIZE = 2
+_FULL_COMPARE_BUCKET = 32  # 桶内用例不超过该数时两两比较，否则只与桶内首条比较
+
+_STEP_NUMBER = re.compile(r'(?m)^\s*\d+\s*[\.、．)）]\s*')
+_TOKEN = re.compile(r'\d+(?:\.\d+)?|[a-z]+|[\u3400-\u9fff]')
+
+
+def near_duplicate_settings() -> Tuple[str, float]:
+    """(模式, 相似度阈值)，由 AI_NEAR_DUP_MODE / AI_NEAR_DUP_THRESHOLD 配置"""
+    mode = os.environ.get("AI_NEAR_DUP_MODE", "off").strip().lower() or "off"
+    if mode not in NEAR_DUP_MODES:
+        print(f"⚠️ AI_NEAR_DUP_MODE 配置无效（{mode}），不做近似重复检测")
+        mode = "off"
+    try:
+        threshold = float(os.environ.get("AI_NEAR_DUP_THRESHOLD", DEFAULT_NEAR_DUP_THRESHOLD))
+    except (TypeError, ValueError):
+        threshold = DEFAULT_NEAR_DUP_THRESHOLD
+    return mode, min(max(threshold, 0.3), 1.0)
+
+
+def case_tokens(tc: TestCase) -> List[str]:
+    """用于比较的词序列（标题 + 步骤 + 预期）"""
+    text = "\n".join((tc.title or "", _STEP_NUMBER.sub("", tc.test_steps or ""), tc.expected or ""))
+    return _TOKEN.findall(text.lower())
+
+
+def _permutations(seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)  # 奇数乘子
+    b = rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations()
+
+
+def minhash_signatures(token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+    """每条用例的 MinHash 签名，形状 (用例数, NUM_PERM)；空文本的签名为全 0xFFFFFFFF"""
+    n = len(token_lists)
+    signatures = np.full((n, NUM_PERM), 0xFFFFFFFF, dtype=np.uint32)
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n)
+    has_text = lengths > 0
+    if not has_text.any():
+        return signatures
+
+    # 词编号（从 1 开始，0 用作用例之间的填充）；map 走 C 层，避免逐词的 Python 循环
+    flat_tokens = list(chain.from_iterable(token_lists))
+    index = {t: i for i, t in enumerate(dict.fromkeys(flat_tokens), 1)}
+    ids = np.fromiter(map(index.__getitem__, flat_tokens), dtype=np.uint64, count=len(flat_tokens))
+    # 每条用例后补 SHINGLE_SIZE - 1 个 0：shingle 不跨用例，短于 SHINGLE_SIZE 的用例也有一个 shingle
+    pad = SHINGLE_SIZE - 1
+    ends = np.cumsum(lengths)
+    ids = np.insert(ids, np.repeat(ends, pad), 0)
+    offsets = (ends - lengths + np.arange(n) * pad)[has_text]
+    counts = np.maximum(lengths - pad, 1)[has_text]
+    seg_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    starts = np.repeat(offsets - seg_starts, counts) + np.arange(counts.sum(), dtype=np.int64)
+
+    mul = np.uint64(0x9E3779B97F4A7C15)
+    shingles = ids[starts]
+    for k in range(1, SHINGLE_SIZE):
+        shingles = shingles * mul + ids[starts + k]
+    shingles ^= shingles >> np.uint64(31)
+
+    # 乘法-移位哈希取高 32 位作为排列值；右移单调，先按用例取最小值再移位。每次处理 8 个排列控制内存
+    shift = np.uint64(32)
+    rows = np.flatnonzero(has_text)
+    values = np.empty((8, len(shingles)), dtype=np.uint64)
+    for p in range(0, NUM_PERM, 8):
+        np.multiply(shingles[None, :], _PERM_A[p:p + 8, None], out=values)
+        values += _PERM_B[p:p + 8, None]
+        signatures[rows, p:p + 8] = (np.minimum.reduceat(values, seg_starts, axis=1) >> shift).T
+    return signatures
+
+
+def _number_key(tokens: Sequence[str]) -> Tuple[str, ...]:
+    return tuple(sorted(t for t in tokens if t[0].isdigit()))
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def find_near_duplicates(test_cases: Sequence[TestCase],
+                         threshold: float = DEFAULT_NEAR_DUP_THRESHOLD) -> List[List[int]]:
+    """
+    查找近似重复用例
+
+    Returns:
+        List[List[int]]: 近似重复簇（用例下标，升序）；只返回两条及以上的簇，按首条下标排序
+    """
+    if len(test_cases) < 2:
+        return []
+    token_lists = [case_tokens(tc) for tc in test_cases]
+    signatures = minhash_signatures(token_lists)
+    number_keys: Dict[int, Tuple[str, ...]] = {}  # 只为候选对计算
+    empty = [not tokens for tokens in token_lists]
+    min_equal = threshold * NUM_PERM
+
+    uf = _UnionFind(len(test_cases))
+    checked: Set[Tuple[int, int]] = set()
+
+    def similar(i: int, j: int) -> bool:
+        if (i, j) in checked:
+            return False
+        checked.add((i, j))
+        for k in (i, j):
+            if k not in number_keys:
+                number_keys[k] = _number_key(token_lists[k])
+        if number_keys[i] != number_keys[j]:
+            return False
+        return np.count_nonzero(signatures[i] == signatures[j]) >= min_equal
+
+    rows = NUM_PERM // LSH_BANDS
+    for band in range(LSH_BANDS):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(np.dtype((np.void, 4 * rows)))
+        _, inverse, bucket_sizes = np.unique(keys.ravel(), return_inverse=True, return_counts=True)
+        if bucket_sizes.max() < 2:
+            continue
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(bucket_sizes)))
+        for bucket in np.flatnonzero(bucket_sizes > 1):
+            members = [int(m) for m in order[bounds[bucket]:bounds[bucket + 1]] if not empty[m]]
+            if len(members) < 2:
+                continue
+            if len(members) <= _FULL_COMPARE_BUCKET:
+                pairs = ((members[x], members[y]) for x in range(len(members)) for y in range(x + 1, len(members)))
+            else:
+                pairs = ((members[0], m) for m in members[1:])
+            for i, j in pairs:
+                if uf.find(i) != uf.find(j) and similar(i, j):
+                    uf.union(i, j)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(test_cases)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    return sorted((c for c in clusters.values() if len(c) > 1), key=lambda c: c[0])
+
+
+def _keeper(test_cases: Sequence[TestCase], cluster: Sequence[int]) -> int:
+    """簇内保留的用例：优先级最高，同级取最先出现的"""
+    return min(cluster, key=lambda i: (test_cases[i].priority.value, i))
+
+
+def mark_near_duplicates(test_cases: Sequence[TestCase], clusters: Sequence[Sequence[int]],
+                         language: str = "zh") -> int:
+    """在簇内其余用例的备注中标出保留的用例编号，返回被标记的条数"""
+    marked = 0
+    for cluster in clusters:
+        keep = _keeper(test_cases, cluster)
+        keep_id = test_cases[keep].case_id
+        note = f"Possible duplicate of {keep_id}" if language == "en" else f"疑似与 {keep_id} 重复"
+        for i in cluster:
+            if i == keep:
+                continue
+            tc = test_cases[i]
+            tc.remark = f"{tc.remark}{'; ' if language == 'en' else '；'}{note}" if tc.remark else note
+            marked += 1
+    return marked
+
+
+def merge_near_duplicates(test_cases: Sequence[TestCase], clusters: Sequence[Sequence[int]]) -> List[TestCase]:
+    """每簇只保留一条（并入其余用例用到的测试方法），其余用例顺序不变"""
+    dropped: Set[int] = set()
+    for cluster in clusters:
+        keep = _keeper(test_cases, cluster)
+        kept = test_cases[keep]
+        methods = list(kept.methods_used)
+        for i in cluster:
+            if i != keep:
+                dropped.add(i)
+                methods.extend(m for m in test_cases[i].methods_used if m not in methods)
+        kept.methods_used = methods
+    return [tc for i, tc in enumerate(test_cases) if i not in dropped]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成进度发布/订阅总线
+- update_generation_progress 写入进度后 publish，SSE 订阅方在条件变量上等待，只在进度变化时推送
+- 每条进度带单调递增的 seq（随进度快照落盘），作为 SSE 的事件 ID，支持 Last-Event-ID 断线续传
+- 任务在独立工作进程中执行时，进度只会写入磁盘：由一个共享的监视线程检查有订阅者的任务的进度文件，
+  有变化时重新加载并发布（每个任务一次 stat，而不是每个页面各自轮询、序列化）
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Channel:
+    """单个生成任务的订阅通道"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.seq = -1
+        self.data: Optional[Dict[str, Any]] = None
+        self.subscribers = 0
+
+
+class ProgressBus:
+    """进程内进度总线（线程安全）"""
+
+    def __init__(self, watch_interval: float = 1.0):
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+        self.watch_interval = watch_interval
+        self._watcher: Optional[threading.Thread] = None
+        self._refresher: Optional[Callable[[str], Any]] = None
+
+    def publish(self, generation_id: str, snapshot: Dict[str, Any]):
+        """发布新进度；没有订阅者时为空操作"""
+        with self._lock:
+            channel = self._channels.get(generation_id)
+        if channel is None:
+            return
+        seq = int(snapshot.get("seq", 0) or 0)
+        with channel.cond:
+            if seq == channel.seq:
+                return
+            channel.seq = seq
+            channel.data = snapshot
+            channel.cond.notify_all()
+
+    @contextmanager
+    def subscribe(self, generation_id: str):
+        """订阅某任务的进度，退出 with 块时自动取消"""
+        with self._lock:
+            channel = self._channels.get(generation_id)
+            if channel is None:
+                channel = self._channels[generation_id] = _Channel()
+            channel.subscribers += 1
+        try:
+            yield channel
+        finally:
+            with self._lock:
+                channel.subscribers -= 1
+                if channel.subscribers <= 0 and self._channels.get(generation_id) is channel:
+                    del self._channels[generation_id]
+
+    @staticmethod
+    def wait(channel: _Channel, last_seq: int, timeout: float) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """等待 seq 不同于 last_seq 的进度；超时返回 None（调用方发送心跳）"""
+        with channel.cond:
+            if channel.cond.wait_for(lambda: channel.data is not None and channel.seq != last_seq, timeout):
+                return channel.seq, channel.data
+        return None
+
+    def subscribed_ids(self):
+        with self._lock:
+            return list(self._channels)
+
+    def start_watcher(self, refresher: Callable[[str], Any]):
+        """
+        启动（仅一次）跨进程进度监视线程；refresher(generation_id) 负责在进度文件变化时
+        重新加载并调用 publish
+        """
+        with self._lock:
+            self._refresher = refresher
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_loop, name="progress-bus-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.watch_interval)
+            refresher = self._refresher
+            for generation_id in self.subscribed_ids():
+                try:
+                    refresher(generation_id)
+                except Exception as e:
+                    print(f"⚠️ 刷新生成进度失败: {e}")
+
+
+# 全局进度总线
+progress_bus = ProgressBus()
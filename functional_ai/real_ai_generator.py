@@ -9,11 +9,16 @@ import os
 import json
 import requests
 import time
-from typing import Dict, List, Optional, Any
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 import openai
 from .ai_test_generator import AITestCaseGenerator, AIAnalysisResult, TestCase, Priority, TestMethod
+from .ai_client_pool import ai_client_registry
+from .ai_response_cache import ai_response_cache
+from .ai_rate_limiter import AIRateLimitError, estimate_tokens, rate_limiter_registry, throttle_retry_after
 
 class AIProvider(Enum):
     """AI服务提供商"""
@@ -40,6 +45,84 @@ class AIConfig:
     max_tokens: int = 4000
     temperature: float = 0.7
     timeout: int = 30
+    # 连接池：每个 host 的 keep-alive 连接数 / 最大并发连接数 / 空闲回收秒数
+    pool_connections: int = 10
+    pool_maxsize: int = 20
+    pool_idle_timeout: int = 300
+    # 流式输出（OpenAI 兼容接口与 Anthropic 支持；其他提供商自动退化为整段返回）
+    stream: bool = True
+
+class ErnieTokenCache:
+    """
+    百度 OAuth access_token 缓存
+    按 (client_id, secret) 缓存，遵循 expires_in 并提前刷新；
+    同一凭据的刷新是 single-flight 的，并发功能点调用不会同时请求 OAuth 接口。
+    """
+
+    TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
+    # 提前刷新：取 expires_in 的 10%，最少 60 秒、最多 1 小时
+    MIN_REFRESH_MARGIN = 60
+    MAX_REFRESH_MARGIN = 3600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, tuple] = {}  # key -> (access_token, refresh_at)
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _make_key(client_id: str, secret: str) -> str:
+        return hashlib.sha256(f"{client_id}\0{secret}".encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._tokens.get(key)
+        if item and time.time() < item[1]:
+            return item[0]
+        return None
+
+    def get_token(self, client_id: str, secret: str, post: Callable[..., requests.Response],
+                  timeout: float = 30) -> str:
+        key = self._make_key(client_id, secret)
+        token = self._cached(key)
+        if token:
+            return token
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # 等锁期间其他线程可能已刷新完成
+            token = self._cached(key)
+            if token:
+                return token
+            response = post(
+                self.TOKEN_URL,
+                params={
+                    "grant_type": "client_credentials",
+                    "client_id": client_id,
+                    "client_secret": secret,
+                },
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            token = data.get("access_token")
+            if not token:
+                raise Exception(f"获取文心一言access_token失败: {data.get('error_description') or data.get('error') or data}")
+            expires_in = float(data.get("expires_in") or 0)
+            margin = min(max(expires_in * 0.1, self.MIN_REFRESH_MARGIN), self.MAX_REFRESH_MARGIN)
+            refresh_at = time.time() + max(expires_in - margin, 0)
+            with self._lock:
+                self._tokens[key] = (token, refresh_at)
+            print(f"🔑 已刷新文心一言access_token（{int(expires_in)}秒后过期）")
+            return token
+
+    def invalidate(self, client_id: str, secret: str):
+        """令牌被服务端拒绝时清除缓存，下次调用重新获取"""
+        with self._lock:
+            self._tokens.pop(self._make_key(client_id, secret), None)
+
+
+# 全局 ERNIE 令牌缓存（跨生成器实例、跨线程共享）
+ernie_token_cache = ErnieTokenCache()
 
 class RealAITestCaseGenerator(AITestCaseGenerator):
     """真正的AI增强测试用例生成器"""
@@ -47,6 +130,10 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
     def __init__(self, ai_config: AIConfig, custom_headers: Optional[Dict[str, str]] = None):
         super().__init__(custom_headers)
         self.ai_config = ai_config
+        # 是否对 call_ai_api 启用响应缓存（按请求开启，如重新生成同一需求时）
+        self.use_response_cache = False
+        # 失败时抛出异常而非返回降级文本（由提供商链做故障转移时开启）
+        self.raise_on_failure = False
         self.setup_ai_client()
         
     def setup_ai_client(self):
@@ -73,24 +160,118 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             # 其他AI服务使用HTTP请求
             self.model = self.ai_config.model or "default"
     
-    def call_ai_api(self, prompt: str, system_prompt: str = None) -> str:
-        """调用AI API"""
+    def _pool_kwargs(self) -> Dict[str, Any]:
+        return {
+            "pool_connections": self.ai_config.pool_connections,
+            "pool_maxsize": self.ai_config.pool_maxsize,
+            "idle_timeout": self.ai_config.pool_idle_timeout,
+        }
+
+    def _http_post(self, url: str, **kwargs) -> requests.Response:
+        """通过共享连接池发送 POST（复用 TCP+TLS 连接）"""
+        session = ai_client_registry.get_session(
+            self.ai_config.provider.value,
+            self.ai_config.base_url,
+            self.ai_config.api_key,
+            **self._pool_kwargs(),
+        )
+        return session.post(url, **kwargs)
+
+    def _dispatch_ai_api(self, prompt: str, system_prompt: str = None) -> str:
+        """按提供商分发到具体的 API 调用"""
+        if self.ai_config.provider in [AIProvider.OPENAI, AIProvider.AZURE_OPENAI, AIProvider.DEEPSEEK, AIProvider.MOONSHOT]:
+            return self._call_openai_api(prompt, system_prompt)
+        elif self.ai_config.provider == AIProvider.ANTHROPIC:
+            return self._call_anthropic_api(prompt, system_prompt)
+        elif self.ai_config.provider == AIProvider.GOOGLE_GEMINI:
+            return self._call_gemini_api(prompt, system_prompt)
+        elif self.ai_config.provider in [AIProvider.BAIDU_ERNIE, AIProvider.ERNIE]:
+            return self._call_ernie_api(prompt, system_prompt)
+        elif self.ai_config.provider in [AIProvider.ALIBABA_QWEN, AIProvider.QWEN]:
+            return self._call_qwen_api(prompt, system_prompt)
+        elif self.ai_config.provider in [AIProvider.ZHIPU_GLM, AIProvider.CHATGLM]:
+            return self._call_glm_api(prompt, system_prompt)
+        else:
+            raise ValueError(f"不支持的AI提供商: {self.ai_config.provider}")
+    
+    _STREAMING_PROVIDERS = (
+        AIProvider.OPENAI, AIProvider.AZURE_OPENAI, AIProvider.DEEPSEEK, AIProvider.MOONSHOT,
+        AIProvider.ANTHROPIC,
+    )
+
+    def supports_streaming(self) -> bool:
+        """当前提供商与配置是否启用流式输出"""
+        return bool(self.ai_config.stream) and self.ai_config.provider in self._STREAMING_PROVIDERS
+
+    def _dispatch_stream_api(self, prompt: str, system_prompt: str, on_text: Callable[[str], None]) -> str:
+        """流式分发：逐块回调 on_text，返回完整文本"""
+        if self.ai_config.provider == AIProvider.ANTHROPIC:
+            return self._stream_anthropic_api(prompt, system_prompt, on_text)
+        return self._stream_openai_api(prompt, system_prompt, on_text)
+
+    # 429 限流时在本层按 Retry-After 等待重试的次数（等待期间同 provider/model 的其他调用一并暂停）
+    MAX_THROTTLE_RETRIES = 4
+
+    def _call_with_rate_limit(self, prompt: str, system_prompt: Optional[str],
+                              on_text: Optional[Callable[[str], None]]) -> str:
+        """经 provider/model 共享的令牌桶与 AIMD 并发控制后调用；429 时遵循 Retry-After 重试"""
+        limiter = rate_limiter_registry.get(self.ai_config.provider.value, self.model)
+        estimated = estimate_tokens(system_prompt, prompt) + min(self.ai_config.max_tokens, 4000)
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+            try:
+                with limiter.slot(estimated):
+                    if on_text and self.supports_streaming():
+                        result = self._dispatch_stream_api(prompt, system_prompt, on_text)
+                    else:
+                        result = self._dispatch_ai_api(prompt, system_prompt)
+                        if on_text and result:
+                            on_text(result)
+                limiter.record_usage(estimated, estimate_tokens(system_prompt, prompt, result))
+                return result
+            except Exception as e:
+                retry_after = throttle_retry_after(e)
+                if retry_after is None:
+                    raise
+                limiter.on_throttle(retry_after)
+                if attempt >= self.MAX_THROTTLE_RETRIES:
+                    raise AIRateLimitError(f"重试 {attempt} 次后仍被限流", retry_after) from e
+                print(f"⏳ 提供商限流 (429)，{retry_after or 2:.0f}秒后重试 "
+                      f"({attempt + 1}/{self.MAX_THROTTLE_RETRIES}，并发上限 {limiter.concurrency.snapshot()['limit']})")
+        raise AIRateLimitError("提供商持续限流")
+
+    def call_ai_api(self, prompt: str, system_prompt: str = None, use_cache: Optional[bool] = None,
+                    on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        调用AI API
+        Args:
+            use_cache: 是否使用响应缓存；None 时取 self.use_response_cache（默认关闭，保持实时采样）
+            on_text: 流式回调，收到增量文本即调用；不支持流式的提供商在完成后整段回调一次
+        """
+        if use_cache is None:
+            use_cache = self.use_response_cache
+        cache_key = None
+        if use_cache:
+            cache_key = ai_response_cache.make_key(
+                self.ai_config.provider.value,
+                getattr(self, "model", None) or self.ai_config.model,
+                self.ai_config.temperature,
+                system_prompt,
+                prompt,
+            )
+            cached = ai_response_cache.get(cache_key)
+            if cached is not None:
+                print("💾 命中AI响应缓存，跳过API调用")
+                if on_text:
+                    on_text(cached)
+                return cached
         try:
-            if self.ai_config.provider in [AIProvider.OPENAI, AIProvider.AZURE_OPENAI, AIProvider.DEEPSEEK, AIProvider.MOONSHOT]:
-                return self._call_openai_api(prompt, system_prompt)
-            elif self.ai_config.provider == AIProvider.ANTHROPIC:
-                return self._call_anthropic_api(prompt, system_prompt)
-            elif self.ai_config.provider == AIProvider.GOOGLE_GEMINI:
-                return self._call_gemini_api(prompt, system_prompt)
-            elif self.ai_config.provider in [AIProvider.BAIDU_ERNIE, AIProvider.ERNIE]:
-                return self._call_ernie_api(prompt, system_prompt)
-            elif self.ai_config.provider in [AIProvider.ALIBABA_QWEN, AIProvider.QWEN]:
-                return self._call_qwen_api(prompt, system_prompt)
-            elif self.ai_config.provider in [AIProvider.ZHIPU_GLM, AIProvider.CHATGLM]:
-                return self._call_glm_api(prompt, system_prompt)
-            else:
-                raise ValueError(f"不支持的AI提供商: {self.ai_config.provider}")
-                
+            result = self._call_with_rate_limit(prompt, system_prompt, on_text)
+            if cache_key and result:
+                ai_response_cache.put(cache_key, result)
+            return result
+        except AIRateLimitError as e:
+            print(f"❌ AI API请求过于频繁 (429): {e}")
+            raise
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
                 error_msg = f"AI API认证失败 (401): API密钥无效或已过期"
@@ -119,6 +300,8 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
         except Exception as e:
             error_msg = f"AI API调用失败: {str(e)}"
             print(f"❌ {error_msg}")
+            if self.raise_on_failure:
+                raise
             # 降级到模拟AI分析
             return self._fallback_analysis(prompt)
     
@@ -130,9 +313,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
         messages.append({"role": "user", "content": prompt})
 
         try:
-            # 尝试使用新版本OpenAI API (>=1.0.0)
-            from openai import OpenAI
-            
+            # 尝试使用新版本OpenAI API (>=1.0.0)，客户端按 provider/base_url/key 复用
             # 设置base_url，DeepSeek需要指定
             base_url = self.ai_config.base_url
             if self.ai_config.provider == AIProvider.DEEPSEEK and not base_url:
@@ -140,9 +321,11 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             if self.ai_config.provider == AIProvider.MOONSHOT and not base_url:
                 base_url = "https://api.moonshot.cn/v1"
 
-            client = OpenAI(
-                api_key=self.ai_config.api_key,
-                base_url=base_url
+            client = ai_client_registry.get_openai_client(
+                self.ai_config.provider.value,
+                base_url,
+                self.ai_config.api_key,
+                **self._pool_kwargs(),
             )
             
             print(f"🔗 调用API: base_url={base_url}, model={self.model}")
@@ -153,7 +336,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
                 # 批量测试用例 JSON 很长，勿用 2000 硬上限截断（会导致未闭合字符串与解析失败）
                 max_tokens=min(self.ai_config.max_tokens, 16384),
                 temperature=self.ai_config.temperature,
-                timeout=120,
+                timeout=self.ai_config.timeout,
             )
             
             print(f"✅ API响应成功")
@@ -173,6 +356,99 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             print(f"❌ OpenAI API调用失败: {e}")
             raise
     
+    def _stream_openai_api(self, prompt: str, system_prompt: str, on_text: Callable[[str], None]) -> str:
+        """流式调用 OpenAI 兼容接口（stream=True，按 delta 回调）"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        base_url = self.ai_config.base_url
+        if self.ai_config.provider == AIProvider.DEEPSEEK and not base_url:
+            base_url = "https://api.deepseek.com/v1"
+        if self.ai_config.provider == AIProvider.MOONSHOT and not base_url:
+            base_url = "https://api.moonshot.cn/v1"
+
+        try:
+            client = ai_client_registry.get_openai_client(
+                self.ai_config.provider.value,
+                base_url,
+                self.ai_config.api_key,
+                **self._pool_kwargs(),
+            )
+        except ImportError:
+            # 旧版 SDK 不支持统一的流式接口，退化为整段返回
+            text = self._call_openai_api(prompt, system_prompt)
+            if text:
+                on_text(text)
+            return text
+
+        print(f"🔗 流式调用API: base_url={base_url}, model={self.model}")
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=min(self.ai_config.max_tokens, 16384),
+            temperature=self.ai_config.temperature,
+            timeout=self.ai_config.timeout,
+            stream=True,
+        )
+        parts: List[str] = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = getattr(chunk.choices[0].delta, "content", None)
+            if delta:
+                parts.append(delta)
+                on_text(delta)
+        print(f"✅ 流式响应完成（{sum(len(p) for p in parts)} 字符）")
+        return "".join(parts)
+
+    def _stream_anthropic_api(self, prompt: str, system_prompt: str, on_text: Callable[[str], None]) -> str:
+        """流式调用 Anthropic Messages API（SSE，解析 content_block_delta 事件）"""
+        headers = {
+            "Content-Type": "application/json",
+            "x-api-key": self.ai_config.api_key,
+            "anthropic-version": "2023-06-01"
+        }
+        
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        
+        data = {
+            "model": self.model or "claude-3-sonnet-20240229",
+            "max_tokens": self.ai_config.max_tokens,
+            "temperature": self.ai_config.temperature,
+            "messages": [{"role": "user", "content": full_prompt}],
+            "stream": True,
+        }
+        
+        response = self._http_post(
+            "https://api.anthropic.com/v1/messages",
+            headers=headers,
+            json=data,
+            timeout=self.ai_config.timeout,
+            stream=True,
+        )
+        parts: List[str] = []
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                if event.get("type") == "content_block_delta":
+                    delta = (event.get("delta") or {}).get("text")
+                    if delta:
+                        parts.append(delta)
+                        on_text(delta)
+                elif event.get("type") == "error":
+                    raise Exception(f"Anthropic流式响应错误: {event.get('error')}")
+        finally:
+            response.close()
+        return "".join(parts)
+
     def _call_anthropic_api(self, prompt: str, system_prompt: str = None) -> str:
         """调用Anthropic Claude API"""
         headers = {
@@ -190,7 +466,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             "messages": [{"role": "user", "content": full_prompt}]
         }
         
-        response = requests.post(
+        response = self._http_post(
             "https://api.anthropic.com/v1/messages",
             headers=headers,
             json=data,
@@ -219,7 +495,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             }
         }
         
-        response = requests.post(
+        response = self._http_post(
             f"{url}?key={self.ai_config.api_key}",
             headers=headers,
             json=data,
@@ -230,16 +506,12 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
     
     def _call_ernie_api(self, prompt: str, system_prompt: str = None) -> str:
         """调用百度文心一言API"""
-        # 首先获取access_token
-        token_url = "https://aip.baidubce.com/oauth/2.0/token"
-        token_params = {
-            "grant_type": "client_credentials",
-            "client_id": self.ai_config.api_key,
-            "client_secret": self.ai_config.base_url  # 这里用base_url存储secret
-        }
-        
-        token_response = requests.post(token_url, params=token_params)
-        access_token = token_response.json()["access_token"]
+        # 首先获取access_token（缓存至过期前，这里用base_url存储secret）
+        client_id = self.ai_config.api_key
+        client_secret = self.ai_config.base_url
+        access_token = ernie_token_cache.get_token(
+            client_id, client_secret, self._http_post, timeout=self.ai_config.timeout
+        )
         
         # 调用ERNIE API
         url = f"https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/{self.model or 'completions_pro'}"
@@ -258,14 +530,19 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             "max_output_tokens": self.ai_config.max_tokens
         }
         
-        response = requests.post(
+        response = self._http_post(
             f"{url}?access_token={access_token}",
             headers=headers,
             json=data,
             timeout=self.ai_config.timeout
         )
         response.raise_for_status()
-        return response.json()["result"]
+        result = response.json()
+        # 110/111: access_token 无效或已过期，清缓存后下次重新获取
+        if result.get("error_code") in (110, 111):
+            ernie_token_cache.invalidate(client_id, client_secret)
+            raise Exception(f"文心一言access_token失效: {result.get('error_msg')}")
+        return result["result"]
     
     def _call_qwen_api(self, prompt: str, system_prompt: str = None) -> str:
         """调用阿里云通义千问API"""
@@ -286,7 +563,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             "max_tokens": self.ai_config.max_tokens
         }
         
-        response = requests.post(
+        response = self._http_post(
             self.ai_config.base_url or "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
             headers=headers,
             json=data,
@@ -314,7 +591,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             "max_tokens": self.ai_config.max_tokens
         }
         
-        response = requests.post(
+        response = self._http_post(
             self.ai_config.base_url or "https://open.bigmodel.cn/api/paas/v4/chat/completions",
             headers=headers,
             json=data,
@@ -342,7 +619,7 @@ class RealAITestCaseGenerator(AITestCaseGenerator):
             "max_tokens": self.ai_config.max_tokens
         }
         
-        response = requests.post(
+        response = self._http_post(
             self.ai_config.base_url or "https://api.moonshot.cn/v1/chat/completions",
             headers=headers,
             json=data,
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长需求文档切分
+按标题（Markdown #、「第X章」、「一、」、「1.2」等编号标题）划分章节，再把相邻章节打包为不超过
+max_chars 的分块；单个章节过长时按段落、按行、最后按字符切开。相邻分块之间保留 overlap 字符的重叠
+（从上一块末尾按行截取），避免跨块的规则被截断。每个分块记录所在章节的标题路径，供提示词定位上下文。
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+DEFAULT_CHUNK_CHARS = 12000
+DEFAULT_CHUNK_OVERLAP = 800
+
+_MD_HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*$')
+_CN_CHAPTER = re.compile(r'^第[一二三四五六七八九十百零\d]+[章节部分篇]')
+_CN_ORDINAL = re.compile(r'^[一二三四五六七八九十]+[、.．]')
+_NUMBERED = re.compile(r'^(\d+(?:\.\d+)*)[\.、．\s]\s*\S')
+# 编号标题应当简短且不以句子标点结尾；否则视为编号列表项
+_SENTENCE_PUNCT = re.compile(r'[。；;，,：:！!？?]$|[。；;]')
+
+
+@dataclass
+class RequirementChunk:
+    """需求分块"""
+    index: int  # 从 1 开始
+    text: str  # 含与上一块的重叠部分
+    heading: str = ""  # 分块起始处的章节标题路径（如「2 订单 > 2.3 退款」）
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def chunk_settings() -> Tuple[int, int]:
+    """(分块大小, 重叠字符数)，由 AI_EXTRACT_CHUNK_CHARS / AI_EXTRACT_CHUNK_OVERLAP 配置"""
+    size = max(_env_int("AI_EXTRACT_CHUNK_CHARS", DEFAULT_CHUNK_CHARS), 1000)
+    overlap = min(max(_env_int("AI_EXTRACT_CHUNK_OVERLAP", DEFAULT_CHUNK_OVERLAP), 0), size // 4)
+    return size, overlap
+
+
+def heading_level(line: str) -> Optional[int]:
+    """识别标题行并返回层级（1 为最高）；不是标题时返回 None"""
+    s = line.strip()
+    if not s or len(s) > 80:
+        return None
+    m = _MD_HEADING.match(s)
+    if m:
+        return len(m.group(1))
+    if _CN_CHAPTER.match(s):
+        return 1
+    if len(s) > 40 or _SENTENCE_PUNCT.search(s):
+        return None
+    if _CN_ORDINAL.match(s):
+        return 1
+    m = _NUMBERED.match(s)
+    if m:
+        return m.group(1).count('.') + 1
+    return None
+
+
+def _split_sections(text: str) -> List[Tuple[str, str]]:
+    """按标题切分为 [(标题路径, 章节文本)]；首个标题之前的内容标题路径为空"""
+    sections: List[Tuple[str, str]] = []
+    stack: List[Tuple[int, str]] = []
+    current: List[str] = []
+    current_path = ""
+    for line in text.splitlines(keepends=True):
+        level = heading_level(line)
+        if level is not None:
+            if current and ''.join(current).strip():
+                sections.append((current_path, ''.join(current)))
+            current = []
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, line.strip().lstrip('#').strip()))
+            current_path = " > ".join(title for _, title in stack)
+        current.append(line)
+    if current and ''.join(current).strip():
+        sections.append((current_path, ''.join(current)))
+    return sections
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """把超长文本依次按空行段落、按行、按字符切成不超过 max_chars 的片段"""
+    if len(text) <= max_chars:
+        return [text]
+    for sep in ("\n\n", "\n"):
+        parts = text.split(sep)
+        if len(parts) > 1:
+            pieces: List[str] = []
+            buf = ""
+            for i, part in enumerate(parts):
+                part = part + sep if i < len(parts) - 1 else part
+                if buf and len(buf) + len(part) > max_chars:
+                    pieces.append(buf)
+                    buf = ""
+                if len(part) > max_chars:
+                    pieces.extend(_split_long(part, max_chars))
+                else:
+                    buf += part
+            if buf:
+                pieces.append(buf)
+            return pieces
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def _tail(text: str, overlap: int) -> str:
+    """取末尾约 overlap 个字符，尽量从行首开始"""
+    if overlap <= 0 or not text:
+        return ""
+    tail = text[-overlap:]
+    nl = tail.find("\n")
+    if 0 <= nl < len(tail) - 1:
+        tail = tail[nl + 1:]
+    return tail
+
+
+def split_requirement(text: str, max_chars: Optional[int] = None,
+                      overlap: Optional[int] = None) -> List[RequirementChunk]:
+    """
+    切分需求文档
+
+    Args:
+        text: 需求全文
+        max_chars: 每块最大字符数（不含重叠），默认取 chunk_settings()
+        overlap: 相邻块重叠字符数
+
+    Returns:
+        List[RequirementChunk]: 文本不超过 max_chars 时只有一块
+    """
+    size, default_overlap = chunk_settings()
+    max_chars = max_chars or size
+    overlap = default_overlap if overlap is None else overlap
+    text = text or ""
+    if len(text) <= max_chars:
+        return [RequirementChunk(index=1, text=text)]
+
+    # 先把章节打包成块
+    packed: List[Tuple[str, str]] = []
+    buf, buf_heading = "", ""
+    for path, body in _split_sections(text):
+        for piece in _split_long(body, max_chars):
+            if buf and len(buf) + len(piece) > max_chars:
+                packed.append((buf_heading, buf))
+                buf = ""
+            if not buf:
+                buf_heading = path
+            buf += piece
+    if buf:
+        packed.append((buf_heading, buf))
+
+    chunks: List[RequirementChunk] = []
+    prev = ""
+    for i, (heading, body) in enumerate(packed, 1):
+        lead = _tail(prev, overlap)
+        chunks.append(RequirementChunk(index=i, text=lead + body, heading=heading))
+        prev = body
+    return chunks
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成结果的 JSON Lines 存储（取代整表 pickle）
+- 暂存用例 {id}.partial_cases.jsonl：只追加。每次回调只写入与上次快照相比新增的用例；
+  并发功能点使较早的位置发生变化时，先写一条截断记录再追加变化后的部分。
+  被截断的记录累计超过有效内容（且不少于 PARTIAL_COMPACT_MIN_CHARS）时整体重写一次，文件大小与写入量保持线性
+- 最终结果 {id}.results.jsonl：首行为头部（总数、统计摘要、分析结果与文件名），其后每行一条用例；
+  结果页只读取头部与第一页，不反序列化整次生成
+每条用例按 CASE_FIELDS 顺序存为 JSON 数组（测试方法存枚举名）。
+"""
+
+import json
+import os
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .test_case_generator import Priority, TestCase, TestMethod
+
+RESULT_FORMAT = "test-cases"
+RESULT_FORMAT_VERSION = 1
+
+PARTIAL_COMPACT_MIN_CHARS = 64 * 1024  # 暂存日志中被截断的记录少于该字符数时不重写
+
+# 用例记录的列顺序
+CASE_FIELDS = (
+    "module", "submodule", "case_id", "title", "precondition",
+    "test_steps", "expected", "priority", "remark", "methods_used",
+)
+
+
+def case_to_record(tc: TestCase) -> list:
+    return [
+        tc.module, tc.submodule, tc.case_id, tc.title, tc.precondition,
+        tc.test_steps, tc.expected, tc.priority.value, tc.remark,
+        [m.name for m in tc.methods_used],
+    ]
+
+
+def record_to_case(record: Sequence) -> TestCase:
+    (module, submodule, case_id, title, precondition,
+     test_steps, expected, priority, remark, methods) = record
+    return TestCase(
+        module=module,
+        submodule=submodule,
+        case_id=case_id,
+        title=title,
+        precondition=precondition,
+        test_steps=test_steps,
+        expected=expected,
+        priority=Priority(priority),
+        remark=remark,
+        methods_used=[TestMethod[m] for m in methods],
+    )
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _header(kind: str, **extra) -> Dict[str, Any]:
+    return dict(format=RESULT_FORMAT, version=RESULT_FORMAT_VERSION, kind=kind, **extra)
+
+
+def _check_header(header: Dict[str, Any], kind: str, path: str):
+    if header.get("format") != RESULT_FORMAT or header.get("kind") != kind:
+        raise ValueError(f"不是有效的{kind}用例文件: {path}")
+    if header.get("version", 0) > RESULT_FORMAT_VERSION:
+        raise ValueError(f"用例文件版本过新（{header.get('version')}）: {path}")
+
+
+# ---------------- 暂存用例（只追加） ----------------
+
+class PartialCaseLog:
+    """
+    暂存用例日志。sync(snapshot) 与上次写入的快照逐个比较（按对象身份），
+    公共前缀保持不动，只追加之后的部分；日志回放即得到最近一次快照。
+    被截断的记录累计超过有效内容时，用当前快照重写整个文件（先写临时文件再替换）。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._written: List[TestCase] = []  # 上次快照（持有引用，避免对象被回收后 id 复用）
+        self._sizes: List[int] = []  # 与 _written 对应的每条用例记录的字符数
+        self._garbage = 0  # 已被截断、仍留在文件中的用例记录字符数
+        self._opened = False
+
+    def sync(self, cases: Sequence[TestCase]) -> int:
+        """写入快照的增量部分，返回本次写入的用例条数"""
+        with self._lock:
+            written = self._written
+            keep = 0
+            limit = min(len(written), len(cases))
+            while keep < limit and written[keep] is cases[keep]:
+                keep += 1
+            if keep == len(written) == len(cases):
+                return 0
+            added = [json.dumps(case_to_record(tc), ensure_ascii=False, separators=(",", ":"))
+                     for tc in cases[keep:]]
+            sizes = self._sizes[:keep] + [len(r) for r in added]
+            garbage = self._garbage + sum(self._sizes[keep:])
+            if self._opened and garbage >= max(sum(sizes), PARTIAL_COMPACT_MIN_CHARS):
+                self._rewrite(cases)
+                self._garbage = 0
+            else:
+                lines = []
+                if not self._opened:
+                    lines.append(_dumps(_header("partial")))
+                elif keep < len(written):
+                    lines.append(_dumps({"op": "truncate", "keep": keep}))
+                if added:
+                    lines.append(_add_line(added))
+                # 首次写入覆盖同名旧文件（例如租约过期后重新执行的同一任务）
+                with open(self.path, "a" if self._opened else "w", encoding="utf-8") as f:
+                    f.writelines(lines)
+                self._opened = True
+                self._garbage = garbage
+            self._written = list(cases)
+            self._sizes = sizes
+            return len(added)
+
+    def _rewrite(self, cases: Sequence[TestCase]) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_dumps(_header("partial")))
+            if cases:
+                f.write(_add_line([json.dumps(case_to_record(tc), ensure_ascii=False, separators=(",", ":"))
+                                   for tc in cases]))
+        os.replace(tmp, self.path)
+
+
+def _add_line(records: List[str]) -> str:
+    """由已序列化的用例记录拼出一条 add 记录"""
+    return '{"op":"add","cases":[' + ",".join(records) + "]}\n"
+
+
+def read_partial_cases(path: str) -> List[TestCase]:
+    """回放暂存日志，得到最近一次快照；末尾写了一半的记录（进程中断）会被忽略"""
+    records: List[list] = []
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+        if not first:
+            return []
+        _check_header(json.loads(first), "partial", path)
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry.get("op") == "truncate":
+                del records[entry["keep"]:]
+            elif entry.get("op") == "add":
+                records.extend(entry["cases"])
+    return [record_to_case(r) for r in records]
+
+
+# ---------------- 最终结果 ----------------
+
+def write_result_file(path: str, cases: Iterable[TestCase], total: int, **meta) -> str:
+    """写入最终结果（先写临时文件再替换，读取方不会看到半个文件）"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(_dumps(_header("result", total=total, meta=meta)))
+        for tc in cases:
+            f.write(_dumps(case_to_record(tc)))
+    os.replace(tmp, path)
+    return path
+
+
+def read_result_header(path: str) -> Dict[str, Any]:
+    """只读取结果头部：{'total': N, 'meta': {...}}"""
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+    _check_header(header, "result", path)
+    return header
+
+
+def iter_result_cases(path: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[TestCase]:
+    """按顺序逐条读取结果中的用例（跳过 offset 条，最多 limit 条）"""
+    with open(path, "r", encoding="utf-8") as f:
+        _check_header(json.loads(f.readline()), "result", path)
+        stop = None if limit is None else offset + limit
+        for line in islice(f, offset, stop):
+            yield record_to_case(json.loads(line))
+
+
+def read_result_page(path: str, offset: int = 0, limit: int = 10) -> Dict[str, Any]:
+    """读取头部与一页用例：{'total', 'meta', 'test_cases'}"""
+    header = read_result_header(path)
+    return {
+        "total": header.get("total", 0),
+        "meta": header.get("meta") or {},
+        "test_cases": list(iter_result_cases(path, offset, limit)),
+    }
@@ -8,10 +8,21 @@
 import json
 import re
 import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from .test_case_generator import TestCase, Priority, TestMethod
 from .real_ai_generator import AIProvider
+from .llm_json_repair import repair_json_text
+from .requirement_chunker import RequirementChunk, split_requirement
+from .generation_checkpoint import CheckpointState, GenerationCheckpoint
+from .keyword_engine import function_point_keywords, scan_requirement
+from .near_duplicates import (
+    NEAR_DUP_MODES, find_near_duplicates, mark_near_duplicates, merge_near_duplicates, near_duplicate_settings,
+)
 
 
 def _extract_balanced_json_container(text: str) -> Optional[str]:
@@ -59,99 +70,6 @@ def _extract_balanced_json_container(text: str) -> Optional[str]:
     return None
 
 
-def _comma_followed_by_json_field_separator(s: str, comma_idx: int) -> bool:
-    """
-    判断逗号是否为 JSON 对象里「字段之间」的分隔（后是 \"key\":）。
-    用于区分英文标点，例如 Upon clicking \"PLAY\", the game 里的逗号不是 JSON 分隔符。
-    """
-    j = comma_idx + 1
-    n = len(s)
-    while j < n and s[j].isspace():
-        j += 1
-    if j >= n:
-        return True
-    if s[j] != '"':
-        return False
-    j += 1
-    escape_next = False
-    while j < n:
-        c = s[j]
-        if escape_next:
-            escape_next = False
-            j += 1
-            continue
-        if c == "\\":
-            escape_next = True
-            j += 1
-            continue
-        if c == '"':
-            j += 1
-            break
-        j += 1
-    else:
-        return False
-    while j < n and s[j].isspace():
-        j += 1
-    return j < n and s[j] == ":"
-
-
-def _is_json_string_value_closer(s: str, close_idx: int) -> bool:
-    """若 s[close_idx] 为双引号，判断其是否为当前 JSON 字符串 token 的结束（键名或值的结束引号）。"""
-    j = close_idx + 1
-    n = len(s)
-    while j < n and s[j].isspace():
-        j += 1
-    if j >= n:
-        return True
-    ch = s[j]
-    if ch in ":}]":
-        return True
-    if ch == ",":
-        return _comma_followed_by_json_field_separator(s, j)
-    return False
-
-
-def _escape_interior_quotes_json(text: str) -> str:
-    """
-    将 LLM 在 JSON 字符串值内错误使用的双引号转义为 \"。
-    典型错误：Click the "BET" button、user"s balance（未写成 \\"）。
-    """
-    out: List[str] = []
-    i, n = 0, len(text)
-    in_string = False
-    escape_next = False
-    while i < n:
-        c = text[i]
-        if not in_string:
-            out.append(c)
-            if c == '"':
-                in_string = True
-            i += 1
-            continue
-        if escape_next:
-            out.append(c)
-            escape_next = False
-            i += 1
-            continue
-        if c == "\\":
-            out.append(c)
-            escape_next = True
-            i += 1
-            continue
-        if c == '"':
-            if _is_json_string_value_closer(text, i):
-                out.append(c)
-                in_string = False
-            else:
-                out.append("\\")
-                out.append('"')
-            i += 1
-            continue
-        out.append(c)
-        i += 1
-    return "".join(out)
-
-
 def _try_llm_json_repair(text: str) -> Optional[str]:
     """使用 json-repair 库修复 LLM 常见 JSON 错误（可选依赖）。"""
     try:
@@ -165,6 +83,88 @@ def _try_llm_json_repair(text: str) -> Optional[str]:
         return None
 
 
+class IncrementalJSONArrayParser:
+    """
+    流式 JSON 数组增量解析器
+    逐块 feed 模型输出，每当数组中的一个对象闭合（遇到其 `}`）即解析并返回，
+    无需等待整段响应结束。忽略数组之前的 markdown 围栏或说明文字；
+    也兼容 {"test_cases": [...]} 这类外层包裹（以首个 `[` 为准）。
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._pos = 0  # 已扫描的全局字符数
+        self._obj_start = -1  # 当前对象在 _buf 拼接串中的起始位置
+        self._array_depth = -1  # 目标数组所在深度；-1 表示尚未遇到 `[`
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._base = 0  # _buf 拼接串首字符对应的全局位置
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """送入新文本，返回本次新闭合的对象列表"""
+        if not chunk:
+            return []
+        self._buf.append(chunk)
+        text = "".join(self._buf)
+        self._buf = [text]
+        out: List[Dict[str, Any]] = []
+        i = self._pos - self._base
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "[{":
+                if c == "[" and self._array_depth == -1:
+                    self._array_depth = self._depth
+                elif c == "{" and self._array_depth >= 0 and self._depth == self._array_depth + 1:
+                    self._obj_start = i
+                self._depth += 1
+            elif c in "]}":
+                self._depth = max(self._depth - 1, 0)
+                if c == "}" and self._obj_start >= 0 and self._depth == self._array_depth + 1:
+                    obj = self._parse_object(text[self._obj_start:i + 1])
+                    if obj is not None:
+                        out.append(obj)
+                        self.emitted += 1
+                    self._obj_start = -1
+                elif c == "]" and self._depth == self._array_depth:
+                    self._array_depth = -2  # 目标数组已结束，后续内容忽略
+            i += 1
+        self._pos = self._base + n
+        # 丢弃已完成对象之前的文本，避免缓冲区随响应长度增长
+        keep_from = self._obj_start if self._obj_start >= 0 else n
+        if keep_from > 0:
+            self._buf = [text[keep_from:]]
+            self._base += keep_from
+            if self._obj_start >= 0:
+                self._obj_start = 0
+        return out
+
+    @staticmethod
+    def _parse_object(raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            repaired = _try_llm_json_repair(raw)
+            if not repaired:
+                return None
+            try:
+                obj = json.loads(repaired)
+            except json.JSONDecodeError:
+                return None
+        return obj if isinstance(obj, dict) else None
+
+
 @dataclass
 class FunctionPoint:
     """功能点"""
@@ -198,15 +198,47 @@ def _split_function_point_line(line: str) -> tuple:
     return "", "", parts[0] if parts else raw
 
 
+def _function_point_key(description: str) -> str:
+    """跨分块去重用的规范化键：忽略大小写、空白与标点"""
+    return re.sub(r'[\s\W_]+', '', (description or '').lower())
+
+
+DEFAULT_FP_CONCURRENCY = 4
+# 流式预览：同一功能点的 case_streamed 事件（会写入进度快照）最多每隔该秒数发出一次，首条用例立即发出
+STREAM_PROGRESS_INTERVAL = 1.0
+# 需求梳理：单次调用的输入/输出上限；更长的文档分块梳理，拼接后的总长度适配思维导图的 12000 字上下文
+REFINE_INPUT_CHARS = 32000
+REFINE_OUTPUT_CHARS = 16000
+REFINED_CHUNKED_TOTAL_CHARS = 12000
+# JSON 解析失败时是否把原始响应写入 debug_*.txt（默认关闭，避免热路径文件 I/O）
+_DEBUG_DUMPS = os.environ.get("AI_JSON_DEBUG_DUMPS", "").strip().lower() in ("1", "true", "yes")
+
+
+def _resolve_fp_concurrency(value: Optional[int]) -> int:
+    """解析功能点并发数：显式参数优先，其次环境变量 AI_FP_CONCURRENCY，非法值回退默认值。"""
+    if value is None:
+        value = os.environ.get("AI_FP_CONCURRENCY", DEFAULT_FP_CONCURRENCY)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_FP_CONCURRENCY
+
+
 class StrictAITestGenerator:
     """严格的AI测试用例生成器"""
     
-    def __init__(self, ai_api_caller=None, language='zh'):
+    def __init__(self, ai_api_caller=None, language='zh', max_workers: Optional[int] = None,
+                 stream_responses: bool = False, fast_prep: Optional[bool] = None,
+                 near_duplicates: Optional[str] = None):
         """
         初始化生成器
         Args:
             ai_api_caller: AI API调用函数，应接受prompt参数并返回字符串响应
             language: 测试用例生成语言 ('zh' 或 'en')
+            max_workers: 功能点并发生成线程数；None 时读取环境变量 AI_FP_CONCURRENCY（默认 4），1 为顺序执行
+            stream_responses: 流式生成；ai_api_caller 须支持 on_text 关键字参数（如 RealAITestCaseGenerator.call_ai_api）
+            fast_prep: 快速准备模式，思维导图不等待需求梳理、直接基于原文生成；None 时读取环境变量 AI_FAST_PREP
+            near_duplicates: 近似重复用例处理 off / report（备注中标出）/ merge（合并）；None 时读取环境变量 AI_NEAR_DUP_MODE
         """
         self.ai_api_caller = ai_api_caller
         self.test_cases: List[TestCase] = []
@@ -217,6 +249,13 @@ class StrictAITestGenerator:
         self._iteration_context: str = ""
         self._code_change_summary: str = ""
         self._test_mindmap_table: str = ""
+        self.max_workers = _resolve_fp_concurrency(max_workers)
+        self.stream_responses = bool(stream_responses and ai_api_caller)
+        if fast_prep is None:
+            fast_prep = os.environ.get("AI_FAST_PREP", "").strip().lower() in ("1", "true", "yes")
+        self.fast_prep = bool(fast_prep)
+        env_mode, self.near_duplicate_threshold = near_duplicate_settings()
+        self.near_duplicates = near_duplicates if near_duplicates in NEAR_DUP_MODES else env_mode
         
         # 如果AI API可用，验证配置
         if ai_api_caller:
@@ -235,24 +274,31 @@ class StrictAITestGenerator:
         historical_defects: Optional[str] = None,
         iteration_context: Optional[str] = None,
         code_change_summary: Optional[str] = None,
+        checkpoint: Optional[GenerationCheckpoint] = None,
     ) -> List[TestCase]:
         """
         严格按照要求生成测试用例
         
         流程：
-        1. 提取功能点
-        2. （可选）AI 梳理需求摘要
-        3. 为每个功能点生成测试用例
-        4. 严格格式验证和修正
+        1. 提取功能点，同时（可选）AI 梳理需求摘要与生成测试点思维导图
+        2. 为每个功能点生成测试用例
+        3. 严格格式验证和修正
         
         Args:
             requirement_text: 需求文档内容
             progress_callback: 可选回调 (event, payload)，event 含
-                after_extract, refine_start, refine_done, function_point_start, function_point_done, validating_start
-            partial_results_callback: 每完成一个功能点后回调当前已累积的 TestCase 列表（用于中断时落盘）
+                after_extract, refine_start, refine_done, mindmap_start, mindmap_done,
+                function_point_start, function_point_done,
+                case_streamed（流式模式下解析出用例时；每个功能点首条立即发出，之后最多每 STREAM_PROGRESS_INTERVAL 秒一次）,
+                validating_start,
+                near_duplicates（启用近似重复检测时：clusters 簇数, cases 涉及用例数, removed 合并掉的条数, mode）；
+                准备阶段的事件可能来自不同线程、交错到达
+            partial_results_callback: 每完成一个功能点后回调当前已完成功能点的 TestCase 列表（按功能点顺序，用于中断时落盘）
             historical_defects: 历史缺陷/故障列表（文本），用于错误推测与负面清单
             iteration_context: 迭代说明、旧版核心功能摘要、变更范围等（可选）
             code_change_summary: 本次代码变更/Git Diff 摘要（可选，便于分支与影响分析）
+            checkpoint: 可选断点；功能点、需求梳理、思维导图与每个功能点的用例完成后即写入，
+                再次执行同一任务时跳过已完成的部分（after_extract 的 payload 中 resumed 为已完成功能点数）
         
         Returns:
             List[TestCase]: 格式正确的测试用例列表
@@ -266,91 +312,337 @@ class StrictAITestGenerator:
         print("🚀 开始严格AI测试用例生成")
         print("=" * 80)
         
-        # 步骤1: 提取功能点
-        self.function_points = self._extract_function_points(requirement_text)
+        resume = checkpoint.load() if checkpoint else CheckpointState()
+        
+        # 步骤1: 准备阶段（提取功能点 / 梳理需求 / 思维导图，按依赖关系并发）
+        self._prepare_generation(requirement_text, resume, checkpoint, progress_callback)
         
         if not self.function_points:
             print("❌ 未能提取到功能点，无法生成测试用例")
             return []
         
-        print(f"\n📋 成功提取 {len(self.function_points)} 个功能点:")
-        for fp in self.function_points:
-            print(f"   {fp.id}. {fp.description}")
+        # 步骤2: 为每个功能点生成测试用例（有界线程池并发，结果按功能点顺序合并）
+        all_test_cases = self._generate_cases_for_all_function_points(
+            requirement_text, progress_callback, partial_results_callback,
+            checkpoint=checkpoint, done_points=resume.points,
+        )
         
+        # 步骤3: 严格格式验证
+        print(f"\n🔧 开始格式验证和修正...")
         if progress_callback:
-            progress_callback("after_extract", {"count": len(self.function_points)})
+            progress_callback("validating_start", {"total_cases": len(all_test_cases)})
+        validated_cases = self._validate_and_fix_all_cases(all_test_cases)
+        if self.near_duplicates != "off":
+            validated_cases = self._handle_near_duplicates(validated_cases, progress_callback)
+        if partial_results_callback and validated_cases:
+            partial_results_callback(list(validated_cases))
         
-        self._refined_requirement_brief = ""
-        if self.ai_api_caller:
-            print("\n📚 正在梳理需求文档（先理顺业务再编写用例）...")
-            if progress_callback:
-                progress_callback("refine_start", {})
-            self._refined_requirement_brief = self._refine_requirement_for_generation(requirement_text)
-            print(f"   ✅ 需求梳理完成（约 {len(self._refined_requirement_brief)} 字）")
+        self.test_cases = validated_cases
+        print(f"\n✅ 最终生成 {len(validated_cases)} 个符合规范的测试用例")
+        print("=" * 80)
+        
+        return validated_cases
+    
+    def _prepare_generation(
+        self,
+        requirement_text: str,
+        resume: CheckpointState,
+        checkpoint: Optional[GenerationCheckpoint] = None,
+        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> None:
+        """
+        准备阶段，按依赖关系调度：
+
+            提取功能点 ───────────────────┐
+            需求梳理 ──→ 思维导图 ────────┴──→ 逐功能点生成
+
+        提取与梳理互不依赖，并发执行；思维导图默认基于梳理摘要，快速准备模式（fast_prep）下
+        直接基于原文，与前两者同时开始。断点中已有的产物直接复用，完成的产物立即写入断点。
+        提取失败或没有功能点时不再等待梳理与思维导图：尚未开始的不再调用 AI，进行中的结果丢弃。
+        """
+        fast_prep = self.fast_prep
+        stop = threading.Event()
+
+        def extract():
+            if resume.function_points:
+                self.function_points = [FunctionPoint(**item) for item in resume.function_points]
+                print(f"\n♻️ 从断点恢复 {len(self.function_points)} 个功能点（已完成 {len(resume.points)} 个）")
+            else:
+                self.function_points = self._extract_function_points(requirement_text)
+                if checkpoint and self.function_points:
+                    checkpoint.save_function_points(self.function_points)
+            if not self.function_points:
+                return
+            print(f"\n📋 成功提取 {len(self.function_points)} 个功能点:")
+            for fp in self.function_points:
+                print(f"   {fp.id}. {fp.description}")
             if progress_callback:
-                progress_callback("refine_done", {"length": len(self._refined_requirement_brief)})
+                progress_callback("after_extract", {"count": len(self.function_points), "resumed": len(resume.points)})
 
-        # 步骤1b: 测试点思维导图（结构化梳理，再展开详细用例）
-        if self.ai_api_caller:
-            print("\n🧠 正在生成测试点思维导图（ISTQB 多维度梳理）...")
+        def refine() -> str:
+            if resume.refined is not None:
+                brief = resume.refined
+            else:
+                if stop.is_set():
+                    return ""
+                print("\n📚 正在梳理需求文档（先理顺业务再编写用例）...")
+                if progress_callback:
+                    progress_callback("refine_start", {})
+                brief = self._refine_requirement_for_generation(requirement_text)
+                if stop.is_set():
+                    return brief
+                if checkpoint:
+                    checkpoint.save_refined(brief)
+                print(f"   ✅ 需求梳理完成（约 {len(brief)} 字）")
+            self._refined_requirement_brief = brief
             if progress_callback:
-                progress_callback("mindmap_start", {})
-            self._test_mindmap_table = self._generate_test_point_mindmap(requirement_text)
+                progress_callback("refine_done", {"length": len(brief)})
+            return brief
+
+        def mindmap(refined_brief: str):
+            if resume.mindmap is not None:
+                table = resume.mindmap
+            else:
+                if stop.is_set():
+                    return
+                print("\n🧠 正在生成测试点思维导图（ISTQB 多维度梳理）...")
+                if progress_callback:
+                    progress_callback("mindmap_start", {})
+                table = self._generate_test_point_mindmap(requirement_text, refined_brief)
+                if stop.is_set():
+                    return
+                if checkpoint:
+                    checkpoint.save_mindmap(table)
+                print(f"   ✅ 思维导图完成（约 {len(table or '')} 字）")
+            self._test_mindmap_table = table
             if progress_callback:
-                progress_callback(
-                    "mindmap_done",
-                    {"length": len(self._test_mindmap_table or "")},
-                )
-            print(f"   ✅ 思维导图完成（约 {len(self._test_mindmap_table or '')} 字）")
+                progress_callback("mindmap_done", {"length": len(table or "")})
+
+        self._refined_requirement_brief = ""
+        if not self.ai_api_caller:
+            extract()
+            return
+
+        if fast_prep:
+            print("\n⚡ 快速准备：功能点提取、需求梳理与思维导图（基于原文）同时进行")
+        pool = ThreadPoolExecutor(max_workers=3 if fast_prep else 2, thread_name_prefix="prep")
+        others = []
+        try:
+            extract_future = pool.submit(extract)
+            if fast_prep:
+                others = [pool.submit(refine), pool.submit(mindmap, "")]
+            else:
+                others = [pool.submit(lambda: mindmap(refine()))]
+            try:
+                extract_future.result()
+            except BaseException:
+                stop.set()
+                raise
+            if not self.function_points:
+                stop.set()
+                return
+            for future in others:
+                future.result()
+        finally:
+            # 提前结束时取消尚未开始的任务，也不等待进行中的梳理/思维导图调用（其结果已被丢弃）
+            # （逐个 cancel 而非 shutdown(cancel_futures=True)：后者需要 Python 3.9+）
+            for future in others:
+                future.cancel()
+            pool.shutdown(wait=not stop.is_set())
+
+    def _generate_cases_for_all_function_points(
+        self,
+        requirement_text: str,
+        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        partial_results_callback: Optional[Callable[[List[TestCase]], None]] = None,
+        checkpoint: Optional[GenerationCheckpoint] = None,
+        done_points: Optional[Dict[int, List[TestCase]]] = None,
+    ) -> List[TestCase]:
+        """
+        并发为全部功能点生成用例
         
-        # 步骤2: 为每个功能点生成测试用例
-        all_test_cases = []
-        n_fp = len(self.function_points)
-        for idx, fp in enumerate(self.function_points, 1):
+        - 线程数由 self.max_workers 控制（1 即退化为原顺序执行）
+        - 每个功能点完成时立即触发 function_point_done 与 partial_results_callback，并写入断点
+        - done_points（{功能点 id: 用例}）中的功能点直接复用断点中的用例，只生成其余功能点
+        - 最终结果按功能点原始顺序拼接，与顺序执行的输出顺序一致
+        """
+        fps = list(self.function_points)
+        n_fp = len(fps)
+        done_points = done_points or {}
+        slots: List[Optional[List[TestCase]]] = [done_points.get(fp.id) for fp in fps]
+        streamed: List[int] = [0] * n_fp  # 流式预览：功能点完成前已解析出的用例数
+        state = {"completed": sum(cases is not None for cases in slots)}
+        state["persisted"] = state["completed"]
+        lock = threading.Lock()
+        persist_lock = threading.Lock()
+
+        def _ordered_so_far() -> List[TestCase]:
+            """已完成功能点的用例（按功能点顺序）；流式预览不落盘，最终以各功能点的返回值为准"""
+            merged: List[TestCase] = []
+            for cases in slots:
+                if cases is not None:
+                    merged.extend(cases)
+            return merged
+
+        def _run(idx: int, fp: FunctionPoint) -> List[TestCase]:
             if progress_callback:
+                with lock:
+                    completed = state["completed"]
                 progress_callback(
                     "function_point_start",
-                    {"index": idx, "total": n_fp, "description": fp.description},
+                    {"index": idx, "total": n_fp, "description": fp.description, "completed": completed},
                 )
             print(f"\n🎯 正在为功能点 [{fp.description}] 生成测试用例...")
-            cases = self._generate_cases_for_function_point(fp, requirement_text)
-            all_test_cases.extend(cases)
-            print(f"   ✅ 生成了 {len(cases)} 个测试用例")
-            if partial_results_callback and all_test_cases:
-                partial_results_callback(list(all_test_cases))
+            last_emit = [0.0]  # 本功能点上次发出 case_streamed 的时间
+
+            def on_stream_case(case: TestCase, pos: int):
+                with lock:
+                    if slots[idx - 1] is not None:
+                        return
+                    streamed[idx - 1] = pos + 1  # 重试时序号从 0 重新开始，预览数随之重置
+                    streamed_count = streamed[idx - 1]
+                    total_cases = sum(len(c) if c is not None else n for c, n in zip(slots, streamed))
+                now = time.monotonic()
+                if not progress_callback or (pos > 0 and now - last_emit[0] < STREAM_PROGRESS_INTERVAL):
+                    return
+                last_emit[0] = now
+                progress_callback(
+                    "case_streamed",
+                    {
+                        "index": idx,
+                        "total": n_fp,
+                        "description": fp.description,
+                        "title": case.title,
+                        "streamed": streamed_count,
+                        "total_cases": total_cases,
+                    },
+                )
+
+            try:
+                cases = self._generate_cases_for_function_point(
+                    fp, requirement_text,
+                    on_stream_case=on_stream_case if self.stream_responses else None,
+                )
+            except Exception as e:
+                print(f"   ❌ 功能点 [{fp.description}] 生成异常: {e}，使用本地生成")
+                cases = self._generate_cases_local(fp)
+            print(f"   ✅ [{fp.description}] 生成了 {len(cases)} 个测试用例")
+            if checkpoint:
+                checkpoint.save_point(fp.id, cases)
+            with lock:
+                slots[idx - 1] = cases
+                state["completed"] += 1
+                completed = state["completed"]
+                snapshot = _ordered_so_far()
+            if partial_results_callback and snapshot:
+                # 落盘不占用 lock（流式回调无需等待磁盘 I/O）；已完成数更大的快照包含更小的，跳过过期快照
+                with persist_lock:
+                    if completed > state["persisted"]:
+                        state["persisted"] = completed
+                        partial_results_callback(snapshot)
             if progress_callback:
                 progress_callback(
                     "function_point_done",
-                    {"index": idx, "total": n_fp, "description": fp.description, "cases": len(cases)},
+                    {
+                        "index": idx,
+                        "total": n_fp,
+                        "description": fp.description,
+                        "cases": len(cases),
+                        "completed": completed,
+                    },
                 )
-        
-        # 步骤3: 严格格式验证
-        print(f"\n🔧 开始格式验证和修正...")
-        if progress_callback:
-            progress_callback("validating_start", {"total_cases": len(all_test_cases)})
-        validated_cases = self._validate_and_fix_all_cases(all_test_cases)
-        if partial_results_callback and validated_cases:
-            partial_results_callback(list(validated_cases))
-        
-        self.test_cases = validated_cases
-        print(f"\n✅ 最终生成 {len(validated_cases)} 个符合规范的测试用例")
-        print("=" * 80)
-        
-        return validated_cases
-    
+            return cases
+
+        pending = [(idx, fp) for idx, fp in enumerate(fps, 1) if slots[idx - 1] is None]
+        if len(pending) < n_fp:
+            print(f"\n♻️ 断点中已有 {n_fp - len(pending)} 个功能点的用例，继续生成剩余 {len(pending)} 个")
+            if partial_results_callback:
+                partial_results_callback(_ordered_so_far())
+        workers = max(1, min(self.max_workers, len(pending))) if self.ai_api_caller else 1
+        if workers > 1:
+            print(f"\n⚡ 并发生成功能点用例（线程数: {workers}）")
+        if workers == 1:
+            for idx, fp in pending:
+                _run(idx, fp)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fp-gen") as pool:
+                futures = [pool.submit(_run, idx, fp) for idx, fp in pending]
+                for future in futures:
+                    future.result()
+
+        return _ordered_so_far()
+
     def _extract_function_points(self, requirement_text: str) -> List[FunctionPoint]:
-        """提取功能点（根据需求规模自适应数量）"""
+        """
+        提取功能点（根据需求规模自适应数量）
+        超过分块大小（AI_EXTRACT_CHUNK_CHARS）的长文档按章节切分、并发逐块提取，再合并去重。
+        """
         if not self.ai_api_caller:
             return self._extract_function_points_local(requirement_text)
         
         # 根据需求长度和复杂度决定提取数量上限
         max_function_points = self._calculate_max_function_points(requirement_text)
         
+        chunks = split_requirement(requirement_text)
+        if len(chunks) == 1:
+            try:
+                unique_fps = self._extract_function_points_from_text(requirement_text)
+            except Exception as e:
+                print(f"⚠️ AI提取失败: {e}，使用本地提取")
+                return self._extract_function_points_local(requirement_text)
+            # 返回所有提取到的功能点，不做数量限制
+            print(f"✅ 成功提取 {len(unique_fps)} 个功能点（无上限限制）")
+            return unique_fps
+        
+        return self._extract_function_points_chunked(chunks)
+    
+    def _extract_function_points_chunked(self, chunks: List[RequirementChunk]) -> List[FunctionPoint]:
+        """map：并发从各分块提取；reduce：按分块顺序合并，跨块（含重叠区）去重后重新编号"""
+        total = len(chunks)
+        workers = max(1, min(self.max_workers, total))
+        print(f"📑 需求较长，切分为 {total} 块并发提取功能点（线程数: {workers}）")
+        
+        def _map(chunk: RequirementChunk) -> List[FunctionPoint]:
+            if self.language == "en":
+                note = f"(part {chunk.index}/{total} of a longer document"
+                note += f"; section: {chunk.heading})" if chunk.heading else ")"
+            else:
+                note = f"（长文档第 {chunk.index}/{total} 部分"
+                note += f"，所在章节：{chunk.heading}）" if chunk.heading else "）"
+            try:
+                fps = self._extract_function_points_from_text(chunk.text, part_note=note)
+            except Exception as e:
+                print(f"⚠️ 第 {chunk.index}/{total} 块AI提取失败: {e}，该块使用本地提取")
+                fps = self._extract_function_points_local(chunk.text)
+            print(f"   ✅ 第 {chunk.index}/{total} 块提取 {len(fps)} 个功能点")
+            return fps
+        
+        if workers == 1:
+            per_chunk = [_map(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fp-extract") as pool:
+                per_chunk = list(pool.map(_map, chunks))
+        
+        merged: List[FunctionPoint] = []
+        seen = set()
+        for fps in per_chunk:
+            for fp in fps:
+                key = _function_point_key(fp.description)
+                if key in seen:
+                    continue
+                seen.add(key)
+                fp.id = len(merged) + 1
+                merged.append(fp)
+        print(f"✅ 分块提取合并后共 {len(merged)} 个功能点（{sum(len(f) for f in per_chunk)} 个去重前）")
+        return merged
+    
+    def _extract_function_points_from_text(self, requirement_text: str, part_note: str = "") -> List[FunctionPoint]:
+        """对一段需求文本调用 AI 提取功能点并解析、去重；AI 调用异常向上抛出"""
         if self.language == "en":
             prompt = f"""
 You are a senior test architect (ISTQB, destructive mindset). Extract **all testable function points** from the requirement.
 
-【Requirement】
+【Requirement】{part_note}
 {requirement_text}
 
 【Rules】
@@ -369,7 +661,7 @@ Lines only, format: Module | Submodule | Function point summary
             prompt = f"""
 你是一名遵循 ISTQB、具备破坏性思维、熟悉业务上下文的资深测试架构师。请从需求中拆解并提取**全部可测试功能点**（先理解全貌再枚举）。
 
-【需求内容】
+【需求内容】{part_note}
 {requirement_text}
 
 【提取规则】
@@ -384,61 +676,53 @@ Lines only, format: Module | Submodule | Function point summary
 仅输出多行文本，每行：模块 | 子模块 | 功能点简述
 """
         
-        try:
-            response = self.ai_api_caller(prompt)
-            lines = response.strip().split('\n')
-            
-            function_points = []
-            for i, line in enumerate(lines, 1):
-                line = line.strip().lstrip('-*•· ').strip()
-                line = re.sub(r'^\d+[\.\)、]\s*', '', line)
-                if not line:
-                    continue
-                mod_guess, sub_guess, desc = _split_function_point_line(line)
-                if not desc or len(desc) < 3:
-                    continue
-                if len(desc) > 220:
-                    desc = desc[:217] + "..."
-                exclude_plain = [
-                    '示例', '说明', '注意', '提取', '需求', '输出格式', '功能点', '以下', '如下', 'figma', 'Figma',
-                ]
-                if '|' not in line and any(kw in line for kw in exclude_plain):
-                    continue
-                low = line.lower()
-                if '|' in line and (
-                    low.startswith('module |')
-                    or low.startswith('module|')
-                    or ('submodule' in low[:50] and 'summary' in low)
-                    or ('子模块' in line[:40] and ('简述' in line or '功能点' in line[:20]))
-                ):
-                    continue
-                if mod_guess and sub_guess:
-                    module, submodule = mod_guess[:80], sub_guess[:80]
-                else:
-                    module, submodule = self._guess_module_from_text(desc, requirement_text)
-                fp = FunctionPoint(
-                    id=i,
-                    description=desc,
-                    module=module,
-                    submodule=submodule,
-                )
-                function_points.append(fp)
-            
-            # 去重
-            seen = set()
-            unique_fps = []
-            for fp in function_points:
-                if fp.description not in seen:
-                    seen.add(fp.description)
-                    unique_fps.append(fp)
-            
-            # 返回所有提取到的功能点，不做数量限制
-            print(f"✅ 成功提取 {len(unique_fps)} 个功能点（无上限限制）")
-            return unique_fps
-            
-        except Exception as e:
-            print(f"⚠️ AI提取失败: {e}，使用本地提取")
-            return self._extract_function_points_local(requirement_text)
+        response = self.ai_api_caller(prompt)
+        lines = response.strip().split('\n')
+        
+        function_points = []
+        for i, line in enumerate(lines, 1):
+            line = line.strip().lstrip('-*•· ').strip()
+            line = re.sub(r'^\d+[\.\)、]\s*', '', line)
+            if not line:
+                continue
+            mod_guess, sub_guess, desc = _split_function_point_line(line)
+            if not desc or len(desc) < 3:
+                continue
+            if len(desc) > 220:
+                desc = desc[:217] + "..."
+            exclude_plain = [
+                '示例', '说明', '注意', '提取', '需求', '输出格式', '功能点', '以下', '如下', 'figma', 'Figma',
+            ]
+            if '|' not in line and any(kw in line for kw in exclude_plain):
+                continue
+            low = line.lower()
+            if '|' in line and (
+                low.startswith('module |')
+                or low.startswith('module|')
+                or ('submodule' in low[:50] and 'summary' in low)
+                or ('子模块' in line[:40] and ('简述' in line or '功能点' in line[:20]))
+            ):
+                continue
+            if mod_guess and sub_guess:
+                module, submodule = mod_guess[:80], sub_guess[:80]
+            else:
+                module, submodule = self._guess_module_from_text(desc, requirement_text)
+            fp = FunctionPoint(
+                id=i,
+                description=desc,
+                module=module,
+                submodule=submodule,
+            )
+            function_points.append(fp)
+        
+        # 去重
+        seen = set()
+        unique_fps = []
+        for fp in function_points:
+            if fp.description not in seen:
+                seen.add(fp.description)
+                unique_fps.append(fp)
+        return unique_fps
     
     def _extract_function_points_local(self, requirement_text: str) -> List[FunctionPoint]:
         """本地关键词匹配提取功能点"""
@@ -551,11 +835,7 @@ Lines only, format: Module | Submodule | Function point summary
         text_length = len(requirement_text.strip())
         line_count = len([line for line in requirement_text.split('\n') if line.strip()])
         
-        action_keywords = ['查看', '显示', '切换', '创建', '添加', '删除', '修改',
-                          '检测', '弹', '恢复', '支持', '加载', '刷新', '保存',
-                          '选择', '输入', '配置', '计算', '验证', '匹配', '比较',
-                          '排序', '筛选', '搜索', '提交', '发送', '接收', '进入']
-        keyword_count = sum(1 for keyword in action_keywords if keyword in requirement_text)
+        keyword_count = len(scan_requirement(requirement_text).found('scale.actions'))
         
         print(f"📊 需求规模分析: 文本{text_length}字, 行数{line_count}, 关键词{keyword_count}个")
         
@@ -565,10 +845,55 @@ Lines only, format: Module | Submodule | Function point summary
     def _refine_requirement_for_generation(self, requirement_text: str) -> str:
         """
         调用 AI 将原始需求整理为结构化摘要（纯文本），降低后续用例生成时理解偏差。
+        超过 REFINE_INPUT_CHARS 的长文档分块并发梳理后按顺序拼接，覆盖全文。
         失败时退回原文摘录，不阻断流程。
         """
-        max_in = min(len(requirement_text), 32000)
-        body = requirement_text[:max_in]
+        if len(requirement_text) > REFINE_INPUT_CHARS:
+            return self._refine_requirement_chunked(requirement_text)
+        try:
+            r = self.ai_api_caller(self._build_refine_prompt(requirement_text))
+            out = (r or "").strip()
+            return out[:REFINE_OUTPUT_CHARS] if len(out) > REFINE_OUTPUT_CHARS else out
+        except Exception as e:
+            print(f"   ⚠️ 需求梳理失败，将使用原文摘录: {e}")
+            return requirement_text[:8000]
+
+    def _refine_requirement_chunked(self, requirement_text: str) -> str:
+        """
+        长文档：逐块梳理（并发），每块摘要限制在 REFINED_CHUNKED_TOTAL_CHARS / 块数 以内，
+        拼接后的总长度不超过思维导图可用的上下文长度
+        """
+        chunks = split_requirement(requirement_text)
+        total = len(chunks)
+        budget = max(REFINED_CHUNKED_TOTAL_CHARS // total, 600)
+        workers = max(1, min(self.max_workers, total))
+        print(f"   📑 需求较长，分 {total} 块梳理（每块摘要约 {budget} 字）")
+
+        def _map(chunk: RequirementChunk) -> str:
+            if self.language == "en":
+                title = f"[Part {chunk.index}/{total}{': ' + chunk.heading if chunk.heading else ''}]"
+                note = (f"This is part {chunk.index}/{total} of a longer document; summarize only this part "
+                        f"in at most {budget} characters.")
+            else:
+                title = f"【第 {chunk.index}/{total} 部分{'：' + chunk.heading if chunk.heading else ''}】"
+                note = f"以下为长文档的第 {chunk.index}/{total} 部分，只梳理这一部分，不超过 {budget} 字。"
+            try:
+                out = (self.ai_api_caller(self._build_refine_prompt(chunk.text, note)) or "").strip()
+            except Exception as e:
+                print(f"   ⚠️ 第 {chunk.index}/{total} 块梳理失败，使用原文摘录: {e}")
+                out = chunk.text.strip()
+            return f"{title}\n{_clip(out, budget)}"
+
+        if workers == 1:
+            parts = [_map(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refine") as pool:
+                parts = list(pool.map(_map, chunks))
+        return "\n\n".join(parts)
+
+    def _build_refine_prompt(self, body: str, part_note: str = "") -> str:
+        if part_note:
+            body = f"{part_note}\n\n{body}"
         if self.language == "en":
             prompt = f"""You are a senior business analyst and test architect (ISTQB-aligned). Read the requirement and output a structured plain-text summary for downstream test design.
 Rules:
@@ -608,21 +933,18 @@ Output only the structured summary."""
 {body}
 
 只输出梳理结果。"""
-        try:
-            r = self.ai_api_caller(prompt)
-            out = (r or "").strip()
-            return out[:16000] if len(out) > 16000 else out
-        except Exception as e:
-            print(f"   ⚠️ 需求梳理失败，将使用原文摘录: {e}")
-            return requirement_text[:8000]
+        return prompt
 
-    def _generate_test_point_mindmap(self, requirement_text: str) -> str:
+    def _generate_test_point_mindmap(self, requirement_text: str, refined_brief: Optional[str] = None) -> str:
         """
         在输出详细用例前，先生成测试点思维导图（Markdown 表格），便于模型自检覆盖率。
+        refined_brief 为空时基于原文（快速准备模式）；None 时取 self._refined_requirement_brief。
         """
         if not self.ai_api_caller:
             return ""
-        refined = (self._refined_requirement_brief or "").strip()
+        if refined_brief is None:
+            refined_brief = self._refined_requirement_brief
+        refined = (refined_brief or "").strip()
         ctx = refined[:12000] if refined else requirement_text[:12000]
         iter_note = _clip(self._iteration_context, 4000)
         diff_note = _clip(self._code_change_summary, 6000)
@@ -741,8 +1063,12 @@ Output ONLY the markdown table and optional sections below it. No JSON."""
         return "\n\n".join(parts) if parts else ""
 
     def _generate_cases_for_function_point(self, fp: FunctionPoint, 
-                                           requirement_text: str) -> List[TestCase]:
-        """为单个功能点生成测试用例（根据复杂度自动调整数量）"""
+                                           requirement_text: str,
+                                           on_stream_case: Optional[Callable[[TestCase, int], None]] = None) -> List[TestCase]:
+        """
+        为单个功能点生成测试用例（根据复杂度自动调整数量）
+        on_stream_case: 流式模式下每解析出一条用例即回调 (case, 本次响应内序号)（预览用，最终以返回值为准）
+        """
         if not self.ai_api_caller:
             return self._generate_cases_local(fp)
         
@@ -924,6 +1250,7 @@ Return **only** the JSON array.
         max_delay = 30  # 最大延迟时间（秒）
         
         for attempt in range(max_retries):
+            throttle_wait = None
             try:
                 _bound = getattr(self.ai_api_caller, "__self__", None)
                 _bu = _mu = None
@@ -934,7 +1261,10 @@ Return **only** the JSON array.
                         _bu = "https://api.deepseek.com"
                     _mu = getattr(_bound, "model", None)
                 print(f"🔗 调用API: base_url={_bu or 'N/A'}, model={_mu or 'N/A'}")
-                response = self.ai_api_caller(prompt)
+                if self.stream_responses and on_stream_case:
+                    response = self._call_ai_streaming(prompt, fp, on_stream_case)
+                else:
+                    response = self.ai_api_caller(prompt)
                 print(f"✅ API响应成功")
                 
                 # 如果响应非常短，可能是错误响应，增加重试
@@ -969,14 +1299,15 @@ Return **only** the JSON array.
                         cases_data = json.loads(json_str)
                     except json.JSONDecodeError as je:
                         print(f"   ⚠️ JSON解析失败，尝试修复: {je}")
-                        try:
-                            with open('debug_failed_response.txt', 'w', encoding='utf-8') as f:
-                                f.write(f"=== 原始响应 ({len(json_str)} 字符) ===\n")
-                                f.write(json_str)
-                                f.write(f"\n\n=== 错误信息 ===\n{je}")
-                            print(f"   💾 原始响应已保存到 debug_failed_response.txt 用于调试")
-                        except Exception:
-                            pass
+                        if _DEBUG_DUMPS:
+                            try:
+                                with open('debug_failed_response.txt', 'w', encoding='utf-8') as f:
+                                    f.write(f"=== 原始响应 ({len(json_str)} 字符) ===\n")
+                                    f.write(json_str)
+                                    f.write(f"\n\n=== 错误信息 ===\n{je}")
+                                print(f"   💾 原始响应已保存到 debug_failed_response.txt 用于调试")
+                            except Exception:
+                                pass
                         repaired = _try_llm_json_repair(json_str)
                         if repaired:
                             try:
@@ -1008,23 +1339,7 @@ Return **only** the JSON array.
                     test_cases = []
                     # 完全不限制用例数量，AI生成多少就全部接收
                     for i, case_data in enumerate(cases_data):  # 移除任何切片限制
-                        priority = self._parse_priority(case_data.get('priority', 'P1'))
-                        
-                        mod = (case_data.get('module') or '').strip() or fp.module
-                        sub = (case_data.get('submodule') or '').strip() or fp.submodule
-                        test_case = TestCase(
-                            module=mod,
-                            submodule=sub,
-                            case_id=case_data.get('case_id', f'{self._generate_case_id_prefix(fp)}{i+1:03d}'),
-                            title=case_data.get('title', f'{fp.description}验证'),
-                            precondition=case_data.get('precondition', '系统正常运行'),
-                            test_steps=case_data.get('test_steps', '待补充'),
-                            expected=case_data.get('expected', '待补充'),
-                            priority=priority,
-                            remark=case_data.get('remark', f'测试方法: AI生成 | 覆盖需求: {fp.description}'),
-                            methods_used=[TestMethod.AI_ENHANCED]
-                        )
-                        test_cases.append(test_case)
+                        test_cases.append(self._case_from_data(fp, case_data, i))
                     
                     if test_cases:
                         print(f"   ✅ 实际生成了 {len(test_cases)} 个测试用例")
@@ -1038,17 +1353,20 @@ Return **only** the JSON array.
                 error_msg = f"JSON解析失败: {str(e)}"
                 print(f"   ⚠️ 尝试 {attempt + 1}/{max_retries}: {error_msg}")
                 # 保存错误详情用于调试
-                try:
-                    with open(f'debug_json_error_{attempt+1}.txt', 'w', encoding='utf-8') as f:
-                        f.write(f"错误信息: {e}\n")
-                        f.write(f"响应内容前500字符: {response[:500] if response else '无响应'}\n")
-                        f.write(f"响应内容后500字符: {response[-500:] if response and len(response) > 500 else '内容不足'}\n")
-                    print(f"   💾 错误详情已保存到 debug_json_error_{attempt+1}.txt")
-                except Exception as file_err:
-                    print(f"   ⚠️ 保存错误详情失败: {file_err}")
+                if _DEBUG_DUMPS:
+                    try:
+                        with open(f'debug_json_error_{attempt+1}.txt', 'w', encoding='utf-8') as f:
+                            f.write(f"错误信息: {e}\n")
+                            f.write(f"响应内容前500字符: {response[:500] if response else '无响应'}\n")
+                            f.write(f"响应内容后500字符: {response[-500:] if response and len(response) > 500 else '内容不足'}\n")
+                        print(f"   💾 错误详情已保存到 debug_json_error_{attempt+1}.txt")
+                    except Exception as file_err:
+                        print(f"   ⚠️ 保存错误详情失败: {file_err}")
             except Exception as e:
                 error_msg = f"API调用失败: {str(e)}"
                 print(f"   ⚠️ 尝试 {attempt + 1}/{max_retries}: {error_msg}")
+                # 限流异常携带 Retry-After，按服务端建议等待而非固定退避
+                throttle_wait = getattr(e, "retry_after", None)
                 import traceback
                 traceback.print_exc()
                 # 记录更多错误上下文
@@ -1056,8 +1374,10 @@ Return **only** the JSON array.
             
             if attempt < max_retries - 1:
                 import time
-                # 使用指数退避策略
+                # 使用指数退避策略；限流时改用服务端给出的 Retry-After
                 wait_time = min(base_delay * (2 ** attempt), max_delay)
+                if throttle_wait is not None:
+                    wait_time = max(throttle_wait, 1)
                 print(f"   🔄 等待{wait_time}秒后重试 (第{attempt + 1}/{max_retries}次)...")
                 time.sleep(wait_time)
         
@@ -1070,6 +1390,50 @@ Return **only** the JSON array.
             print(f"   ⚠️ 记录失败日志时出错: {log_err}")
         return self._generate_cases_local(fp, case_count)
     
+    def _case_from_data(self, fp: FunctionPoint, case_data: Dict[str, Any], i: int) -> TestCase:
+        """将 AI 返回的单条用例 dict 转为 TestCase（缺失字段按功能点补默认值）"""
+        priority = self._parse_priority(case_data.get('priority', 'P1'))
+        
+        mod = (case_data.get('module') or '').strip() or fp.module
+        sub = (case_data.get('submodule') or '').strip() or fp.submodule
+        return TestCase(
+            module=mod,
+            submodule=sub,
+            case_id=case_data.get('case_id', f'{self._generate_case_id_prefix(fp)}{i+1:03d}'),
+            title=case_data.get('title', f'{fp.description}验证'),
+            precondition=case_data.get('precondition', '系统正常运行'),
+            test_steps=case_data.get('test_steps', '待补充'),
+            expected=case_data.get('expected', '待补充'),
+            priority=priority,
+            remark=case_data.get('remark', f'测试方法: AI生成 | 覆盖需求: {fp.description}'),
+            methods_used=[TestMethod.AI_ENHANCED]
+        )
+
+    def _call_ai_streaming(self, prompt: str, fp: FunctionPoint,
+                           on_stream_case: Callable[[TestCase, int], None]) -> str:
+        """
+        流式调用 AI：边接收边用增量解析器切出完整用例对象并回调 on_stream_case(case, 序号)；
+        返回完整响应文本，仍交由常规解析流程得出最终结果。
+        调用器切换到另一提供商的输出时调用 on_text.reset()：重建解析器，之后的用例序号从 0 重新开始，
+        预览随之替换。
+        """
+        parser = IncrementalJSONArrayParser()
+
+        def on_text(delta: str):
+            for case_data in parser.feed(delta):
+                try:
+                    pos = parser.emitted - 1
+                    on_stream_case(self._case_from_data(fp, case_data, pos), pos)
+                except Exception as cb_err:
+                    print(f"   ⚠️ 流式用例回调失败: {cb_err}")
+
+        def reset():
+            nonlocal parser
+            parser = IncrementalJSONArrayParser()
+
+        on_text.reset = reset
+        return self.ai_api_caller(prompt, on_text=on_text)
+
     def _clean_json_response(self, response: str) -> str:
         """清理 AI 响应中的 markdown 代码块（如 ```json ... ```）。"""
         response = re.sub(r"```json\s*```\s*", "", response)
@@ -1110,192 +1474,29 @@ Return **only** the JSON array.
         return response.strip()
     
     def _fix_json_format(self, json_str: str) -> str:
-        """Fix JSON format issues"""
+        """Fix JSON format issues（单遍状态机：转义非法引号/控制字符、删尾逗号、配平括号）"""
         print(f"   🔧 开始修复JSON格式，原始长度: {len(json_str)} 字符")
-        
-        import re
-        
-        # 移除控制字符和不可见字符
-        original_len = len(json_str)
-        json_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\uFFFD]', '', json_str)
-        # 移除零宽字符
-        json_str = re.sub(r'[\u200B-\u200D\uFEFF]', '', json_str)
-        if len(json_str) != original_len:
-            print(f"   ✅ 移除了控制字符")
-        
-        # 修复多余的回车符
-        original_len = len(json_str)
-        json_str = re.sub(r'\r\r', '\r', json_str)
-        json_str = re.sub(r'\r\n', '\n', json_str)
-        if len(json_str) != original_len:
-            print(f"   ✅ 修复了回车符问题")
-        
-        _pre_esc = json_str
-        json_str = _escape_interior_quotes_json(json_str)
-        # 再跑一轮：嵌套/多处未转义引号时一轮可能仍剩非法 "
-        json_str = _escape_interior_quotes_json(json_str)
-        if json_str != _pre_esc:
-            print(f"   ✅ 转义了 JSON 字符串值内的非法双引号")
-        original_len = len(json_str)
-        json_str = json_str.replace('\\\\\\\\', '\\\\')
-        if len(json_str) != original_len:
-            print(f"   ✅ 修复了双反斜杠问题")
-        
-        # 移除末尾逗号（如果存在）
-        original_len = len(json_str)
-        json_str = re.sub(r',\s*([\]}])', r'\1', json_str)
-        if len(json_str) != original_len:
-            print(f"   ✅ 移除了末尾逗号")
-        
-        # 修复引号问题 - 更保守的方法
-        original_len = len(json_str)
-        # 只修复明显的单引号问题，避免破坏JSON结构
-        # 仅在明显不是JSON结构的地方替换单引号
-        json_str = re.sub(r"(?<!\\)'", '"', json_str)
-        if len(json_str) != original_len:
-            print(f"   ✅ 修复了引号问题")
-        
-        print(f"   🔧 JSON格式修复完成，新长度: {len(json_str)} 字符")
-        return json_str
+        fixed = repair_json_text(json_str)
+        if not fixed:
+            return json_str
+        print(f"   🔧 JSON格式修复完成，新长度: {len(fixed)} 字符")
+        return fixed
     
     def _aggressive_json_fix(self, json_str: str) -> str:
-        """Aggressively fix JSON format issues (handle unfinished strings)"""
+        """Aggressively fix JSON format issues（截断响应：丢弃最后一个不完整的用例对象后闭合）"""
         print(f"   🔧 开始积极修复JSON，原始长度: {len(json_str)} 字符")
-        
-        # 保存原始字符串用于调试
-        try:
-            with open('debug_original_json.txt', 'w', encoding='utf-8') as f:
-                f.write(json_str)
-            print(f"   💾 原始JSON已保存到 debug_original_json.txt")
-        except Exception as e:
-            print(f"   ⚠️ 保存原始JSON失败: {e}")
-        
-        # 方案0: AI响应专用修复 - 头部修复策略
-        try:
-            import re
-            test_str = _escape_interior_quotes_json(json_str.rstrip())
-            # 移除控制字符和不可见字符
-            test_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\uFFFD]', '', test_str)
-            test_str = re.sub(r'[\u200B-\u200D\uFEFF]', '', test_str)
-            
-            # 特别处理：如果字符串以 "[Verify] 结尾，说明被截断在字符串中间
-            if test_str.endswith('[Verify]') or '[Verify]\n' in test_str[-50:]:
-                # 在末尾添加合理的结束内容
-                test_str = test_str + ' the progress accuracy against the known data size."}]'
-                print(f"   ✅ 修复被截断的测试步骤字符串")
-            
-            # 补全可能缺失的结尾括号
-            open_square = test_str.count('[')
-            close_square = test_str.count(']')
-            open_curly = test_str.count('{')
-            close_curly = test_str.count('}')
-            
-            missing_square = open_square - close_square
-            missing_curly = open_curly - close_curly
-            
-            if missing_square > 0:
-                test_str += ']' * missing_square
-                print(f"   ✅ 补全 {missing_square} 个缺失的方括号")
-            if missing_curly > 0:
-                test_str += '}' * missing_curly
-                print(f"   ✅ 补全 {missing_curly} 个缺失的花括号")
-                
-            # 移除末尾可能的逗号
-            if test_str.endswith(','):
-                test_str = test_str[:-1]
-                print(f"   ✅ 移除末尾多余的逗号")
-                
-            # 再次清理控制字符
-            test_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', test_str)
-                
-            # 尝试解析
-            test_data = json.loads(test_str)
-            if isinstance(test_data, list) and len(test_data) > 0:
-                print(f"   ✅ AI专用修复成功: {len(json_str)} → {len(test_str)} 字符，得到 {len(test_data)} 个对象")
-                # 保存修复后的JSON用于调试
-                try:
-                    with open('debug_fixed_json.txt', 'w', encoding='utf-8') as f:
-                        f.write(test_str)
-                    print(f"   💾 修复后的JSON已保存到 debug_fixed_json.txt")
-                except Exception as e:
-                    print(f"   ⚠️ 保存修复后的JSON失败: {e}")
-                return test_str
-            elif isinstance(test_data, dict):
-                print(f"   ✅ AI专用修复成功: 找到单个对象")
-                # 保存修复后的JSON用于调试
-                try:
-                    with open('debug_fixed_json.txt', 'w', encoding='utf-8') as f:
-                        f.write(test_str)
-                    print(f"   💾 修复后的JSON已保存到 debug_fixed_json.txt")
-                except Exception as e:
-                    print(f"   ⚠️ 保存修复后的JSON失败: {e}")
-                return test_str
-        except json.JSONDecodeError as e:
-            print(f"   ⚠️ AI专用修复仍无法解析 JSON: {e}")
-        except Exception as e:
-            print(f"   ⚠️ AI专用修复失败: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # 方案1: 查找最后一个完整对象
-        print(f"   🔍 方案1: 查找最后一个完整对象...")
-        for i in range(len(json_str) - 1, -1, -1):
-            if json_str[i] in ['}', ']']:
-                test_str = json_str[:i+1]
-                try:
-                    # 清理后再尝试解析
-                    import re
-                    clean_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', test_str)
-                    clean_str = re.sub(r'[\u200B-\u200D\uFEFF]', '', clean_str)
-                    clean_str = _escape_interior_quotes_json(clean_str)
-                    test_data = json.loads(clean_str)
-                    if isinstance(test_data, list) and len(test_data) > 0:
-                        print(f"   ✅ 找到有效JSON位置 {i+1}，包含 {len(test_data)} 个对象")
-                        return clean_str
-                    elif isinstance(test_data, dict):
-                        print(f"   ✅ 找到单个对象位置 {i+1}")
-                        return clean_str
-                except:
-                    continue
-        
-        # 方案2: 逐步截断修复
-        print(f"   🔍 方案2: 逐步截断修复...")
-        for i in range(len(json_str), max(0, len(json_str) - 2000), -50):
-            test_str = json_str[:i].rstrip()
-            
-            # 跳过不合理的位置
-            if not test_str or test_str[-1] not in ['}', ']', '"', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
-                continue
-            
-            # 补全括号
-            open_square = test_str.count('[')
-            close_square = test_str.count(']')
-            open_curly = test_str.count('{')
-            close_curly = test_str.count('}')
-            
-            if open_square > close_square:
-                test_str += ']' * (open_square - close_square)
-            if open_curly > close_curly:
-                test_str += '}' * (open_curly - close_curly)
-            
-            # 移除控制字符
-            import re
-            test_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\uFFFD]', '', test_str)
-            test_str = re.sub(r'[\u200B-\u200D\uFEFF]', '', test_str)
-            test_str = _escape_interior_quotes_json(test_str)
-            
+        for drop_tail in (False, True):
+            fixed = repair_json_text(json_str, drop_incomplete_tail=drop_tail)
+            if not fixed:
+                break
             try:
-                test_data = json.loads(test_str)
-                if isinstance(test_data, list) and len(test_data) > 0:
-                    print(f"   ✅ 截断修复成功: {len(json_str)} → {len(test_str)} 字符，得到 {len(test_data)} 个对象")
-                    return test_str
-                elif isinstance(test_data, dict):
-                    print(f"   ✅ 截断修复成功: 找到单个对象")
-                    return test_str
-            except (json.JSONDecodeError, ValueError):
-                continue
-            except Exception:
+                data = json.loads(fixed)
+            except json.JSONDecodeError as e:
+                print(f"   ⚠️ 修复后仍无法解析 JSON: {e}")
                 continue
+            if isinstance(data, dict) or (isinstance(data, list) and data):
+                print(f"   ✅ 积极修复成功: {len(json_str)} → {len(fixed)} 字符")
+                return fixed
         
         print(f"   ❌ 所有修复方案均失败")
         return '[]'  # 返回空数组
@@ -1310,32 +1511,23 @@ Return **only** the JSON array.
         - 不对AI生成数量做任何限制
         """
         desc = fp.description
-        
-        # 复杂功能关键词（需要更多测试用例）
-        complex_keywords = ['选择', '输入', '配置', '计算', '验证', '匹配', '比较', '排序', '筛选', '搜索']
-        medium_keywords = ['显示', '查看', '切换', '加载', '保存', '删除', '修改']
-        simple_keywords = ['打开', '关闭', '跳转', '返回', '刷新']
+        # 复杂/中等/简单功能关键词与条件词（fp.* 关键词族），一次扫描描述
+        hits = function_point_keywords.scan(desc)
         
         # 计算复杂度得分
         complexity_score = 0
         
-        # 检查复杂关键词
-        for kw in complex_keywords:
-            if kw in desc:
-                complexity_score += 4
-                break
+        # 检查复杂关键词（需要更多测试用例）
+        if hits.has('fp.complex'):
+            complexity_score += 4
         
         # 检查中等关键词
-        for kw in medium_keywords:
-            if kw in desc:
-                complexity_score += 2
-                break
+        if hits.has('fp.medium'):
+            complexity_score += 2
         
         # 检查简单关键词
-        for kw in simple_keywords:
-            if kw in desc:
-                complexity_score += 1
-                break
+        if hits.has('fp.simple'):
+            complexity_score += 1
         
         # 描述长度影响复杂度
         if len(desc) > 40:
@@ -1352,9 +1544,7 @@ Return **only** the JSON array.
             complexity_score += 2
         
         # 包含多个条件词（"且"、"或"、"同时"）
-        condition_words = ['且', '或', '同时', '并且', '以及', '和']
-        condition_count = sum(1 for word in condition_words if word in desc)
-        complexity_score += condition_count
+        complexity_score += len(hits.found('fp.conditions'))
         
         # 根据得分给出建议基准值（AI可以生成更多）
         if complexity_score >= 10:
@@ -1672,6 +1862,30 @@ Target **{case_count}+** cases; expand freely by risk.
         
         return fixed_cases
     
+    def _handle_near_duplicates(
+        self,
+        test_cases: List[TestCase],
+        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> List[TestCase]:
+        """跨功能点的近似重复用例：report 模式在备注中标出，merge 模式每簇只保留一条"""
+        start = time.time()
+        clusters = find_near_duplicates(test_cases, self.near_duplicate_threshold)
+        involved = sum(len(c) for c in clusters)
+        removed = 0
+        if clusters and self.near_duplicates == "merge":
+            before = len(test_cases)
+            test_cases = merge_near_duplicates(test_cases, clusters)
+            removed = before - len(test_cases)
+        elif clusters:
+            mark_near_duplicates(test_cases, clusters, self.language)
+        print(f"🔍 近似重复检测: {len(clusters)} 组 / {involved} 个用例"
+              f"{f'，合并掉 {removed} 个' if removed else ''}（{time.time() - start:.2f}秒）")
+        if progress_callback:
+            progress_callback("near_duplicates", {
+                "clusters": len(clusters), "cases": involved, "removed": removed, "mode": self.near_duplicates,
+            })
+        return test_cases
+
     def _fix_case_id(self, case_id: str, index: int) -> str:
         """修正case_id格式"""
         # 移除TC_等前缀
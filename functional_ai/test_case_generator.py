@@ -6,11 +6,15 @@
 """
 
 from enum import Enum
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional
-import pandas as pd
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
 
+from .excel_stream import write_excel_stream
+from .keyword_engine import scan_requirement
+
 
 class Priority(Enum):
     """测试用例优先级"""
@@ -45,9 +49,174 @@ class RequirementAnalysis:
     integration_points: List[str] = field(default_factory=list)  # 集成点
 
 
+# 默认双语导出模板的列顺序
+DEFAULT_EXPORT_HEADERS = (
+    '用例编号 | Use Case #',
+    '模块 | Module',
+    '子模块 | Submodule',
+    '用例标题 | Use Case Title',
+    '预置条件 | Present Condition',
+    '用例步骤 | Use case steps',
+    '预期结果 | Expected result',
+    '实际结果 | Actual result',
+    '测试负责人 | Test owner',
+    '优先级 | Priority',
+    '是否执行 | Whether to implement',
+    '是否评审 | Whether to review',
+    '备注 | Remarks',
+)
+
+
+def _priority_value(tc: 'TestCase') -> str:
+    return tc.priority.value
+
+
+def _remark_value(tc: 'TestCase') -> str:
+    return tc.remark if tc.remark else ''
+
+
+def _blank_value(tc: 'TestCase') -> str:
+    return ''
+
+
+_case_id = attrgetter('case_id')
+_module = attrgetter('module')
+_submodule = attrgetter('submodule')
+_title = attrgetter('title')
+_precondition = attrgetter('precondition')
+_test_steps = attrgetter('test_steps')
+_expected = attrgetter('expected')
+
+# 字段名 -> 取值函数（自定义表头中未出现在此表的字段导出为空字符串）
+FIELD_GETTERS: Dict[str, Callable[['TestCase'], str]] = {
+    # 用例编号相关
+    '用例编号': _case_id,
+    'Use Case #': _case_id,
+    '用例编号 | Use Case #': _case_id,
+    '用例ID': _case_id,
+    'case_id': _case_id,
+
+    # 模块相关
+    '模块': _module,
+    'Module': _module,
+    '模块 | Module': _module,
+    '功能模块': _module,
+
+    # 子模块相关
+    '子模块': _submodule,
+    'Submodule': _submodule,
+    '子模块 | Submodule': _submodule,
+
+    # 标题相关
+    '用例标题': _title,
+    'Use Case Title': _title,
+    '用例标题 | Use Case Title': _title,
+    'title': _title,
+
+    # 前置条件相关
+    '预置条件': _precondition,
+    'Present Condition': _precondition,
+    '预置条件 | Present Condition': _precondition,
+    '前置条件': _precondition,
+    'precondition': _precondition,
+
+    # 测试步骤相关
+    '用例步骤': _test_steps,
+    'Use case steps': _test_steps,
+    '用例步骤 | Use case steps': _test_steps,
+    '测试步骤': _test_steps,
+    'test_steps': _test_steps,
+
+    # 预期结果相关
+    '预期结果': _expected,
+    'Expected result': _expected,
+    '预期结果 | Expected result': _expected,
+    'expected': _expected,
+
+    # 实际结果相关
+    '实际结果': _blank_value,
+    'Actual result': _blank_value,
+    '实际结果 | Actual result': _blank_value,
+
+    # 测试负责人相关
+    '测试负责人': _blank_value,
+    'Test owner': _blank_value,
+    '测试负责人 | Test owner': _blank_value,
+
+    # 优先级相关
+    '优先级': _priority_value,
+    'Priority': _priority_value,
+    '优先级 | Priority': _priority_value,
+
+    # 是否执行相关
+    '是否执行': _blank_value,
+    'Whether to implement': _blank_value,
+    '是否执行 | Whether to implement': _blank_value,
+
+    # 是否评审相关
+    '是否评审': _blank_value,
+    'Whether to review': _blank_value,
+    '是否评审 | Whether to review': _blank_value,
+
+    # 备注相关
+    '备注': _remark_value,
+    'Remarks': _remark_value,
+    '备注 | Remarks': _remark_value,
+}
+
+
+@lru_cache(maxsize=64)
+def _compile_fields(fields: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[Callable, ...]]:
+    if not fields:
+        headers = DEFAULT_EXPORT_HEADERS
+    else:
+        headers = tuple(f.strip() for f in fields)
+    return headers, tuple(FIELD_GETTERS.get(h, _blank_value) for h in headers)
+
+
+def compile_field_getters(custom_fields: Optional[Sequence[str]] = None
+                          ) -> Tuple[Tuple[str, ...], Tuple[Callable, ...]]:
+    """
+    将表头编译为 (表头, 取值函数) 两个等长元组
+
+    Args:
+        custom_fields: 自定义字段列表，为空时使用默认双语模板
+
+    Returns:
+        Tuple: (去除首尾空白后的表头, 对应的取值函数)
+    """
+    return _compile_fields(tuple(custom_fields) if custom_fields else ())
+
+
+# Markdown 导出中每条用例的固定段落，占位符与 _MARKDOWN_GETTERS 一一对应
+_MARKDOWN_GETTERS = (_case_id, _title, _submodule, _priority_value, _precondition, _test_steps, _expected)
+_MARKDOWN_CASE_TEMPLATE = (
+    "### {}: {}\n\n"
+    "**子模块**: {}\n\n"
+    "**优先级**: {}\n\n"
+    "**前置条件**: {}\n\n"
+    "**测试步骤**:\n\n{}\n\n"
+    "**预期结果**: {}\n\n"
+)
+
+
+def _with_slots(cls):
+    """
+    按数据类字段重建带 __slots__ 的类（等同 Python 3.10+ 的 dataclass(slots=True)，兼容 3.8/3.9）
+    字段默认值已编译进生成的 __init__，类属性中的默认值需去掉，否则与同名 slot 冲突
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names + ("__dict__", "__weakref__"):
+        namespace.pop(name, None)
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_with_slots
 @dataclass
 class TestCase:
-    """测试用例数据类"""
+    """测试用例数据类（__slots__：不为每个实例分配 __dict__）"""
     module: str  # 模块
     submodule: str  # 子模块
     case_id: str  # 用例编号
@@ -68,116 +237,25 @@ class TestCase:
         Returns:
             Dict: 包含测试用例数据的字典
         """
-        # 默认双语模板
-        default_template = {
-            '用例编号 | Use Case #': self.case_id,
-            '模块 | Module': self.module,
-            '子模块 | Submodule': self.submodule,
-            '用例标题 | Use Case Title': self.title,
-            '预置条件 | Present Condition': self.precondition,
-            '用例步骤 | Use case steps': self.test_steps,
-            '预期结果 | Expected result': self.expected,
-            '实际结果 | Actual result': '',
-            '测试负责人 | Test owner': '',
-            '优先级 | Priority': self.priority.value,
-            '是否执行 | Whether to implement': '',
-            '是否评审 | Whether to review': '',
-            '备注 | Remarks': self.remark if self.remark else ''
-        }
-        
-        # 如果没有自定义字段，返回默认模板
-        if not custom_fields:
-            return default_template
-        
-        # 字段值映射表 - 将字段名映射到实际值
-        field_value_map = {
-            # 用例编号相关
-            '用例编号': self.case_id,
-            'Use Case #': self.case_id,
-            '用例编号 | Use Case #': self.case_id,
-            '用例ID': self.case_id,
-            'case_id': self.case_id,
-            
-            # 模块相关
-            '模块': self.module,
-            'Module': self.module,
-            '模块 | Module': self.module,
-            '功能模块': self.module,
-            
-            # 子模块相关
-            '子模块': self.submodule,
-            'Submodule': self.submodule,
-            '子模块 | Submodule': self.submodule,
-            
-            # 标题相关
-            '用例标题': self.title,
-            'Use Case Title': self.title,
-            '用例标题 | Use Case Title': self.title,
-            'title': self.title,
-            
-            # 前置条件相关
-            '预置条件': self.precondition,
-            'Present Condition': self.precondition,
-            '预置条件 | Present Condition': self.precondition,
-            '前置条件': self.precondition,
-            'precondition': self.precondition,
-            
-            # 测试步骤相关
-            '用例步骤': self.test_steps,
-            'Use case steps': self.test_steps,
-            '用例步骤 | Use case steps': self.test_steps,
-            '测试步骤': self.test_steps,
-            'test_steps': self.test_steps,
-            
-            # 预期结果相关
-            '预期结果': self.expected,
-            'Expected result': self.expected,
-            '预期结果 | Expected result': self.expected,
-            'expected': self.expected,
-            
-            # 实际结果相关
-            '实际结果': '',
-            'Actual result': '',
-            '实际结果 | Actual result': '',
-            
-            # 测试负责人相关
-            '测试负责人': '',
-            'Test owner': '',
-            '测试负责人 | Test owner': '',
-            
-            # 优先级相关
-            '优先级': self.priority.value,
-            'Priority': self.priority.value,
-            '优先级 | Priority': self.priority.value,
-            
-            # 是否执行相关
-            '是否执行': '',
-            'Whether to implement': '',
-            '是否执行 | Whether to implement': '',
-            
-            # 是否评审相关
-            '是否评审': '',
-            'Whether to review': '',
-            '是否评审 | Whether to review': '',
-            
-            # 备注相关
-            '备注': self.remark if self.remark else '',
-            'Remarks': self.remark if self.remark else '',
-            '备注 | Remarks': self.remark if self.remark else ''
-        }
-        
-        # 使用自定义字段构建字典
-        result = {}
-        for field in custom_fields:
-            field = field.strip()
-            # 在映射表中查找对应的值
-            if field in field_value_map:
-                result[field] = field_value_map[field]
-            else:
-                # 如果找不到映射，设置为空字符串
-                result[field] = ''
-        
-        return result
+        headers, getters = compile_field_getters(custom_fields)
+        return {header: getter(self) for header, getter in zip(headers, getters)}
+    
+    def to_row(self, getters: Sequence[Callable[['TestCase'], str]]) -> tuple:
+        """按编译好的取值函数生成一行（导出快速路径，不创建字典）"""
+        return tuple([getter(self) for getter in getters])
+    
+    def __getstate__(self):
+        return tuple([getattr(self, name) for name in _TEST_CASE_SLOTS])
+    
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # 兼容旧版（非 slots 的 dataclass）pickle：状态为 __dict__
+            state = [state[name] for name in _TEST_CASE_SLOTS]
+        for name, value in zip(_TEST_CASE_SLOTS, state):
+            setattr(self, name, value)
+
+
+_TEST_CASE_SLOTS = TestCase.__slots__
 
 
 class TestCaseGenerator:
@@ -203,6 +281,8 @@ class TestCaseGenerator:
             elif isinstance(custom_headers, list):
                 # 如果已经是列表，直接使用
                 self.custom_fields = custom_headers
+        # 表头解析只做一次：导出时逐条调用取值函数，不再为每条用例构建字典
+        self.export_headers, self.export_getters = compile_field_getters(self.custom_fields)
         
     def generate_case_id(self, module: str, submodule: str = "") -> str:
         """生成测试用例编号"""
@@ -283,62 +363,54 @@ class TestCaseGenerator:
         else:
             analysis.complexity_score = 0.9
         
-        # 简单的关键词识别
-        keywords = {
-            'risk': ['安全', '权限', '支付', '金额', '密码', 'security', 'payment'],
-            'integration': ['接口', '集成', '第三方', 'API', 'integration'],
-            'business': ['规则', '条件', '如果', '当', 'rule', 'condition']
-        }
-        
-        for keyword in keywords['risk']:
-            if keyword in requirement_text:
-                analysis.risk_areas.append(f"包含{keyword}相关功能")
+        # 简单的关键词识别（关键词族 basic.*，与其他本地分析器共用一次扫描）
+        hits = scan_requirement(requirement_text)
+        for keyword in hits.found('basic.risk'):
+            analysis.risk_areas.append(f"包含{keyword}相关功能")
         
-        for keyword in keywords['integration']:
-            if keyword in requirement_text:
-                analysis.integration_points.append(f"包含{keyword}相关功能")
+        for keyword in hits.found('basic.integration'):
+            analysis.integration_points.append(f"包含{keyword}相关功能")
                 
-        for keyword in keywords['business']:
-            if keyword in requirement_text:
-                analysis.business_rules.append(f"包含{keyword}相关逻辑")
+        for keyword in hits.found('basic.business'):
+            analysis.business_rules.append(f"包含{keyword}相关逻辑")
         
         return analysis
     
-    def export_to_excel(self, file_path: str) -> str:
+    def get_export_headers(self) -> List[str]:
+        """导出表头：自定义字段（去除首尾空白）或默认双语模板"""
+        return list(self.export_headers)
+
+    def iter_export_rows(self, test_cases: Optional[Iterable[TestCase]] = None) -> Iterator[tuple]:
+        """逐条生成导出行（按 get_export_headers 的列顺序），不在内存中累积"""
+        getters = self.export_getters
+        cases = self.test_cases if test_cases is None else test_cases
+        for tc in cases:
+            yield tuple([getter(tc) for getter in getters])
+
+    def export_to_excel(self, file_path: str, test_cases: Optional[Iterable[TestCase]] = None) -> str:
         """
-        导出测试用例到Excel文件
+        导出测试用例到Excel文件（openpyxl 只写模式流式写入）
         
         Args:
             file_path: 导出文件路径
+            test_cases: 要导出的测试用例，默认为 self.test_cases
             
         Returns:
             str: 导出文件的完整路径
         """
-        if not self.test_cases:
+        cases = self.test_cases if test_cases is None else test_cases
+        if not isinstance(cases, Sequence):
+            # 列宽需先扫描一遍，一次性迭代器只保留用例引用
+            cases = list(cases)
+        if not cases:
             raise ValueError("没有可导出的测试用例")
         
-        # 转换为DataFrame - 传递自定义字段
-        data = [tc.to_dict(custom_fields=self.custom_fields) for tc in self.test_cases]
-        df = pd.DataFrame(data)
-        
-        # 如果有自定义字段，确保列顺序与自定义字段顺序一致
-        if self.custom_fields:
-            df = df[self.custom_fields]
-        
-        # 导出到Excel
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='测试用例')
-            
-            # 自动调整列宽
-            worksheet = writer.sheets['测试用例']
-            for idx, col in enumerate(df.columns):
-                max_length = max(
-                    df[col].astype(str).map(len).max(),
-                    len(str(col))
-                ) + 2
-                worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
-        
-        return file_path
+        return write_excel_stream(
+            file_path,
+            self.get_export_headers(),
+            lambda: self.iter_export_rows(cases),
+            sheet_name='测试用例',
+        )
     
     def export_to_markdown(self, file_path: str) -> str:
         """
@@ -371,21 +443,17 @@ class TestCaseGenerator:
                 f.write(f"## {module}\n\n")
                 
                 for tc in cases:
-                    f.write(f"### {tc.case_id}: {tc.title}\n\n")
-                    f.write(f"**子模块**: {tc.submodule}\n\n")
-                    f.write(f"**优先级**: {tc.priority.value}\n\n")
-                    f.write(f"**前置条件**: {tc.precondition}\n\n")
-                    f.write(f"**测试步骤**:\n\n{tc.test_steps}\n\n")
-                    f.write(f"**预期结果**: {tc.expected}\n\n")
+                    parts = [_MARKDOWN_CASE_TEMPLATE.format(*tc.to_row(_MARKDOWN_GETTERS))]
                     
                     if tc.methods_used:
                         methods_str = ', '.join([m.value for m in tc.methods_used])
-                        f.write(f"**测试方法**: {methods_str}\n\n")
+                        parts.append(f"**测试方法**: {methods_str}\n\n")
                     
                     if tc.remark:
-                        f.write(f"**备注**: {tc.remark}\n\n")
+                        parts.append(f"**备注**: {tc.remark}\n\n")
                     
-                    f.write("---\n\n")
+                    parts.append("---\n\n")
+                    f.write(''.join(parts))
         
         return file_path
     
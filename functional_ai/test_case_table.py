@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式测试用例集合
+大批量生成时，生成结果、暂存用例等长期驻留的用例列表改用 TestCaseTable 存放：
+- 模块/子模块字符串去重后按编号存储（同一模块名只保留一份）
+- 优先级按 Priority 定义顺序编码为字节数组
+- 测试方法编码为位掩码（按 TestMethod 定义顺序解码，重复项合并）
+- 其余文本字段按列存放在列表中，不再为每条用例保留对象与方法列表
+迭代、下标、len、切片与 List[TestCase] 一致（取出时即时构建 TestCase），现有调用方无需改动。
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Union
+
+from .test_case_generator import Priority, TestCase, TestMethod
+
+_PRIORITIES = tuple(Priority)
+_PRIORITY_CODES = {p: i for i, p in enumerate(_PRIORITIES)}
+_METHODS = tuple(TestMethod)
+_METHOD_BITS = {m: 1 << i for i, m in enumerate(_METHODS)}
+
+
+def encode_methods(methods: Iterable[TestMethod]) -> int:
+    """测试方法列表 -> 位掩码"""
+    mask = 0
+    for m in methods:
+        mask |= _METHOD_BITS[m]
+    return mask
+
+
+def decode_methods(mask: int) -> List[TestMethod]:
+    """位掩码 -> 测试方法列表（按 TestMethod 定义顺序）"""
+    return [m for i, m in enumerate(_METHODS) if mask >> i & 1]
+
+
+class TestCaseTable(Sequence):
+    """按列存储的 TestCase 集合，可当作只追加的 List[TestCase] 使用"""
+
+    __slots__ = (
+        '_strings', '_string_codes', '_modules', '_submodules',
+        'case_ids', 'titles', 'preconditions', 'test_steps', 'expected', 'remarks',
+        '_priorities', '_methods',
+    )
+
+    def __init__(self, cases: Iterable[TestCase] = ()):
+        self._strings: List[str] = []  # 模块/子模块字符串池
+        self._string_codes: Dict[str, int] = {}
+        self._modules = array('I')
+        self._submodules = array('I')
+        self.case_ids: List[str] = []
+        self.titles: List[str] = []
+        self.preconditions: List[str] = []
+        self.test_steps: List[str] = []
+        self.expected: List[str] = []
+        self.remarks: List[str] = []
+        self._priorities = array('B')
+        self._methods = array('I')
+        self.extend(cases)
+
+    @classmethod
+    def from_cases(cls, cases: Iterable[TestCase]) -> 'TestCaseTable':
+        """已是 TestCaseTable 时直接返回，否则按列转换"""
+        if isinstance(cases, cls):
+            return cases
+        return cls(cases)
+
+    def _intern(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def append(self, tc: TestCase) -> None:
+        self._modules.append(self._intern(tc.module))
+        self._submodules.append(self._intern(tc.submodule))
+        self.case_ids.append(tc.case_id)
+        self.titles.append(tc.title)
+        self.preconditions.append(tc.precondition)
+        self.test_steps.append(tc.test_steps)
+        self.expected.append(tc.expected)
+        self.remarks.append(tc.remark)
+        self._priorities.append(_PRIORITY_CODES[tc.priority])
+        self._methods.append(encode_methods(tc.methods_used))
+
+    def extend(self, cases: Iterable[TestCase]) -> None:
+        for tc in cases:
+            self.append(tc)
+
+    def _build(self, i: int) -> TestCase:
+        strings = self._strings
+        return TestCase(
+            module=strings[self._modules[i]],
+            submodule=strings[self._submodules[i]],
+            case_id=self.case_ids[i],
+            title=self.titles[i],
+            precondition=self.preconditions[i],
+            test_steps=self.test_steps[i],
+            expected=self.expected[i],
+            priority=_PRIORITIES[self._priorities[i]],
+            remark=self.remarks[i],
+            methods_used=decode_methods(self._methods[i]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.case_ids)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._build(i) for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("TestCaseTable index out of range")
+        return self._build(index)
+
+    def __iter__(self) -> Iterator[TestCase]:
+        for i in range(len(self)):
+            yield self._build(i)
+
+    def to_list(self) -> List[TestCase]:
+        return [self._build(i) for i in range(len(self))]
+
+    def __repr__(self) -> str:
+        return f"TestCaseTable({len(self)} cases, {len(self._strings)} distinct modules/submodules)"
+
+    # 序列化：只保存各列（字符串池索引重建）
+    def __getstate__(self):
+        return (
+            self._strings, self._modules, self._submodules,
+            self.case_ids, self.titles, self.preconditions, self.test_steps, self.expected, self.remarks,
+            self._priorities, self._methods,
+        )
+
+    def __setstate__(self, state):
+        (self._strings, self._modules, self._submodules,
+         self.case_ids, self.titles, self.preconditions, self.test_steps, self.expected, self.remarks,
+         self._priorities, self._methods) = state
+        self._string_codes = {s: i for i, s in enumerate(self._strings)}
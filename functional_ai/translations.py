@@ -393,6 +393,8 @@ TRANSLATIONS = {
         'chinese_only': '仅中文',
         'english_only': '仅英文',
         'language_hint': '选择生成的测试用例内容使用的语言（不影响字段标题）',
+        'use_response_cache_label': '复用AI响应缓存',
+        'use_response_cache_hint': '相同需求与提示词直接复用历史AI响应，节省时间与费用；取消勾选则强制重新生成',
         'custom_headers_hint': '各字段用<strong>逗号</strong>分隔（支持中文“，”或英文“,”）。不填写则使用默认双语模板。',
         'default_template_hint': '默认模板：用例编号 | Use Case #、模块 | Module、子模块 | Submodule、用例标题 | Use Case Title、预置条件 | Present Condition、用例步骤 | Use case steps、预期结果 | Expected result、实际结果 | Actual result、测试负责人 | Test owner、优先级 | Priority、是否执行 | Whether to implement、是否评审 | Whether to review、备注 | Remarks',
         
@@ -465,7 +467,10 @@ TRANSLATIONS = {
         'flash_generation_incomplete': '生成尚未完成',
         'flash_result_missing': '生成结果不存在',
         'flash_requirement_required': '请输入需求文档内容',
+        'flash_queue_full': '当前排队的生成任务过多，请约 {seconds} 秒后再提交',
+        'flash_client_queue_full': '您已有较多任务在排队，请等待其完成后再提交（约 {seconds} 秒）',
         'flash_regenerate_missing': '未找到该次生成的请求快照，无法预填表单。',
+        'flash_resume_unavailable': '该次生成没有可用的断点，请使用「重新生成」。',
         'flash_ai_generate_error': 'AI生成测试用例时发生错误：{error}',
         'flash_output_dir_missing': '输出目录不存在',
         'flash_file_not_found': '文件不存在：{filename}。请重新生成测试用例。',
@@ -498,16 +503,22 @@ TRANSLATIONS = {
         'progress_no_session': '生成会话不存在',
         'progress_step_error': '错误',
         'progress_initializing': '初始化...',
+        'progress_queued': '已提交，等待生成工作进程领取...',
+        'progress_queued_position': '排队中：前面还有 {ahead} 个任务，预计约 {minutes} 分钟后开始',
         'progress_strict_pipeline': '进入严格生成流程（提取功能点→梳理需求→逐条写用例）...',
         'progress_points_extracted': '已从需求中提取 {n} 个功能点',
+        'progress_resumed_checkpoint': '已从断点恢复：{n} 个功能点中 {done} 个已完成，继续生成剩余部分',
         'progress_refining_requirement': '正在梳理需求文档（整理上下文，尚未逐条写用例）…',
         'progress_refine_done': '需求梳理完成（{n} 字），准备生成测试点思维导图',
         'progress_mindmap_start': '正在生成测试点思维导图（ISTQB 多维度梳理）...',
         'progress_mindmap_done': '思维导图完成（{n} 字），开始逐功能点生成详细用例',
+        'progress_near_dup_marked': '发现 {clusters} 组近似重复用例（共 {cases} 个），已在备注中标出',
+        'progress_near_dup_merged': '发现 {clusters} 组近似重复用例（共 {cases} 个），已合并掉 {removed} 个',
         'step_test_mindmap': '测试点思维导图',
         'step_requirement_refine': '需求梳理',
         'progress_fp_item': '功能点 {i}/{t}：{name}',
         'progress_fp_done_short': '已完成 {i}/{t}，本功能点 {c} 条用例',
+        'progress_case_streamed': '{i}/{t}：已实时收到 {n} 条用例 — {title}',
         'partial_save_hint': '已导出已生成的 {n} 条用例到文件 {file}，可在下方按钮下载。',
         'progress_partial_download': '下载部分已生成用例（{n} 条）',
         'history_title': 'AI 生成历史',
@@ -527,6 +538,8 @@ TRANSLATIONS = {
         'history_action_progress': '查看进度',
         'history_action_result': '查看结果',
         'history_action_regenerate': '重新生成',
+        'history_action_resume': '继续生成',
+        'history_resume_hint': '从第一个未完成的功能点继续，已生成的用例不再重复生成',
         'history_regenerate_again': '再次生成',
         'history_empty': '暂无记录',
         'history_no_active': '当前没有进行中的任务',
@@ -977,6 +990,8 @@ TRANSLATIONS = {
         'chinese_only': 'Chinese Only',
         'english_only': 'English Only',
         'language_hint': 'Select the language for generated test case content (does not affect field headers)',
+        'use_response_cache_label': 'Reuse cached AI responses',
+        'use_response_cache_hint': 'Identical requirement and prompts reuse earlier AI responses to save time and cost; uncheck to force fresh generation',
         'custom_headers_hint': 'Separate fields with <strong>commas</strong> (fullwidth or ASCII). Leave blank to use the default bilingual column template.',
         'default_template_hint': 'Default template: Use Case #, Module, Submodule, Use Case Title, Present Condition, Use case steps, Expected result, Actual result, Test owner, Priority, Whether to implement, Whether to review, Remarks',
         
@@ -1048,7 +1063,10 @@ TRANSLATIONS = {
         'flash_generation_incomplete': 'Generation is not complete yet.',
         'flash_result_missing': 'Generation result not found.',
         'flash_requirement_required': 'Please enter requirement document content.',
+        'flash_queue_full': 'Too many generation jobs are queued. Please try again in about {seconds} seconds.',
+        'flash_client_queue_full': 'You already have many jobs queued. Please wait for them to finish (about {seconds} seconds).',
         'flash_regenerate_missing': 'Request snapshot for this job was not found; cannot pre-fill the form.',
+        'flash_resume_unavailable': 'No checkpoint is available for this job; use Retry instead.',
         'flash_ai_generate_error': 'An error occurred while generating test cases: {error}',
         'flash_output_dir_missing': 'Output directory does not exist.',
         'flash_file_not_found': 'File not found: {filename}. Please generate test cases again.',
@@ -1081,16 +1099,22 @@ TRANSLATIONS = {
         'progress_no_session': 'Generation session not found.',
         'progress_step_error': 'Error',
         'progress_initializing': 'Initializing...',
+        'progress_queued': 'Submitted, waiting for a generation worker...',
+        'progress_queued_position': 'Queued: {ahead} job(s) ahead, expected to start in about {minutes} min',
         'progress_strict_pipeline': 'Starting strict pipeline: extract function points → refine requirements → write cases per point...',
         'progress_points_extracted': 'Extracted {n} function point(s) from the requirement',
+        'progress_resumed_checkpoint': 'Resumed from checkpoint: {done} of {n} function point(s) already done, generating the rest',
         'progress_refining_requirement': 'Refining / structuring the requirement (context only, not writing cases yet)...',
         'progress_refine_done': 'Requirement refined ({n} chars). Building test-point mind map next...',
         'progress_mindmap_start': 'Generating ISTQB-style test-point mind map...',
         'progress_mindmap_done': 'Mind map done ({n} chars). Generating detailed cases per function point...',
+        'progress_near_dup_marked': 'Found {clusters} group(s) of near-duplicate cases ({cases} cases), flagged in remarks',
+        'progress_near_dup_merged': 'Found {clusters} group(s) of near-duplicate cases ({cases} cases), merged away {removed}',
         'step_test_mindmap': 'Test-point mind map',
         'step_requirement_refine': 'Requirement refinement',
         'progress_fp_item': 'Function point {i}/{t}: {name}',
         'progress_fp_done_short': 'Done {i}/{t}; {c} case(s) for this point',
+        'progress_case_streamed': '{i}/{t}: {n} case(s) received so far — {title}',
         'partial_save_hint': 'Exported {n} case(s) generated so far to {file}. Use the download button below.',
         'progress_partial_download': 'Download partial results ({n} case(s))',
         'history_title': 'Generation history',
@@ -1110,6 +1134,8 @@ TRANSLATIONS = {
         'history_action_progress': 'Progress',
         'history_action_result': 'Result',
         'history_action_regenerate': 'Retry',
+        'history_action_resume': 'Resume',
+        'history_resume_hint': 'Continue from the first unfinished function point; cases already generated are kept',
         'history_regenerate_again': 'Generate again',
         'history_empty': 'No records yet',
         'history_no_active': 'No jobs in progress',
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""从仓库根目录启动生成任务工作进程：python run_worker.py --processes 2 --threads 2"""
+
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parent
+load_dotenv(ROOT / ".env")
+
+from functional_ai.job_worker import main
+
+if __name__ == "__main__":
+    main()
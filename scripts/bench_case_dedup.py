@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用例去重基准：旧版 `hash(test_steps) % 10000` 签名 + 线性查找/list.remove 对比 64 位摘要字典索引。
+
+在仓库根目录执行:
+    python scripts/bench_case_dedup.py                          # 1000 / 10000 / 100000 条
+    python scripts/bench_case_dedup.py --sizes 5000 50000 --legacy-max 20000
+
+约 30% 的用例是前面某条用例的重复（优先级随机）。旧版为 O(n²)，只测到 --legacy-max 条；
+新版结果与「旧版算法改用完整签名」（无碰撞时的预期行为）逐条比对，并统计旧版因签名碰撞误合并的条数。
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from functional_ai.case_dedup import deduplicate_cases
+from functional_ai.test_case_generator import Priority, TestCase
+
+
+# ---------------- 旧版实现（与重构前逻辑一致，signature 可替换） ----------------
+
+def legacy_signature(c):
+    return f"{c.module}_{c.submodule}_{hash(c.test_steps) % 10000}"
+
+
+def exact_signature(c):
+    return (c.module, c.submodule, c.test_steps)
+
+
+def legacy_dedup(test_cases, signature=legacy_signature):
+    unique_cases = []
+    seen_signatures = set()
+    for case in test_cases:
+        sig = signature(case)
+        if sig not in seen_signatures:
+            seen_signatures.add(sig)
+            unique_cases.append(case)
+        else:
+            existing_case = next(c for c in unique_cases if signature(c) == sig)
+            if case.priority.value < existing_case.priority.value:
+                unique_cases.remove(existing_case)
+                unique_cases.append(case)
+    return unique_cases
+
+
+# ---------------- 合成数据 ----------------
+
+_WORDS = ["登录", "用户", "订单", "支付", "权限", "密码", "校验", "提交", "查询", "导出",
+          "login", "submit", "verify", "page", "button", "input", "error", "success"]
+
+
+def build_cases(n, dup_ratio=0.3, seed=7):
+    rng = random.Random(seed)
+    priorities = list(Priority)
+    cases = []
+    for i in range(n):
+        if cases and rng.random() < dup_ratio:
+            src = rng.choice(cases)
+            module, submodule, steps = src.module, src.submodule, src.test_steps
+        else:
+            module, submodule = f"模块{rng.randrange(8)}", f"子模块{rng.randrange(4)}"
+            steps = "\n".join(f"{k}. {''.join(rng.choice(_WORDS) for _ in range(6))}" for k in range(1, 5))
+        cases.append(TestCase(module=module, submodule=submodule, case_id=f"TC_{i:06d}", title=f"用例{i}",
+                              precondition="", test_steps=steps, expected="成功",
+                              priority=rng.choice(priorities)))
+    return cases
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=20000, help="旧版只测不超过该条数的规模")
+    args = parser.parse_args()
+
+    print(f"{'条数':>8}{'唯一':>8}{'旧版(秒)':>11}{'旧版误合并':>10}{'新版(秒)':>11}{'新版 μs/条':>11}")
+    for n in args.sizes:
+        cases = build_cases(n)
+        new, new_time = timed(deduplicate_cases, cases)
+        legacy_cell, wrong_cell = f"{'-':>11}", f"{'-':>10}"
+        if n <= args.legacy_max:
+            legacy, legacy_time = timed(legacy_dedup, cases)
+            expected = legacy_dedup(cases, exact_signature)
+            assert [c.case_id for c in new] == [c.case_id for c in expected], f"{n} 条时去重结果与预期不一致"
+            legacy_cell = f"{legacy_time:11.3f}"
+            wrong_cell = f"{len(expected) - len(legacy):10d}"
+        print(f"{n:8d}{len(new):8d}{legacy_cell}{wrong_cell}{new_time:11.3f}{new_time / n * 1e6:11.1f}")
+    print("✅ 新版去重结果与完整签名下的旧版逻辑逐条一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel 导出基准：流式只写导出 (TestCaseGenerator.export_to_excel) 对比旧版 DataFrame 导出。
+
+在仓库根目录执行:
+    python scripts/bench_excel_export.py                  # 默认 20000 条用例
+    python scripts/bench_excel_export.py --cases 5000 --columns 40
+
+--columns 超过 13 时使用自定义字段（多出的列为空列），用于验证超过 26 列时的列宽设置。
+内存为 tracemalloc 统计的 Python 堆峰值；两种导出的单元格内容与列宽会逐一比对。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+from functional_ai.test_case_generator import (
+    DEFAULT_EXPORT_HEADERS, Priority, TestCaseGenerator, TestMethod,
+)
+
+
+# ---------------- 旧版导出（与重构前 export_to_excel 逻辑一致） ----------------
+
+def legacy_export_to_excel(generator: TestCaseGenerator, file_path: str) -> str:
+    data = [tc.to_dict(custom_fields=generator.custom_fields) for tc in generator.test_cases]
+    df = pd.DataFrame(data)
+    if generator.custom_fields:
+        df = df[generator.custom_fields]
+    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='测试用例')
+        worksheet = writer.sheets['测试用例']
+        for idx, col in enumerate(df.columns):
+            max_length = max(
+                df[col].astype(str).map(len).max(),
+                len(str(col))
+            ) + 2
+            # 旧版使用 chr(65 + idx)，超过 26 列会写到 '['、'\\' 等非法列名；此处改用正确列名以便比对
+            worksheet.column_dimensions[get_column_letter(idx + 1)].width = min(max_length, 50)
+    return file_path
+
+
+# ---------------- 合成数据 ----------------
+
+_WORDS = ["登录", "用户", "订单", "支付", "权限", "密码", "校验", "提交", "查询", "导出",
+          "login", "submit", "verify", "page", "button", "input", "error", "success"]
+
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+
+def build_generator(cases: int, columns: int, seed: int = 7) -> TestCaseGenerator:
+    custom = None
+    if columns > len(DEFAULT_EXPORT_HEADERS):
+        custom = list(DEFAULT_EXPORT_HEADERS) + [f"扩展字段{i}" for i in range(columns - len(DEFAULT_EXPORT_HEADERS))]
+    gen = TestCaseGenerator(custom)
+    rng = random.Random(seed)
+    priorities = list(Priority)
+    methods = list(TestMethod)
+    for i in range(cases):
+        module = f"模块{i % 37}"
+        steps = "\n".join(f"{n}. {_text(rng, 3, 12)}" for n in range(1, rng.randint(3, 8)))
+        gen.add_test_case(
+            module=module,
+            submodule=f"子模块{i % 11}",
+            precondition=_text(rng, 2, 10),
+            test_steps=steps,
+            expected=_text(rng, 4, 20),
+            priority=rng.choice(priorities),
+            methods=rng.sample(methods, 2),
+            remark=_text(rng, 0, 4),
+        )
+    return gen
+
+
+# ---------------- 测量 ----------------
+
+def measure(fn, *args):
+    """耗时与内存分两次运行测量（tracemalloc 本身会显著拖慢执行）"""
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def read_back(path: str):
+    wb = load_workbook(path, read_only=False)
+    ws = wb.active
+    values = [tuple('' if v is None else v for v in row) for row in ws.iter_rows(values_only=True)]
+    widths = {k: v.width for k, v in ws.column_dimensions.items() if v.width}
+    return values, widths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=len(DEFAULT_EXPORT_HEADERS))
+    parser.add_argument("--no-verify", action="store_true", help="跳过导出内容比对")
+    args = parser.parse_args()
+
+    gen = build_generator(args.cases, args.columns)
+    print(f"📊 {args.cases} 条用例，{len(gen.get_export_headers())} 列")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.xlsx")
+        stream_path = os.path.join(tmp, "stream.xlsx")
+        legacy_time, legacy_peak = measure(legacy_export_to_excel, gen, legacy_path)
+        stream_time, stream_peak = measure(gen.export_to_excel, stream_path)
+
+        print(f"{'':10}{'耗时(秒)':>12}{'内存峰值(MB)':>16}{'文件(KB)':>12}")
+        for name, t, peak, path in (
+            ("DataFrame", legacy_time, legacy_peak, legacy_path),
+            ("流式只写", stream_time, stream_peak, stream_path),
+        ):
+            print(f"{name:10}{t:12.2f}{peak / 1024 / 1024:16.1f}{os.path.getsize(path) / 1024:12.0f}")
+        print(f"⚡ 提速 {legacy_time / stream_time:.1f}x，内存峰值降低 {legacy_peak / max(stream_peak, 1):.1f}x")
+
+        if not args.no_verify:
+            legacy_values, legacy_widths = read_back(legacy_path)
+            stream_values, stream_widths = read_back(stream_path)
+            assert legacy_values == stream_values, "单元格内容不一致"
+            assert legacy_widths == stream_widths, f"列宽不一致: {legacy_widths} != {stream_widths}"
+            print("✅ 两种导出的单元格内容与列宽一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 修复基准：单遍状态机 (functional_ai.llm_json_repair) 对比旧版正则级联修复。
+
+在仓库根目录执行:
+    python scripts/bench_json_repair.py                 # 使用内置合成语料
+    python scripts/bench_json_repair.py --corpus DIR    # 额外加载 DIR 下抓取的 *.txt 原始响应
+
+旧版级联在失败时还会写 debug_original_json.txt / debug_fixed_json.txt，
+此处为公平对比已去掉文件写入，仅比较纯计算开销。
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from functional_ai.llm_json_repair import repair_json_text
+
+
+# ---------------- 旧版级联（与重构前 strict_ai_generator 逻辑一致） ----------------
+
+def _legacy_comma_sep(s, comma_idx):
+    j, n = comma_idx + 1, len(s)
+    while j < n and s[j].isspace():
+        j += 1
+    if j >= n:
+        return True
+    if s[j] != '"':
+        return False
+    j += 1
+    esc = False
+    while j < n:
+        c = s[j]
+        if esc:
+            esc = False
+        elif c == "\\":
+            esc = True
+        elif c == '"':
+            j += 1
+            break
+        j += 1
+    else:
+        return False
+    while j < n and s[j].isspace():
+        j += 1
+    return j < n and s[j] == ":"
+
+
+def _legacy_closer(s, idx):
+    j, n = idx + 1, len(s)
+    while j < n and s[j].isspace():
+        j += 1
+    if j >= n:
+        return True
+    if s[j] in ":}]":
+        return True
+    if s[j] == ",":
+        return _legacy_comma_sep(s, j)
+    return False
+
+
+def _legacy_escape_quotes(text):
+    out, i, n, in_str, esc = [], 0, len(text), False, False
+    while i < n:
+        c = text[i]
+        if not in_str:
+            out.append(c)
+            if c == '"':
+                in_str = True
+        elif esc:
+            out.append(c)
+            esc = False
+        elif c == "\\":
+            out.append(c)
+            esc = True
+        elif c == '"':
+            if _legacy_closer(text, i):
+                out.append(c)
+                in_str = False
+            else:
+                out.append('\\"')
+        else:
+            out.append(c)
+        i += 1
+    return "".join(out)
+
+
+_CTRL = r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F�]'
+_ZW = r'[​-‍﻿]'
+
+
+def legacy_fix_json_format(s):
+    s = re.sub(_CTRL, '', s)
+    s = re.sub(_ZW, '', s)
+    s = re.sub(r'\r\r', '\r', s)
+    s = re.sub(r'\r\n', '\n', s)
+    s = _legacy_escape_quotes(s)
+    s = _legacy_escape_quotes(s)
+    s = s.replace('\\\\\\\\', '\\\\')
+    s = re.sub(r',\s*([\]}])', r'\1', s)
+    s = re.sub(r"(?<!\\)'", '"', s)
+    return s
+
+
+def _legacy_ok(t):
+    try:
+        d = json.loads(t)
+    except Exception:
+        return False
+    return isinstance(d, dict) or (isinstance(d, list) and len(d) > 0)
+
+
+def legacy_aggressive_fix(s):
+    t = _legacy_escape_quotes(s.rstrip())
+    t = re.sub(_CTRL, '', t)
+    t = re.sub(_ZW, '', t)
+    t += ']' * max(t.count('[') - t.count(']'), 0)
+    t += '}' * max(t.count('{') - t.count('}'), 0)
+    if t.endswith(','):
+        t = t[:-1]
+    if _legacy_ok(t):
+        return t
+    for i in range(len(s) - 1, -1, -1):
+        if s[i] in '}]':
+            c = _legacy_escape_quotes(re.sub(_ZW, '', re.sub(_CTRL, '', s[:i + 1])))
+            if _legacy_ok(c):
+                return c
+    for i in range(len(s), max(0, len(s) - 2000), -50):
+        t = s[:i].rstrip()
+        if not t or t[-1] not in '}]"0123456789':
+            continue
+        t += ']' * max(t.count('[') - t.count(']'), 0)
+        t += '}' * max(t.count('{') - t.count('}'), 0)
+        t = _legacy_escape_quotes(re.sub(_ZW, '', re.sub(_CTRL, '', t)))
+        if _legacy_ok(t):
+            return t
+    return '[]'
+
+
+def legacy_pipeline(text):
+    # 旧流程在修复前由 _clean_json_response 去掉围栏与前导说明
+    text = re.sub(r'```\s*', '', text).strip()
+    m = re.search(r'[\[{]', text)
+    if m:
+        text = text[m.start():]
+    fixed = legacy_fix_json_format(text)
+    try:
+        return json.loads(fixed)
+    except json.JSONDecodeError:
+        try:
+            return json.loads(legacy_aggressive_fix(fixed))
+        except json.JSONDecodeError:
+            return None
+
+
+def new_pipeline(text):
+    for drop in (False, True):
+        fixed = repair_json_text(text, drop_incomplete_tail=drop)
+        try:
+            return json.loads(fixed)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+# ---------------- 语料 ----------------
+
+def _case(i, rnd, owner):
+    steps = "\n".join(f"{k}. 点击\"{rnd.choice(['确定', 'BET', 'PLAY'])}\"按钮，检查 {owner} 余额 [{k}]" for k in range(1, 6))
+    return {
+        "case_id": f"login_{i:03d}",
+        "module": "登录",
+        "submodule": "账号密码",
+        "title": f"验证登录场景 {i}",
+        "precondition": "系统正常运行",
+        "test_steps": steps,
+        "expected": "1. 页面提示 \"登录成功\"\n2. 余额显示为 [0.5, 1, 2, 1000] 之一",
+        "priority": rnd.choice(["P0", "P1", "P2"]),
+        "remark": "测试方法: AI生成",
+    }
+
+
+def _malform(text, rnd):
+    """模拟 LLM 常见错误：未转义引号、原始换行、尾逗号、截断、围栏"""
+    kind = rnd.randrange(5)
+    if kind == 0:
+        text = text.replace('\\"', '"')
+    elif kind == 1:
+        text = text.replace('\\n', '\n')
+    elif kind == 2:
+        text = text.replace('}', '},', 3).replace(']', ',]', 1)
+    elif kind == 3:
+        text = text[: int(len(text) * rnd.uniform(0.6, 0.95))]
+    else:
+        text = text.replace('\\"', '"').replace('\\n', '\n')[: int(len(text) * 0.9)]
+    return "```json\n" + text + "\n```"
+
+
+def build_corpus(n_docs, seed=7):
+    rnd = random.Random(seed)
+    docs = []
+    for d in range(n_docs):
+        owner = "user's" if rnd.random() < 0.2 else "用户"  # 部分文档含英文撇号
+        cases = [_case(i, rnd, owner) for i in range(rnd.randint(30, 60))]
+        docs.append(_malform(json.dumps(cases, ensure_ascii=False, indent=2), rnd))
+    return docs
+
+
+def bench(name, fn, docs, repeat):
+    best = float("inf")
+    parsed = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [fn(d) for d in docs]
+        best = min(best, time.perf_counter() - t0)
+    parsed = sum(1 for r in results if r)
+    total_kb = sum(len(d) for d in docs) / 1024
+    print(f"{name:<10} {best * 1000:9.1f} ms  {total_kb / best / 1024:7.2f} MB/s  成功解析 {parsed}/{len(docs)}")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=40, help="合成语料文档数")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--corpus", help="抓取的原始响应目录（*.txt）")
+    args = ap.parse_args()
+
+    docs = build_corpus(args.docs)
+    if args.corpus:
+        docs += [p.read_text(encoding="utf-8", errors="replace") for p in sorted(Path(args.corpus).glob("*.txt"))]
+    avg = sum(len(d) for d in docs) / max(len(docs), 1)
+    print(f"📦 语料: {len(docs)} 份，平均 {avg / 1024:.1f} KB")
+    old = bench("legacy", legacy_pipeline, docs, args.repeat)
+    new = bench("single", new_pipeline, docs, args.repeat)
+    print(f"⚡ 加速比: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
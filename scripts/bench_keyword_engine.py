@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地需求分析基准：共享关键词查询（每个关键词每篇文档只查一次，结果在分析器间共用）对比旧版各分析器各自扫描。
+
+在仓库根目录执行:
+    python scripts/bench_keyword_engine.py                   # 默认 100000 字
+    python scripts/bench_keyword_engine.py --chars 300000
+
+分析器套件为 AITestCaseGenerator.ai_analyze_requirements + TestCaseGenerator.analyze_requirements
++ StrictAITestGenerator 的需求规模统计。文档分两种：关键词密集的中文需求与几乎不含关键词的英文说明；
+每次计时前清空查询缓存。两种实现的分析结果会逐项比对（另含随机大小写、「当…时」跨行等构造文本）。
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from functional_ai.ai_test_generator import AITestCaseGenerator
+from functional_ai.keyword_engine import scan_requirement
+from functional_ai.strict_ai_generator import FunctionPoint, StrictAITestGenerator
+from functional_ai.test_case_generator import TestCaseGenerator
+
+
+# ---------------- 旧版分析器（与重构前逻辑一致） ----------------
+
+def legacy_complexity(text):
+    factors = {
+        "length": len(text) / 10000,
+        "rules": len(re.findall(r'规则|条件|如果|当.*时', text)) / 10,
+        "entities": len(re.findall(r'用户|订单|商品|账户|数据', text)) / 10,
+        "integrations": len(re.findall(r'接口|API|第三方|集成', text)) / 5,
+        "states": len(re.findall(r'状态|阶段|步骤', text)) / 8,
+    }
+    weights = {"length": 0.1, "rules": 0.3, "entities": 0.2, "integrations": 0.2, "states": 0.2}
+    return min(sum(min(factors[k], 1.0) * weights[k] for k in factors), 1.0)
+
+
+def _legacy_flags(text, table):
+    return [label for pattern, label in table if re.search(pattern, text, re.IGNORECASE)]
+
+
+LEGACY_RISK = [
+    (r'登录|密码|认证|权限', "身份认证安全"), (r'支付|金额|交易', "支付安全"), (r'上传|文件|附件', "文件上传安全"),
+    (r'大量|批量|并发|高频', "高并发性能"), (r'查询|搜索|检索', "查询性能"),
+    (r'数据库|存储|备份', "数据一致性"), (r'同步|异步|队列', "数据同步"),
+]
+LEGACY_PATHS = [(r'注册|登录', "用户注册登录路径"), (r'下单|支付|购买', "订单支付路径"), (r'审核|审批|流转', "审批流转路径")]
+LEGACY_PERFORMANCE = [
+    (r'响应时间|延迟|速度', "响应时间性能"), (r'并发|同时|批量', "并发处理性能"),
+    (r'大数据|海量|TB|GB', "大数据处理性能"), (r'内存|CPU|磁盘', "资源使用性能"),
+]
+LEGACY_USABILITY = [
+    (r'界面|UI|用户体验', "界面友好性"), (r'提示|帮助|引导', "操作引导"),
+    (r'错误|异常|失败', "错误处理"), (r'移动|手机|响应式', "移动端适配"),
+]
+LEGACY_SECURITY = {
+    "注入攻击": ["输入", "查询", "SQL"], "跨站脚本": ["输出", "显示", "HTML"], "权限控制": ["权限", "角色", "访问"],
+    "数据泄露": ["敏感", "隐私", "加密"], "会话安全": ["登录", "会话", "token"],
+}
+LEGACY_INTEGRATION = ["API", "接口", "第三方", "外部系统", "微服务", "数据库", "缓存", "消息队列", "文件系统"]
+LEGACY_BASIC = {
+    'risk': ['安全', '权限', '支付', '金额', '密码', 'security', 'payment'],
+    'integration': ['接口', '集成', '第三方', 'API', 'integration'],
+    'business': ['规则', '条件', '如果', '当', 'rule', 'condition'],
+}
+LEGACY_ACTIONS = ['查看', '显示', '切换', '创建', '添加', '删除', '修改', '检测', '弹', '恢复', '支持', '加载', '刷新', '保存',
+                  '选择', '输入', '配置', '计算', '验证', '匹配', '比较', '排序', '筛选', '搜索', '提交', '发送', '接收', '进入']
+LEGACY_INPUT_NAMES = ["email", "phone", "id_card", "password"]
+
+
+def legacy_critical_paths(text):
+    paths = []
+    for pattern in (r'流程[：:]\s*([^\n]+)', r'步骤[：:]\s*([^\n]+)', r'\d+[\.、]\s*([^\n]+)'):
+        paths.extend(re.findall(pattern, text))
+    paths.extend(_legacy_flags(text, LEGACY_PATHS))
+    return set(paths)
+
+
+def legacy_suite(text):
+    lower = text.lower()
+    return {
+        "complexity": legacy_complexity(text),
+        "risk": _legacy_flags(text, LEGACY_RISK),
+        "paths": legacy_critical_paths(text),
+        "input": [n for n in LEGACY_INPUT_NAMES if n in lower],
+        "numeric": bool(re.search(r'数字|金额|价格|数量', text, re.IGNORECASE)),
+        "datetime": bool(re.search(r'日期|时间', text, re.IGNORECASE)),
+        "integration": [f"{k}集成" for k in LEGACY_INTEGRATION if k in text],
+        "performance": _legacy_flags(text, LEGACY_PERFORMANCE),
+        "security": [r for r, kws in LEGACY_SECURITY.items() if any(k in text for k in kws)],
+        "usability": _legacy_flags(text, LEGACY_USABILITY),
+        "basic": {group: [k for k in kws if k in text] for group, kws in LEGACY_BASIC.items()},
+        "actions": sum(1 for k in LEGACY_ACTIONS if k in text),
+    }
+
+
+def engine_suite(text, ai_gen, base_gen):
+    hits = scan_requirement(text)
+    patterns = ai_gen._analyze_data_patterns(text)
+    basic = base_gen.analyze_requirements(text)
+    return {
+        "complexity": ai_gen._calculate_complexity(text),
+        "risk": ai_gen._identify_risk_areas(text),
+        "paths": set(ai_gen._extract_critical_paths(text)),
+        "input": [p["name"] for p in patterns if p["type"] == "input_validation"],
+        "numeric": any(p["type"] == "numeric" for p in patterns),
+        "datetime": any(p["type"] == "datetime" for p in patterns),
+        "integration": ai_gen._identify_integration_points(text),
+        "performance": ai_gen._identify_performance_concerns(text),
+        "security": ai_gen._identify_security_risks(text),
+        "usability": ai_gen._identify_usability_factors(text),
+        "basic": {
+            "risk": [r[2:-4] for r in basic.risk_areas],
+            "integration": [r[2:-4] for r in basic.integration_points],
+            "business": [r[2:-4] for r in basic.business_rules],
+        },
+        "actions": len(hits.found("scale.actions")),
+    }
+
+
+def legacy_case_score(desc):
+    """_determine_case_count 的关键词部分得分"""
+    score = 0
+    for group, points in ((['选择', '输入', '配置', '计算', '验证', '匹配', '比较', '排序', '筛选', '搜索'], 4),
+                          (['显示', '查看', '切换', '加载', '保存', '删除', '修改'], 2),
+                          (['打开', '关闭', '跳转', '返回', '刷新'], 1)):
+        if any(kw in desc for kw in group):
+            score += points
+    return score + sum(1 for w in ['且', '或', '同时', '并且', '以及', '和'] if w in desc)
+
+
+def legacy_case_log(desc):
+    """旧版 _determine_case_count 打印的得分行（新版打印同样格式，逐条比对得分）"""
+    score = legacy_case_score(desc)
+    score += 3 if len(desc) > 40 else 2 if len(desc) > 30 else 1 if len(desc) > 20 else 0
+    if re.search(r'\d+[~–-]\d+', desc):
+        score += 3
+    elif re.search(r'\d+个', desc):
+        score += 2
+    count = 20 if score >= 10 else 15 if score >= 7 else 10 if score >= 5 else 8 if score >= 3 else 5
+    return f"  📈 功能点复杂度: {score}分 -> 建议基准 {count} 个用例（AI可生成更多）\n"
+
+
+# ---------------- 合成文档 ----------------
+
+DENSE_SENTENCES = [
+    "用户在登录页面输入用户名和密码后点击提交按钮，系统校验通过则进入首页。",
+    "当订单状态为待支付时，用户可以取消订单或继续支付。",
+    "管理员可以查看、筛选并导出报表数据，支持按日期范围查询。",
+    "系统需在 3 秒内返回搜索结果，并发用户数不低于 500。",
+    "上传附件大小不超过 10MB，仅支持 PDF 与 PNG 格式。",
+    "若库存不足则提示错误信息并阻止下单。",
+    "接口返回的 JSON 字段必须包含 code、message 与 data。",
+    "页面在移动端与桌面端均需正常显示，按钮状态需有明显反馈。",
+    "角色权限：普通用户只能访问本人数据，审核员可审批流转单据。",
+    "数据同步任务每小时执行一次，失败时重试三次并记录日志。",
+]
+SPARSE_SENTENCES = [
+    "The operator opens the dashboard and reviews the weekly figures for each region.",
+    "Figures are rendered as a chart with a legend below it.",
+    "Managers may annotate any figure with a short comment.",
+    "Comments appear next to the chart in chronological order.",
+]
+
+
+def build_document(sentences, chars, seed=11):
+    rng = random.Random(seed)
+    lines, n = [], 0
+    while n < chars:
+        line = rng.choice(sentences)
+        lines.append(line)
+        n += len(line) + 1
+    return "\n".join(lines)
+
+
+def edge_documents(seed=5):
+    """随机拼接关键词、大小写变体与换行，覆盖重叠匹配与「当…时」跨行"""
+    rng = random.Random(seed)
+    pieces = ["当", "时", "\n", "规则", "条件", "如果", "API", "api", "Api", "SQL", "sql", "token", "TOKEN",
+              "大数据库", "数据", "TB", "tb", "ui", "UI", "Email", "PHONE", "id_card", "security", "Payment",
+              "用户体验", "响应时间", "消息队列", "文件系统", "弹", "和", "x", "。"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 60))) for _ in range(2000)]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ai_gen = AITestCaseGenerator()
+    base_gen = TestCaseGenerator()
+    strict_gen = StrictAITestGenerator()
+
+    # 两边都包含未改动的业务规则提取，计时范围一致
+    def run_engine(text):
+        scan_requirement.cache_clear()
+        engine_suite(text, ai_gen, base_gen)
+        ai_gen._extract_business_rules(text)
+
+    def run_legacy(text):
+        legacy_suite(text)
+        ai_gen._extract_business_rules(text)
+
+    # 结果比对
+    docs = {
+        "中文（关键词密集）": build_document(DENSE_SENTENCES, args.chars),
+        "英文（几乎无关键词）": build_document(SPARSE_SENTENCES, args.chars),
+    }
+    for text in list(docs.values()) + edge_documents():
+        scan_requirement.cache_clear()
+        expected, actual = legacy_suite(text), engine_suite(text, ai_gen, base_gen)
+        assert expected == actual, f"分析结果不一致: {text[:80]!r}\n{expected}\n{actual}"
+    fp_pieces = ["选择", "输入", "显示", "保存", "打开", "刷新", "且", "或", "同时", "并且", "以及", "和",
+                 "1~40", "4个", "订单", "x"]
+    rng = random.Random(3)
+    for _ in range(2000):
+        desc = "".join(rng.choice(fp_pieces) for _ in range(rng.randint(0, 12)))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            strict_gen._determine_case_count(FunctionPoint(1, desc))
+        assert out.getvalue() == legacy_case_log(desc), desc
+    print("✅ 关键词引擎的分析结果与旧版逐项一致")
+
+    print(f"{'':24}{'旧版(ms)':>10}{'引擎(ms)':>10}")
+    for name, text in docs.items():
+        legacy = timed(lambda: run_legacy(text), args.repeat)
+        engine = timed(lambda: run_engine(text), args.repeat)
+        print(f"{name:20}{legacy * 1000:10.1f}{engine * 1000:10.1f}")
+    text = docs["中文（关键词密集）"]
+    scan_requirement.cache_clear()
+    scan_requirement(text)
+    cached = timed(lambda: engine_suite(text, ai_gen, base_gen), args.repeat)
+    print(f"同一文档再次分析（查询已缓存）: {cached * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
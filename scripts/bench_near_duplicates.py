@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复用例检测基准：MinHash + LSH 对比两两计算精确 Jaccard。
+
+在仓库根目录执行:
+    python scripts/bench_near_duplicates.py                      # 10000 条用例
+    python scripts/bench_near_duplicates.py --cases 30000 --exact 3000
+
+合成用例中英文混合，约 15% 是前面某条用例的改写（换近义词、删词、改标题前缀），
+其中约一半步骤里的数字也不同（模拟边界值用例，不应视为重复）。
+统计：检测耗时、改写对的召回率、混入不同来源用例的簇数，以及前 --exact 条用例上
+相对精确 Jaccard（同样的切词与数字规则）的召回率和两两计算的耗时。
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from functional_ai.near_duplicates import (
+    DEFAULT_NEAR_DUP_THRESHOLD, SHINGLE_SIZE, case_tokens, find_near_duplicates,
+)
+from functional_ai.test_case_generator import Priority, TestCase
+
+# ---------------- 合成数据 ----------------
+
+_CJK = "登录用户订单支付权限密码校验提交查询导出页面按钮输入列表详情删除编辑保存取消确认状态成功失败提示信息数据" \
+       "商品库存价格优惠地址物流评价消息通知设置账户安全头像昵称手机邮箱验证码注册审核退款发票报表统计日志"
+_EN = ["open", "click", "enter", "select", "verify", "page", "button", "field", "list", "order", "user",
+       "payment", "invalid", "valid", "empty", "error", "message", "save", "cancel", "search", "filter", "export"]
+_SYNONYMS = [("打开", "进入"), ("点击", "单击"), ("页面", "界面"), ("提示", "显示"), ("open", "go to"),
+             ("click", "press"), ("verify", "check"), ("error", "warning")]
+
+
+def _zh_phrase(rng):
+    return "".join(rng.choice(_CJK) for _ in range(rng.randint(6, 14)))
+
+
+def _en_phrase(rng):
+    return " ".join(rng.choice(_EN) for _ in range(rng.randint(4, 8)))
+
+
+def _base_case(rng, i):
+    phrase = _zh_phrase if rng.random() < 0.7 else _en_phrase
+    verb = rng.choice(["打开", "点击", "open", "click"])
+    steps = [f"{verb}{phrase(rng)}"] + [phrase(rng) for _ in range(rng.randint(2, 4))]
+    if rng.random() < 0.5:
+        steps[-1] += f" {rng.randint(1, 500)}"
+    return dict(title=f"验证{phrase(rng)}", steps=steps, expected=f"提示{phrase(rng)}")
+
+
+def _paraphrase(rng, src, change_number):
+    steps = list(src["steps"])
+    k = rng.randrange(len(steps))
+    for a, b in _SYNONYMS:
+        if a in steps[k]:
+            steps[k] = steps[k].replace(a, b, 1)
+            break
+    else:
+        cut = rng.randrange(len(steps[k]))
+        steps[k] = steps[k][:cut] + steps[k][cut + 1:]  # 删掉一个字
+    if change_number:
+        steps[-1] += f" {rng.randint(501, 999)}"
+    title = src["title"].replace("验证", "", 1) + "验证" if rng.random() < 0.5 else src["title"]
+    return dict(title=title, steps=steps, expected=src["expected"].replace("提示", "显示", 1))
+
+
+def build_cases(n, dup_ratio=0.15, seed=7):
+    """返回 (用例, 来源编号, 改写对)；数字不同的改写不计入改写对"""
+    rng = random.Random(seed)
+    specs, origin, planted = [], [], []
+    for i in range(n):
+        if specs and rng.random() < dup_ratio:
+            j = rng.randrange(len(specs))
+            change_number = rng.random() < 0.5
+            specs.append(_paraphrase(rng, specs[j], change_number))
+            origin.append(origin[j] if not change_number else i)
+            if not change_number:
+                planted.append((j, i))
+        else:
+            specs.append(_base_case(rng, i))
+            origin.append(i)
+    cases = [
+        TestCase(module="模块", submodule=f"功能点{i % 40}", case_id=f"case_{i:05d}", title=s["title"],
+                 precondition="", test_steps="\n".join(f"{k}. {step}" for k, step in enumerate(s["steps"], 1)),
+                 expected=s["expected"], priority=rng.choice(list(Priority)))
+        for i, s in enumerate(specs)
+    ]
+    return cases, origin, planted
+
+
+# ---------------- 精确 Jaccard（两两比较） ----------------
+
+def shingle_set(tokens):
+    if len(tokens) < SHINGLE_SIZE:
+        tokens = tokens + [""] * (SHINGLE_SIZE - len(tokens))
+    return {tuple(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def exact_pairs(cases, threshold):
+    tokens = [case_tokens(tc) for tc in cases]
+    sets = [shingle_set(t) for t in tokens]
+    numbers = [sorted(t for t in ts if t[0].isdigit()) for ts in tokens]
+    pairs = []
+    for i in range(len(cases)):
+        for j in range(i + 1, len(cases)):
+            if numbers[i] == numbers[j]:
+                a, b = sets[i], sets[j]
+                if len(a & b) >= threshold * len(a | b):
+                    pairs.append((i, j))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=10000)
+    parser.add_argument("--exact", type=int, default=2000, help="与精确 Jaccard 比对的用例数（O(n²)）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_NEAR_DUP_THRESHOLD)
+    args = parser.parse_args()
+
+    cases, origin, planted = build_cases(args.cases)
+    find_near_duplicates(cases[:100], args.threshold)  # 预热
+    start = time.perf_counter()
+    clusters = find_near_duplicates(cases, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    cluster_of = {i: n for n, c in enumerate(clusters) for i in c}
+    found = sum(1 for a, b in planted if a in cluster_of and cluster_of[a] == cluster_of.get(b))
+    mixed = sum(1 for c in clusters if len({origin[i] for i in c}) > 1)
+    print(f"📊 {args.cases} 条用例，阈值 {args.threshold}")
+    print(f"   MinHash/LSH 耗时: {elapsed:.3f} 秒，{len(clusters)} 个簇 / {sum(map(len, clusters))} 条用例")
+    print(f"   改写对召回: {found}/{len(planted)} ({found / max(len(planted), 1):.1%})，混入不同来源的簇: {mixed}")
+
+    sub = cases[:args.exact]
+    start = time.perf_counter()
+    truth = exact_pairs(sub, args.threshold)
+    exact_time = time.perf_counter() - start
+    sub_clusters = find_near_duplicates(sub, args.threshold)
+    sub_cluster_of = {i: n for n, c in enumerate(sub_clusters) for i in c}
+    hit = sum(1 for a, b in truth if a in sub_cluster_of and sub_cluster_of[a] == sub_cluster_of.get(b))
+    print(f"   前 {len(sub)} 条：两两精确 Jaccard 耗时 {exact_time:.2f} 秒，相似对 {len(truth)}，"
+          f"LSH 召回 {hit}/{len(truth)} ({hit / max(len(truth), 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
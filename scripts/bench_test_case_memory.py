@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用例内存/序列化基准：旧版 dataclass 列表 vs slots TestCase 列表 vs 列式 TestCaseTable。
+
+在仓库根目录执行:
+    python scripts/bench_test_case_memory.py               # 默认 20000 条用例
+    python scripts/bench_test_case_memory.py --cases 50000
+
+用例从 JSON 文本解析得到（与 AI 响应解析一致，每条用例的模块名等都是独立的字符串对象），
+内存为 tracemalloc 统计的构建后常驻量（含字符串），pickle 使用最高协议。
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from functional_ai.test_case_generator import Priority, TestCase, TestMethod
+from functional_ai.test_case_table import TestCaseTable
+
+
+# ---------------- 旧版表示（与重构前 TestCase 定义一致） ----------------
+
+@dataclass
+class LegacyTestCase:
+    module: str
+    submodule: str
+    case_id: str
+    title: str
+    precondition: str
+    test_steps: str
+    expected: str
+    priority: Priority
+    remark: str = ""
+    methods_used: List[TestMethod] = field(default_factory=list)
+
+
+# ---------------- 合成数据 ----------------
+
+_WORDS = ["登录", "用户", "订单", "支付", "权限", "密码", "校验", "提交", "查询", "导出",
+          "login", "submit", "verify", "page", "button", "input", "error", "success"]
+
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+
+def build_payload(cases: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    priorities = [p.value for p in Priority]
+    methods = [m.name for m in TestMethod]
+    items = []
+    for i in range(cases):
+        items.append({
+            "module": f"模块{i % 37}",
+            "submodule": f"子模块{i % 11}",
+            "case_id": f"TC_{i:06d}",
+            "title": _text(rng, 3, 8),
+            "precondition": _text(rng, 2, 10),
+            "test_steps": "\n".join(f"{n}. {_text(rng, 3, 12)}" for n in range(1, rng.randint(3, 8))),
+            "expected": _text(rng, 4, 20),
+            "priority": rng.choice(priorities),
+            "remark": _text(rng, 0, 4),
+            # 位掩码按 TestMethod 定义顺序解码，此处保持同样顺序以便逐条比对
+            "methods": [methods[k] for k in sorted(rng.sample(range(len(methods)), 2))],
+        })
+    return json.dumps(items, ensure_ascii=False)
+
+
+def iter_cases(payload: str, cls):
+    for item in json.loads(payload):
+        yield cls(
+            module=item["module"],
+            submodule=item["submodule"],
+            case_id=item["case_id"],
+            title=item["title"],
+            precondition=item["precondition"],
+            test_steps=item["test_steps"],
+            expected=item["expected"],
+            priority=Priority(item["priority"]),
+            remark=item["remark"],
+            methods_used=[TestMethod[m] for m in item["methods"]],
+        )
+
+
+# ---------------- 测量 ----------------
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    blob = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    dump_time = time.perf_counter() - start
+    start = time.perf_counter()
+    pickle.loads(blob)
+    load_time = time.perf_counter() - start
+    return obj, retained, elapsed, len(blob), dump_time, load_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = build_payload(args.cases)
+    print(f"📊 {args.cases} 条用例")
+    rows = [
+        ("dataclass 列表", lambda: list(iter_cases(payload, LegacyTestCase))),
+        ("slots 列表", lambda: list(iter_cases(payload, TestCase))),
+        ("TestCaseTable", lambda: TestCaseTable(iter_cases(payload, TestCase))),
+    ]
+    print(f"{'':16}{'常驻(MB)':>10}{'每条(B)':>10}{'构建(秒)':>10}{'pickle(KB)':>12}{'dump(秒)':>10}{'load(秒)':>10}")
+    results = {}
+    for name, build in rows:
+        obj, retained, elapsed, size, dump_time, load_time = measure(build)
+        results[name] = obj
+        print(f"{name:16}{retained / 1024 / 1024:10.1f}{retained / args.cases:10.0f}{elapsed:10.2f}"
+              f"{size / 1024:12.0f}{dump_time:10.3f}{load_time:10.3f}")
+
+    slotted = results["slots 列表"]
+    table = results["TestCaseTable"]
+    assert list(table) == slotted, "TestCaseTable 还原的用例与原列表不一致"
+    print("✅ TestCaseTable 迭代结果与原列表一致")
+
+
+if __name__ == "__main__":
+    main()
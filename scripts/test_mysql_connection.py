@@ -63,6 +63,12 @@ recent = mysql_db.get_recent_sessions(limit=5)
 for i, session in enumerate(recent):
     print(f"   {i+1}. {session['timestamp']}: {session['requirement_title'][:40]}... ({session['total_cases']} cases)")
 
+# 连接池指标
+pool = mysql_db.pool_stats()
+print(f"\n🔌 Connection Pool:")
+print(f"   Size: {pool['pool_size']} (+{pool['max_overflow']} overflow), Open: {pool['total']}, Idle: {pool['idle']}")
+print(f"   Checkouts: {pool['checkouts']}, Created: {pool['created']}, Ping Failures: {pool['ping_failures']}")
+
 print("\n" + "="*50)
 print("✅ MySQL Connection and Data Verified!")
 print("="*50 + "\n")